@@ -0,0 +1,299 @@
+"""
+Cohort, retention and funnel analytics over columnar snapshots.
+
+The engagement tables (users, login_sessions, event_rsvps and
+mentor_contact_requests) are periodically extracted into compact NumPy
+arrays saved on disk and memory-mapped back in. Cohort matrices and funnels
+are then computed with vectorized operations instead of per-request SQL, and
+results are cached until the next snapshot refresh.
+
+Run directly to refresh the on-disk snapshot (e.g. from cron):
+
+    python analytics.py
+"""
+
+import os
+import time
+import calendar
+import hashlib
+import logging
+import threading
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("ANALYTICS_SNAPSHOT_DIR", "analytics_snapshots")
+REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "900"))
+EXTRACT_BATCH_SIZE = 50000
+
+DAY = 86400
+WEEK = 7 * DAY
+PERIODS = {"day": DAY, "week": WEEK, "month": 30 * DAY}
+
+# Column layout of each snapshot table: array name -> dtype
+SNAPSHOT_COLUMNS = {
+    "users": {"id": np.int64, "created_at": np.int64, "email": np.uint64},
+    "logins": {"user_id": np.int64, "login_time": np.int64},
+    "rsvps": {"user_id": np.int64, "email": np.uint64, "created_at": np.int64},
+    "mentor_requests": {"user_id": np.int64, "email": np.uint64, "created_at": np.int64},
+}
+
+
+def email_key(email) -> int:
+    """Stable 64-bit key for an email address (case-insensitive)."""
+    if not email:
+        return 0
+    digest = hashlib.blake2b(email.strip().lower().encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _epoch(value) -> int:
+    # Timestamps are stored as naive UTC, so avoid datetime.timestamp()'s local-time assumption
+    return calendar.timegm(value.utctimetuple()) if value is not None else -1
+
+
+def _day_epoch(value) -> int:
+    return calendar.timegm(value.timetuple()) if value is not None else -1
+
+
+def _queries():
+    """Column-only SELECTs for each snapshot table, with row converters."""
+    return {
+        "users": [(
+            select(models.User.id, models.User.created_at, models.User.email),
+            lambda r: (r[0], _epoch(r[1]), email_key(r[2])),
+        )],
+        "logins": [(
+            select(models.LoginSession.user_id, models.LoginSession.login_time),
+            lambda r: (r[0], _epoch(r[1])),
+        ), (
+            # Sessions moved out by retention.py survive as one row per user and day
+            select(models.LoginSessionRollup.user_id, models.LoginSessionRollup.day),
+            lambda r: (r[0], _day_epoch(r[1])),
+        )],
+        "rsvps": [(
+            select(models.EventRSVP.user_id, models.EventRSVP.email, models.EventRSVP.created_at),
+            lambda r: (r[0] if r[0] is not None else -1, email_key(r[1]), _epoch(r[2])),
+        )],
+        "mentor_requests": [(
+            select(
+                models.MentorContactRequest.user_id,
+                models.MentorContactRequest.contact_email,
+                models.MentorContactRequest.created_at,
+            ),
+            lambda r: (r[0] if r[0] is not None else -1, email_key(r[1]), _epoch(r[2])),
+        )],
+    }
+
+
+def extract_snapshot(db: Session, directory: str = SNAPSHOT_DIR) -> dict:
+    """Extract the engagement tables into .npy column files under `directory`.
+
+    Rows are streamed in batches so memory stays bounded by the final arrays.
+    Each file is written to a temporary name and swapped in with os.replace,
+    so readers never see a half-written snapshot column.
+    """
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    for table, sources in _queries().items():
+        columns = SNAPSHOT_COLUMNS[table]
+        chunks = {name: [] for name in columns}
+        for query, convert in sources:
+            result = db.execute(query.execution_options(yield_per=EXTRACT_BATCH_SIZE))
+            for batch in result.partitions():
+                rows = [convert(row) for row in batch]
+                for i, (name, dtype) in enumerate(columns.items()):
+                    chunks[name].append(np.fromiter((row[i] for row in rows), dtype=dtype, count=len(rows)))
+        for name, dtype in columns.items():
+            array = np.concatenate(chunks[name]) if chunks[name] else np.empty(0, dtype=dtype)
+            path = os.path.join(directory, f"{table}.{name}.npy")
+            tmp_path = path + ".tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+            counts[table] = len(array)
+    logger.info(f"Analytics snapshot extracted: {counts}")
+    return counts
+
+
+def load_snapshot(directory: str = SNAPSHOT_DIR) -> dict:
+    """Memory-map a previously extracted snapshot. Returns None if incomplete."""
+    snapshot = {}
+    for table, columns in SNAPSHOT_COLUMNS.items():
+        snapshot[table] = {}
+        for name in columns:
+            path = os.path.join(directory, f"{table}.{name}.npy")
+            if not os.path.exists(path):
+                return None
+            snapshot[table][name] = np.load(path, mmap_mode="r")
+    return snapshot
+
+
+def compute_retention(snapshot: dict, period: str = "week", max_periods: int = 12) -> dict:
+    """Signup-cohort retention matrix.
+
+    Users are bucketed into cohorts by signup period. Cell [c][k] is the number
+    of users from cohort c with at least one login k periods after signup.
+    """
+    width = PERIODS[period]
+    user_ids = np.asarray(snapshot["users"]["id"])
+    signup = np.asarray(snapshot["users"]["created_at"])
+    known = signup >= 0
+    user_ids, signup = user_ids[known], signup[known]
+    if len(user_ids) == 0:
+        return {"period": period, "cohorts": [], "sizes": [], "matrix": [], "rates": []}
+
+    cohort = signup // width
+    first_cohort = int(cohort.min())
+    n_cohorts = int(cohort.max()) - first_cohort + 1
+
+    login_user = np.asarray(snapshot["logins"]["user_id"])
+    login_time = np.asarray(snapshot["logins"]["login_time"])
+
+    # Dense lookup user_id -> cohort index (-1 for unknown users)
+    max_uid = int(max(user_ids.max(), login_user.max() if len(login_user) else 0))
+    cohort_of = np.full(max_uid + 1, -1, dtype=np.int64)
+    cohort_of[user_ids] = cohort - first_cohort
+
+    login_cohort = cohort_of[login_user]
+    offset = login_time // width - (login_cohort + first_cohort)
+    valid = (login_cohort >= 0) & (login_time >= 0) & (offset >= 0) & (offset < max_periods)
+
+    # Count each (user, offset) pair once, however many logins it had
+    pairs = np.unique(login_user[valid] * max_periods + offset[valid])
+    cells = cohort_of[pairs // max_periods] * max_periods + pairs % max_periods
+    matrix = np.bincount(cells, minlength=n_cohorts * max_periods).reshape(n_cohorts, max_periods)
+    sizes = np.bincount(cohort - first_cohort, minlength=n_cohorts)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(sizes[:, None] > 0, matrix / sizes[:, None], 0.0)
+
+    return {
+        "period": period,
+        "cohorts": [int((first_cohort + i) * width) for i in range(n_cohorts)],
+        "sizes": sizes.tolist(),
+        "matrix": matrix.tolist(),
+        "rates": np.round(rates, 4).tolist(),
+    }
+
+
+def compute_funnel(snapshot: dict, since: int = None) -> dict:
+    """Visitor RSVP -> registered member -> mentor request funnel.
+
+    People are identified by email key, so anonymous RSVPs are matched to
+    accounts registered before or after the RSVP. Each stage is a subset of
+    the previous one.
+    """
+    rsvp_email = np.asarray(snapshot["rsvps"]["email"])
+    if since is not None:
+        rsvp_email = rsvp_email[np.asarray(snapshot["rsvps"]["created_at"]) >= since]
+    visitors = np.unique(rsvp_email[rsvp_email != 0])
+
+    user_email = np.asarray(snapshot["users"]["email"])
+    registered = visitors[np.isin(visitors, user_email)]
+
+    # Mentor requests count either by contact email or by the linked account
+    request_email = np.asarray(snapshot["mentor_requests"]["email"])
+    request_user = np.asarray(snapshot["mentor_requests"]["user_id"])
+    linked = np.isin(np.asarray(snapshot["users"]["id"]), request_user[request_user >= 0])
+    requesters = np.union1d(request_email[request_email != 0], user_email[linked])
+    requested = registered[np.isin(registered, requesters)]
+
+    stages = [
+        ("rsvp_visitors", len(visitors)),
+        ("registered_members", len(registered)),
+        ("mentor_requests", len(requested)),
+    ]
+    top = stages[0][1]
+    return {
+        "since": since,
+        "stages": [
+            {
+                "name": name,
+                "count": int(count),
+                "conversion": round(count / prev, 4) if prev else 0.0,
+                "overall": round(count / top, 4) if top else 0.0,
+            }
+            for (name, count), prev in zip(stages, [top] + [c for _, c in stages[:-1]])
+        ],
+    }
+
+
+class AnalyticsEngine:
+    """Holds the current snapshot and a result cache, refreshing on a TTL."""
+
+    def __init__(self, directory: str = SNAPSHOT_DIR, refresh_seconds: int = REFRESH_SECONDS):
+        self.directory = directory
+        self.refresh_seconds = refresh_seconds
+        self.snapshot = None
+        self.refreshed_at = 0.0
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def refresh(self, db: Session):
+        """Re-extract the snapshot from the database and drop cached results."""
+        with self._lock:
+            extract_snapshot(db, self.directory)
+            self.snapshot = load_snapshot(self.directory)
+            self.refreshed_at = time.time()
+            self._cache.clear()
+
+    def ensure_fresh(self, db: Session):
+        if self.snapshot is None and time.time() - self.refreshed_at >= self.refresh_seconds:
+            # Reuse a snapshot extracted by another worker or by cron, if recent
+            path = os.path.join(self.directory, "logins.login_time.npy")
+            if os.path.exists(path) and time.time() - os.path.getmtime(path) < self.refresh_seconds:
+                with self._lock:
+                    self.snapshot = load_snapshot(self.directory)
+                    self.refreshed_at = os.path.getmtime(path)
+        if self.snapshot is None or time.time() - self.refreshed_at >= self.refresh_seconds:
+            self.refresh(db)
+
+    def _cached(self, key, compute):
+        result = self._cache.get(key)
+        if result is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            result = compute()
+            result["snapshot_time"] = self.refreshed_at
+            self._cache[key] = result
+        return result
+
+    def retention(self, db: Session, period: str = "week", max_periods: int = 12) -> dict:
+        self.ensure_fresh(db)
+        return self._cached(
+            ("retention", period, max_periods),
+            lambda: compute_retention(self.snapshot, period, max_periods),
+        )
+
+    def funnel(self, db: Session, days: int = None) -> dict:
+        self.ensure_fresh(db)
+        since = int(self.refreshed_at - days * DAY) if days else None
+        return self._cached(("funnel", days), lambda: compute_funnel(self.snapshot, since))
+
+
+analytics_engine = AnalyticsEngine()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        counts = extract_snapshot(db)
+        print(f"Extracted {counts} in {time.perf_counter() - start:.2f}s")
+        snapshot = load_snapshot()
+        start = time.perf_counter()
+        compute_retention(snapshot)
+        compute_funnel(snapshot)
+        print(f"Computed retention and funnel in {time.perf_counter() - start:.3f}s")
+    finally:
+        db.close()
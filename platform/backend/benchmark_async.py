@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sync threadpool endpoints vs async endpoints under concurrent load.
+
+Both variants run the same user lookup as the auth dependency (the query
+every authenticated request pays), one as a `def` endpoint with a Session
+executed in Starlette's threadpool and one as an `async def` endpoint with an
+AsyncSession on the event loop. Requests are driven in-process through the
+ASGI app, so only the framework and database paths are measured.
+
+Usage:
+    python benchmark_async.py [--requests 2000] [--concurrency 50]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+import httpx
+from fastapi import FastAPI, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from database import engine, get_db, get_async_db, SessionLocal
+
+app = FastAPI()
+
+
+@app.get("/sync/users/{username}")
+def sync_lookup(username: str, db: Session = Depends(get_db)):
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if user is None:
+        raise HTTPException(status_code=404)
+    return {"id": user.id, "role": user.role}
+
+
+@app.get("/async/users/{username}")
+async def async_lookup(username: str, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(models.User).where(models.User.username == username))).scalars().first()
+    if user is None:
+        raise HTTPException(status_code=404)
+    return {"id": user.id, "role": user.role}
+
+
+def seed_users(count: int = 100):
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        existing = {u for (u,) in db.query(models.User.username).filter(models.User.username.like("bench%")).all()}
+        for i in range(count):
+            if f"bench{i}" not in existing:
+                db.add(models.User(email=f"bench{i}@example.com", username=f"bench{i}", full_name=f"Bench {i}", hashed_password="x"))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_mode(mode: str, total: int, concurrency: int) -> dict:
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(f"/{mode}/users/bench{i % 100}")
+
+    async def worker(client):
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": total,
+        "throughput": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    seed_users()
+    print(f"{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for mode in ("sync", "async"):
+        result = asyncio.run(run_mode(mode, args.requests, args.concurrency))
+        print(f"{result['mode']:<8}{result['throughput']:>10.0f}{result['p50_ms']:>10.2f}"
+              f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
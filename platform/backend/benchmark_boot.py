@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first request of a cold start.
+
+Runs the start command (railway_start.sh by default) with PORT set, polls
+/health every --poll-ms until it answers 200, then stops the whole process
+group. Reports each run and the median; the first successful response is
+what a platform health check or the first user waits for after a deploy or
+restart.
+
+Usage:
+    python benchmark_boot.py [--runs 3] [--port 8099]
+    python benchmark_boot.py --command "gunicorn -w 4 -k uvicorn.workers.UvicornWorker main:app --preload --bind 0.0.0.0:8099"
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+
+def wait_healthy(url: str, process, timeout: float, poll: float):
+    """Seconds until `url` returned 200, or None if the process exited or timed out."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            return None
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(poll)
+    return None
+
+
+def stop(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def port_in_use(port: int) -> bool:
+    with socket.socket() as sock:
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+def boot_once(command: str, port: int, timeout: float, poll: float, log):
+    env = dict(os.environ, PORT=str(port))
+    process = subprocess.Popen(command, shell=True, env=env, stdout=log, stderr=subprocess.STDOUT,
+                               start_new_session=True)
+    try:
+        return wait_healthy(f"http://127.0.0.1:{port}/health", process, timeout, poll)
+    finally:
+        stop(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time to first successful request after a cold start")
+    parser.add_argument("--command", default="./railway_start.sh", help="start command; must bind $PORT")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=180, help="seconds to wait for /health per run")
+    parser.add_argument("--poll-ms", type=float, default=50)
+    parser.add_argument("--log", default=os.devnull, help="file for the command's output")
+    args = parser.parse_args()
+
+    results = []
+    if port_in_use(args.port):
+        print(f"Port {args.port} is already in use")
+        return 1
+    with open(args.log, "a") as log:
+        for run in range(1, args.runs + 1):
+            seconds = boot_once(args.command, args.port, args.timeout, args.poll_ms / 1000, log)
+            if seconds is None:
+                print(f"Run {run}: no healthy response within {args.timeout:.0f}s (see --log)")
+                return 1
+            results.append(seconds)
+            # Workers of the stopped server can hold the port for a moment
+            deadline = time.perf_counter() + 30
+            while port_in_use(args.port) and time.perf_counter() < deadline:
+                time.sleep(0.1)
+            print(f"Run {run}: first 200 from /health after {seconds:.2f}s")
+    print(f"Median time to first request: {statistics.median(results):.2f}s over {len(results)} runs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: import time of the app, with a budget check.
+
+Imports --module (main by default) in fresh interpreters under
+`python -X importtime` and reports the median cumulative time of the module,
+the packages that cost the most (self time summed per top-level package) and
+the slowest first-party modules. Exits 1 when the median exceeds --budget-ms,
+so a new eager import of something heavy shows up before it slows down worker
+respawns, CLI scripts and tests.
+
+The import must not need the database (the connection test runs in the
+app's startup hook), so any DATABASE_URL works, e.g. sqlite:///app.db.
+
+Usage:
+    python benchmark_imports.py [--runs 5] [--budget-ms 1500] [--top 15]
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(output: str) -> list:
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def import_once(module: str) -> list:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=HERE, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def first_party() -> set:
+    return {name[:-3] for name in os.listdir(HERE) if name.endswith(".py")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the app against a budget")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    totals, runs = [], []
+    for _ in range(args.runs):
+        rows = import_once(args.module)
+        total = next(cumulative for name, _, cumulative, depth in rows if name == args.module and depth == 0)
+        totals.append(total / 1000)
+        runs.append(rows)
+    # Break down the median run
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+    packages = defaultdict(int)
+    for name, self_us, _, _ in median_run:
+        packages[name.split(".")[0]] += self_us
+    ours = first_party()
+    local = sorted(((cumulative, name) for name, _, cumulative, _ in median_run if name in ours), reverse=True)
+
+    print(f"Top packages by self time (median run):")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<28} {self_us / 1000:8.1f}ms")
+    print(f"Slowest first-party modules (cumulative):")
+    for cumulative, name in local[:args.top]:
+        print(f"  {name:<28} {cumulative / 1000:8.1f}ms")
+
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f}ms over {args.runs} runs "
+          f"(min {min(totals):.0f}ms, budget {args.budget_ms:.0f}ms)")
+    return 0 if median <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression suite for the API routes.
+
+Builds a throwaway SQLite database (migrated to head, then filled with a
+deterministic synthetic dataset by generate_dataset.py), drives every route
+through the ASGI app in-process and records, per route:
+
+  - the number of SQL statements executed (fewest across --repeat runs)
+  - the plan shape: EXPLAIN QUERY PLAN of each distinct statement, via
+    index_advisor.explain, and the large tables it scans in full
+  - the median wall time
+  - the response status
+
+and compares them with query_plan_baseline.json. The run fails (exit 1) when
+a route starts scanning a large table it did not scan before, executes
+noticeably more statements (an N+1 creeping in), or changes status. Plan
+changes that add no scan and slower timings are only reported, unless
+--fail-on-time is given, since wall time depends on the machine.
+
+Routes that are neither exercised nor listed in SKIPPED are reported so new
+endpoints get a case.
+
+Usage:
+    python benchmark_query_plans.py                    # compare with the baseline
+    python benchmark_query_plans.py --update-baseline  # record a new baseline
+    python benchmark_query_plans.py --route /api/events --verbose
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plan_baseline.json")
+# Extra statements tolerated before a route counts as regressed
+STATEMENT_SLACK = 2
+STATEMENT_RATIO = 1.25
+TIME_RATIO = 2.0
+TIME_SLACK_MS = 5.0
+
+_COVERING_SCAN = re.compile(r"^SCAN (\w+) USING COVERING INDEX \w+")
+
+# Routes left out on purpose, with the reason
+SKIPPED = {
+    ("POST", "/api/mentor-contact"): "sends mail through the configured SMTP server",
+    ("POST", "/api/admin/retention"): "archives and deletes the generated login sessions",
+    ("POST", "/api/analytics/refresh"): "rebuilds the analytics snapshot files",
+    ("POST", "/api/admin/index-advisor/capture"): "toggles workload capture",
+    ("GET", "/api/admin/profiles/{name}"): "serves a stored profile file, without database access",
+    ("GET", "/api/admin/traces/{trace_id}"): "reads one trace from the worker's buffer, without database access",
+    ("GET", "/api/admin/slow-requests/{record_id}"): "reads one record from the worker's buffer, without database access",
+    ("POST", "/api/admin/memory/tracemalloc/start"): "allocation tracing would slow down every case after it",
+    ("POST", "/api/admin/memory/tracemalloc/stop"): "only does something after tracemalloc/start",
+    ("POST", "/api/admin/memory/snapshots"): "needs tracemalloc running (409 otherwise)",
+    ("GET", "/api/admin/memory/snapshots/{snapshot_id}"): "needs a snapshot, i.e. tracemalloc running",
+    ("GET", "/api/admin/memory/snapshots/{snapshot_id}/diff"): "needs two snapshots, i.e. tracemalloc running",
+}
+
+
+def configure_environment(workdir: str):
+    """Point the app at a private database before anything imports it."""
+    os.environ.pop("RAILWAY_DATABASE_URL", None)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    os.environ["DATABASE_REPLICA_URLS"] = ""
+    os.environ["SQLITE_MAINTENANCE"] = "False"
+    os.environ["INDEX_ADVISOR_CAPTURE"] = "False"
+    os.environ["SKETCH_FLUSH_SECONDS"] = "86400"
+    os.environ["ANALYTICS_SNAPSHOT_DIR"] = os.path.join(workdir, "analytics_snapshots")
+    os.environ["ARCHIVE_DIR"] = os.path.join(workdir, "archive")
+
+
+# Dataset per unit of --scale, generated by generate_dataset.py
+DATASET_COUNTS = {
+    "users": 1000, "contacts": 2000, "tags": 50, "mentors": 200, "mentor_requests": 20000,
+    "events": 2000, "rsvps": 30000, "login_sessions": 50000, "tasks": 20000, "newsletters": 200,
+}
+DATASET_PASSWORD = "benchmark123"
+
+
+class StatementCounter:
+    """Collects the statements every engine executes while active."""
+
+    def __init__(self):
+        self.active = False
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.statements.append((statement, parameters, executemany))
+
+    def install(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        # Class-level listener: covers the sync, async and replica engines
+        event.listen(Engine, "before_cursor_execute", self)
+
+
+class Context:
+    """Ids and tokens shared by the cases."""
+
+    def __init__(self, engine):
+        import models
+        from main import create_access_token
+        from sqlalchemy import select
+
+        self.engine = engine
+        with engine.connect() as conn:
+            admin = conn.execute(select(models.User.id, models.User.username).where(models.User.role == "admin")).first()
+            member = conn.execute(select(models.User.id, models.User.username).where(models.User.role == "member")).first()
+            self.event_id = conn.execute(select(models.Event.id).order_by(models.Event.id)).scalar()
+        self.admin_id, self.member_id = admin.id, member.id
+        self.admin = {"Authorization": f"Bearer {create_access_token(data={'sub': admin.username, 'user_id': admin.id, 'role': 'admin'})}"}
+        self.member = {"Authorization": f"Bearer {create_access_token(data={'sub': member.username, 'user_id': member.id, 'role': 'member'})}"}
+        self.sequence = 0
+
+    def unique(self) -> int:
+        self.sequence += 1
+        return self.sequence
+
+    def insert(self, model, **values) -> int:
+        from sqlalchemy import insert
+        with self.engine.begin() as conn:
+            return conn.execute(insert(model.__table__).values(**values)).inserted_primary_key[0]
+
+
+def _event_body(ctx):
+    return {"title": f"Bench event {ctx.unique()}", "start_date": "2026-06-01T18:00:00", "location": "Campus"}
+
+
+def _new_event(ctx):
+    import models
+    return ctx.insert(models.Event, title=f"Bench event {ctx.unique()}", start_date=datetime(2026, 6, 1))
+
+
+def _new_contact(ctx):
+    import models
+    return ctx.insert(models.Contact, email=f"bench{ctx.unique()}@example.com", full_name="Bench contact")
+
+
+def _new_mentor(ctx):
+    import models
+    now = datetime(2026, 1, 1)
+    return ctx.insert(models.Mentor, full_name="Bench mentor", email=f"bench-mentor{ctx.unique()}@example.com",
+                      contact_requests=0, created_at=now, updated_at=now)
+
+
+def _new_newsletter(ctx):
+    import models
+    return ctx.insert(models.Newsletter, title=f"Bench newsletter {ctx.unique()}", content="Body")
+
+
+def _new_task(ctx):
+    import models
+    return ctx.insert(models.Task, title=f"Bench task {ctx.unique()}", status="pending",
+                      assigned_to_id=ctx.member_id, created_by_id=ctx.admin_id)
+
+
+# (method, route template, auth, build) where build(ctx) returns the request
+# kwargs; any rows it needs are created before measuring starts
+CASES = [
+    ("GET", "/health", None, lambda ctx: {"url": "/health"}),
+    ("POST", "/api/token", None, lambda ctx: {"url": "/api/token", "data": {"username": "user1", "password": DATASET_PASSWORD}}),
+    ("POST", "/api/users", None, lambda ctx: {"url": "/api/users", "json": {
+        "email": f"bench{ctx.unique()}@example.com", "username": f"bench{ctx.sequence}",
+        "password": DATASET_PASSWORD, "full_name": "Bench User"}}),
+    ("GET", "/api/users/me", "member", lambda ctx: {"url": "/api/users/me"}),
+    ("GET", "/api/users", "admin", lambda ctx: {"url": "/api/users"}),
+    ("GET", "/api/users/engagement", "admin", lambda ctx: {"url": "/api/users/engagement"}),
+    ("GET", "/api/users/me/tasks", "member", lambda ctx: {"url": "/api/users/me/tasks"}),
+    ("GET", "/api/users/me/events", "member", lambda ctx: {"url": "/api/users/me/events"}),
+    ("GET", "/api/contacts", "admin", lambda ctx: {"url": "/api/contacts"}),
+    ("POST", "/api/contacts", "admin", lambda ctx: {"url": "/api/contacts", "json": {
+        "email": f"bench{ctx.unique()}@example.com", "full_name": "Bench contact", "tags": ["tag1", "bench"]}}),
+    ("PUT", "/api/contacts/{contact_id}", "admin", lambda ctx: {"url": f"/api/contacts/{_new_contact(ctx)}", "json": {
+        "email": f"bench{ctx.unique()}@example.com", "full_name": "Renamed contact", "tags": ["tag2"]}}),
+    ("DELETE", "/api/contacts/{contact_id}", "admin", lambda ctx: {"url": f"/api/contacts/{_new_contact(ctx)}"}),
+    ("GET", "/api/mentors", "admin", lambda ctx: {"url": "/api/mentors"}),
+    ("GET", "/api/public/mentors", None, lambda ctx: {"url": "/api/public/mentors"}),
+    ("GET", "/api/opportunities", None, lambda ctx: {"url": "/api/opportunities"}),
+    ("POST", "/api/mentors", "admin", lambda ctx: {"url": "/api/mentors", "json": {
+        "full_name": "Bench mentor", "email": f"bench-mentor{ctx.unique()}@example.com"}}),
+    ("PUT", "/api/mentors/{mentor_id}", "admin", lambda ctx: {"url": f"/api/mentors/{_new_mentor(ctx)}", "json": {
+        "full_name": "Renamed mentor", "email": f"bench-mentor{ctx.unique()}@example.com"}}),
+    ("DELETE", "/api/mentors/{mentor_id}", "admin", lambda ctx: {"url": f"/api/mentors/{_new_mentor(ctx)}"}),
+    ("GET", "/api/events", None, lambda ctx: {"url": "/api/events"}),
+    ("POST", "/api/events", "admin", lambda ctx: {"url": "/api/events", "json": _event_body(ctx)}),
+    ("PUT", "/api/events/{event_id}", "admin", lambda ctx: {"url": f"/api/events/{_new_event(ctx)}", "json": _event_body(ctx)}),
+    ("DELETE", "/api/events/{event_id}", "admin", lambda ctx: {"url": f"/api/events/{_new_event(ctx)}"}),
+    ("GET", "/api/events/{event_id}/rsvps", "admin", lambda ctx: {"url": f"/api/events/{ctx.event_id}/rsvps"}),
+    ("POST", "/api/events/{event_id}/rsvp", "member", lambda ctx: {"url": f"/api/events/{ctx.event_id}/rsvp", "json": {
+        "email": "user1@example.com", "rsvp_status": "confirmed"}}),
+    ("POST", "/api/events/{event_id}/rsvp/public", None, lambda ctx: {"url": f"/api/events/{ctx.event_id}/rsvp/public", "json": {
+        "email": f"visitor{ctx.unique()}@example.com", "rsvp_status": "confirmed"}}),
+    ("GET", "/api/newsletters", None, lambda ctx: {"url": "/api/newsletters"}),
+    ("POST", "/api/newsletters", "admin", lambda ctx: {"url": "/api/newsletters", "json": {
+        "title": f"Bench newsletter {ctx.unique()}", "content": "Body"}}),
+    ("PUT", "/api/newsletters/{newsletter_id}", "admin", lambda ctx: {"url": f"/api/newsletters/{_new_newsletter(ctx)}", "json": {
+        "title": f"Renamed newsletter {ctx.unique()}", "content": "Body"}}),
+    ("DELETE", "/api/newsletters/{newsletter_id}", "admin", lambda ctx: {"url": f"/api/newsletters/{_new_newsletter(ctx)}"}),
+    ("GET", "/api/tasks", "admin", lambda ctx: {"url": "/api/tasks"}),
+    ("POST", "/api/tasks", "admin", lambda ctx: {"url": "/api/tasks", "json": {
+        "title": f"Bench task {ctx.unique()}", "assigned_to_id": ctx.member_id}}),
+    ("PUT", "/api/tasks/{task_id}", "admin", lambda ctx: {"url": f"/api/tasks/{_new_task(ctx)}", "json": {"title": "Renamed task"}}),
+    ("PATCH", "/api/tasks/{task_id}/status", "member", lambda ctx: {"url": f"/api/tasks/{_new_task(ctx)}/status", "json": {"status": "completed"}}),
+    ("DELETE", "/api/tasks/{task_id}", "admin", lambda ctx: {"url": f"/api/tasks/{_new_task(ctx)}"}),
+    ("POST", "/api/login-session", None, lambda ctx: {"url": "/api/login-session", "params": {"user_id": ctx.member_id}}),
+    ("GET", "/api/tags", None, lambda ctx: {"url": "/api/tags"}),
+    ("GET", "/api/engagement/stats", "admin", lambda ctx: {"url": "/api/engagement/stats"}),
+    ("GET", "/api/engagement/unique", "admin", lambda ctx: {"url": "/api/engagement/unique", "params": {"days": 30}}),
+    ("GET", "/api/engagement/users", "admin", lambda ctx: {"url": "/api/engagement/users"}),
+    ("GET", "/api/analytics/retention", "admin", lambda ctx: {"url": "/api/analytics/retention"}),
+    ("GET", "/api/analytics/funnel", "admin", lambda ctx: {"url": "/api/analytics/funnel"}),
+    ("GET", "/api/admin/db-pool", "admin", lambda ctx: {"url": "/api/admin/db-pool"}),
+    ("GET", "/api/admin/sqlite-writer", "admin", lambda ctx: {"url": "/api/admin/sqlite-writer"}),
+    ("GET", "/api/admin/sqlite", "admin", lambda ctx: {"url": "/api/admin/sqlite"}),
+    ("GET", "/api/admin/replicas", "admin", lambda ctx: {"url": "/api/admin/replicas"}),
+    ("GET", "/api/admin/index-advisor", "admin", lambda ctx: {"url": "/api/admin/index-advisor"}),
+    ("GET", "/api/admin/index-advisor/migration", "admin", lambda ctx: {"url": "/api/admin/index-advisor/migration"}),
+    ("GET", "/api/admin/profiles", "admin", lambda ctx: {"url": "/api/admin/profiles"}),
+    ("GET", "/metrics", None, lambda ctx: {"url": "/metrics"}),
+    ("GET", "/api/admin/traces", "admin", lambda ctx: {"url": "/api/admin/traces"}),
+    ("GET", "/api/admin/slow-requests", "admin", lambda ctx: {"url": "/api/admin/slow-requests"}),
+    ("GET", "/api/admin/memory", "admin", lambda ctx: {"url": "/api/admin/memory"}),
+    ("GET", "/api/admin/memory/snapshots", "admin", lambda ctx: {"url": "/api/admin/memory/snapshots"}),
+]
+
+
+def run_case(client, ctx, counter, case, repeat: int):
+    method, route, auth, build = case
+    headers = {None: None, "admin": ctx.admin, "member": ctx.member}[auth]
+    counts, timings, statements, status = [], [], [], None
+    for attempt in range(repeat + 1):
+        request = build(ctx)
+        counter.statements = []
+        counter.active = True
+        start = time.perf_counter()
+        try:
+            response = client.request(method, headers=headers, **request)
+        finally:
+            elapsed = time.perf_counter() - start
+            counter.active = False
+        status = response.status_code
+        if attempt == 0:
+            continue  # warm-up: caches, prepared pools, first-use imports
+        counts.append(len(counter.statements))
+        timings.append(elapsed * 1000)
+        if len(counter.statements) == min(counts):
+            statements = counter.statements
+    return {"status": status, "statements": min(counts), "wall_ms": round(statistics.median(timings), 3)}, statements
+
+
+def plan_shape(engine, statements, large_table_rows: int, sizes: dict):
+    """Distinct plan lines and the large tables scanned in full."""
+    from sqlalchemy import inspect
+    import index_advisor
+
+    plan, seq_scans, seen = [], set(), set()
+    with engine.connect() as conn:
+        for statement, parameters, executemany in statements:
+            key = index_advisor.fingerprint(statement)
+            verb = statement.lstrip()[:6].upper()
+            if executemany or key in seen or verb not in ("SELECT", "UPDATE", "DELETE"):
+                continue
+            seen.add(key)
+            try:
+                lines, issues = index_advisor.explain(conn, statement, parameters)
+            except Exception as e:
+                plan.append(f"EXPLAIN failed: {e}")
+                continue
+            for line in lines:
+                if line not in plan:
+                    plan.append(line)
+            for issue in issues:
+                table = issue["table"]
+                if issue["kind"] != "seq_scan" or table is None:
+                    continue
+                if table not in sizes:
+                    # Scans of subqueries (anon_1) have no table to count
+                    exists = inspect(conn).has_table(table)
+                    sizes[table] = index_advisor.table_rows(conn, table) if exists else 0
+                if sizes[table] >= large_table_rows:
+                    seq_scans.add(table)
+    return plan, sorted(seq_scans)
+
+
+def _shape(line: str) -> str:
+    # count(*) may walk any covering index of a table; which one is not a change
+    return _COVERING_SCAN.sub(r"SCAN \1 USING COVERING INDEX", line)
+
+
+def compare(name: str, current: dict, baseline: dict, fail_on_time: bool):
+    """Failures and notes for one route."""
+    failures, notes = [], []
+    if baseline is None:
+        notes.append("new route, not in the baseline")
+        return failures, notes
+    if current["status"] != baseline["status"]:
+        failures.append(f"status {baseline['status']} -> {current['status']}")
+    new_scans = sorted(set(current["seq_scans"]) - set(baseline["seq_scans"]))
+    if new_scans:
+        failures.append(f"new full scan of {', '.join(new_scans)}")
+    allowed = max(baseline["statements"] + STATEMENT_SLACK, int(baseline["statements"] * STATEMENT_RATIO))
+    if current["statements"] > allowed:
+        failures.append(f"statements {baseline['statements']} -> {current['statements']}")
+    elif current["statements"] < baseline["statements"]:
+        notes.append(f"statements {baseline['statements']} -> {current['statements']} (update the baseline)")
+    if not new_scans:
+        before, after = {_shape(line) for line in baseline["plan"]}, {_shape(line) for line in current["plan"]}
+        notes.extend(f"plan + {line}" for line in current["plan"] if _shape(line) not in before)
+        notes.extend(f"plan - {line}" for line in baseline["plan"] if _shape(line) not in after)
+    if current["wall_ms"] > max(baseline["wall_ms"] * TIME_RATIO, baseline["wall_ms"] + TIME_SLACK_MS):
+        message = f"wall time {baseline['wall_ms']:.1f} -> {current['wall_ms']:.1f} ms"
+        (failures if fail_on_time else notes).append(message)
+    return failures, notes
+
+
+def uncovered_routes(app):
+    from fastapi.routing import APIRoute
+    covered = {(method, route) for method, route, _, _ in CASES} | set(SKIPPED)
+    missing = []
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            for method in sorted(route.methods):
+                if (method, route.path) not in covered:
+                    missing.append(f"{method} {route.path}")
+    return sorted(set(missing))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query-plan regression suite for the API routes")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--scale", type=float, default=1.0, help="dataset size multiplier")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="measured runs per route, after one warm-up")
+    parser.add_argument("--large-table-rows", type=int, default=1000, help="full scans below this size are ignored")
+    parser.add_argument("--route", action="append", help="only run routes containing this text")
+    parser.add_argument("--fail-on-time", action="store_true", help="treat wall time regressions as failures")
+    parser.add_argument("--verbose", action="store_true", help="print each route's plan")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="query-plans-")
+    configure_environment(workdir)
+    try:
+        import migrate
+        migrate.upgrade()
+        from fastapi.testclient import TestClient
+        import main as app_module
+        import generate_dataset
+        from database import engine
+
+        print(f"Generating synthetic dataset (scale {args.scale}, seed {args.seed})...")
+        start = time.perf_counter()
+        generate_dataset.generate(engine, generate_dataset.scaled(DATASET_COUNTS, args.scale),
+                                  seed=args.seed, password=DATASET_PASSWORD)
+        print(f"Seeded in {time.perf_counter() - start:.1f}s\n")
+
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        counter = StatementCounter()
+        counter.install()
+        ctx = Context(engine)
+        # Startup hooks are not run: no background threads while measuring
+        client = TestClient(app_module.app, raise_server_exceptions=False)
+
+        baseline = {}
+        if not args.update_baseline:
+            if not os.path.exists(args.baseline):
+                raise SystemExit(f"No baseline at {args.baseline}; run with --update-baseline first")
+            with open(args.baseline) as f:
+                recorded = json.load(f)
+            if recorded["dataset"] != {"scale": args.scale, "seed": args.seed}:
+                raise SystemExit(f"Baseline was recorded with dataset {recorded['dataset']}; pass the same --scale/--seed")
+            baseline = recorded["routes"]
+
+        results, failed, sizes = {}, [], {}
+        print(f"{'route':<48} {'status':>6} {'stmts':>6} {'ms':>9}  scans")
+        for case in CASES:
+            name = f"{case[0]} {case[1]}"
+            if args.route and not any(text in name for text in args.route):
+                continue
+            result, statements = run_case(client, ctx, counter, case, args.repeat)
+            result["plan"], result["seq_scans"] = plan_shape(engine, statements, args.large_table_rows, sizes)
+            results[name] = result
+            failures, notes = compare(name, result, baseline.get(name), args.fail_on_time) if baseline else ([], [])
+            mark = "FAIL" if failures else ""
+            print(f"{name:<48} {result['status']:>6} {result['statements']:>6} {result['wall_ms']:>9.2f}  "
+                  f"{','.join(result['seq_scans']) or '-'} {mark}")
+            for message in failures:
+                print(f"    ! {message}")
+            for message in notes:
+                print(f"    - {message}")
+            if args.verbose:
+                for line in result["plan"]:
+                    print(f"        {line}")
+            if failures:
+                failed.append(name)
+
+        missing = uncovered_routes(app_module.app)
+        if missing and not args.route:
+            print("\nRoutes without a case (add one to CASES or SKIPPED):")
+            for name in missing:
+                print(f"  {name}")
+
+        if args.update_baseline:
+            if args.route:
+                raise SystemExit("Refusing to write a partial baseline; drop --route")
+            with open(args.baseline, "w") as f:
+                json.dump({"dataset": {"scale": args.scale, "seed": args.seed}, "routes": results}, f, indent=2, sort_keys=True)
+                f.write("\n")
+            print(f"\nWrote baseline for {len(results)} routes to {args.baseline}")
+            return 0
+
+        if failed:
+            print(f"\n{len(failed)} route(s) regressed: {', '.join(failed)}")
+            return 1
+        print(f"\nAll {len(results)} routes match the baseline")
+        return 0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
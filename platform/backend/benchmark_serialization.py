@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serializing large list responses, per endpoint.
+
+Loads each endpoint's rows with its own query (repeated up to --rows) and
+times three ways of turning them into the response body:
+
+  default    FastAPI's path for response_model=List[X]: serialize_response
+             (validate from attributes, dump to dicts) + JSONResponse (json)
+  validated  fast_json.ListSerializer(X): one TypeAdapter pass + dump_json
+  trusted    fast_json.ListSerializer(X, trusted=True): attributes + orjson
+
+Best of --rounds, after a first pass (the JSON check) that also loads any lazy attributes. Every
+path must produce the same JSON as the default one; the benchmark exits 1
+otherwise.
+
+Run against a populated database, e.g. one from generate_dataset.py:
+    DATABASE_URL=sqlite:///bench.db python benchmark_serialization.py [--rows 10000]
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from sqlalchemy.orm import joinedload
+
+import main
+import models
+import schemas
+from database import SessionLocal
+from fast_json import ListSerializer
+
+ENDPOINTS = [
+    ("GET /api/contacts", schemas.Contact, lambda db: db.query(models.Contact).options(
+        joinedload(models.Contact.user), joinedload(models.Contact.tags)).order_by(models.Contact.created_at.desc())),
+    ("GET /api/users", schemas.UserSimple, lambda db: db.query(models.User)),
+    ("GET /api/mentors", schemas.Mentor, lambda db: db.query(models.Mentor)),
+    ("GET /api/tasks", schemas.Task, lambda db: db.query(models.Task).options(
+        joinedload(models.Task.assigned_to_user), joinedload(models.Task.created_by_user))),
+    ("GET /api/events/{event_id}/rsvps", schemas.EventRSVP, lambda db: db.query(models.EventRSVP)),
+]
+
+
+def response_field(endpoint: str):
+    method, path = endpoint.split(" ", 1)
+    for route in main.app.routes:
+        if getattr(route, "path", None) == path and method in getattr(route, "methods", ()):
+            return route.response_field
+    raise LookupError(endpoint)
+
+
+def load_rows(db, query, rows: int) -> list:
+    loaded = query(db).all()
+    if not loaded:
+        return []
+    # The same objects repeated are as costly to serialize as distinct ones
+    return (loaded * (rows // len(loaded) + 1))[:rows]
+
+
+def best_of(rounds: int, function) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Benchmark list response serialization per endpoint")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    failed = False
+    print(f"{'endpoint':<34}{'rows':>7}{'default':>11}{'validated':>11}{'trusted':>11}{'speedup':>9}")
+    db = SessionLocal()
+    try:
+        for endpoint, schema, query in ENDPOINTS:
+            rows = load_rows(db, query, args.rows)
+            if not rows:
+                print(f"{endpoint:<34} no rows, skipped")
+                continue
+            field = response_field(endpoint)
+            validated, trusted = ListSerializer(schema), ListSerializer(schema, trusted=True)
+
+            def default():
+                content = loop.run_until_complete(serialize_response(field=field, response_content=rows))
+                return JSONResponse(content).body
+
+            reference = json.loads(default())
+            for serializer in (validated, trusted):
+                if json.loads(serializer.dumps(rows)) != reference:
+                    print(f"{endpoint}: {'trusted' if serializer.trusted else 'validated'} output differs from the default")
+                    failed = True
+            times = [best_of(args.rounds, f) for f in (default, lambda: validated.dumps(rows), lambda: trusted.dumps(rows))]
+            print(f"{endpoint:<34}{len(rows):>7}" + "".join(f"{t * 1000:>9.1f}ms" for t in times)
+                  + f"{times[0] / min(times[1:]):>8.1f}x")
+    finally:
+        db.close()
+        loop.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
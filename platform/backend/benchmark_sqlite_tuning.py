@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: read latency with the old pragmas and an unchecked WAL vs the
+tuning profile after a TRUNCATE checkpoint.
+
+Builds a scratch database shaped like login_sessions, then applies a burst of
+updates while a long-lived reader holds a snapshot open, which is what stops
+passive autocheckpoints from resetting the WAL in production. Point lookups
+and per-user range scans are then timed twice:
+
+  baseline  journal_mode=WAL, synchronous=NORMAL, foreign_keys=ON (the old
+            set_sqlite_pragma) with the grown WAL still in place
+  tuned     sqlite_tuning.apply_pragmas() after wal_checkpoint(TRUNCATE)
+            and ANALYZE, as SQLiteMaintenance would leave it
+
+Usage:
+    python benchmark_sqlite_tuning.py [--rows 200000] [--updates 50000] [--reads 20000]
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+from sqlite_tuning import apply_pragmas
+
+
+def baseline_pragmas(conn):
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA foreign_keys=ON;")
+
+
+def build(path: str, rows: int, updates: int):
+    conn = sqlite3.connect(path, isolation_level=None)
+    baseline_pragmas(conn)
+    conn.execute("CREATE TABLE login_sessions (id INTEGER PRIMARY KEY, user_id INTEGER, login_time REAL, user_agent TEXT)")
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO login_sessions (user_id, login_time, user_agent) VALUES (?, ?, ?)",
+        ((random.randint(1, 5000), time.time() - random.random() * 86400 * 180, "Mozilla/5.0 " * 8) for _ in range(rows)),
+    )
+    conn.execute("COMMIT")
+    conn.execute("CREATE INDEX ix_login_sessions_user_id ON login_sessions (user_id)")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # A reader pinned to an old snapshot keeps every later frame in the WAL
+    reader = sqlite3.connect(path, isolation_level=None)
+    reader.execute("BEGIN")
+    reader.execute("SELECT count(*) FROM login_sessions").fetchone()
+    for start in range(0, updates, 500):
+        conn.execute("BEGIN")
+        conn.executemany(
+            "UPDATE login_sessions SET login_time = ? WHERE id = ?",
+            ((time.time(), random.randint(1, rows)) for _ in range(min(500, updates - start))),
+        )
+        conn.execute("COMMIT")
+    reader.execute("COMMIT")
+    reader.close()
+    # Returned open: closing the last connection would checkpoint the WAL away
+    return conn
+
+
+def measure(path: str, rows: int, reads: int, tuned: bool) -> dict:
+    conn = sqlite3.connect(path, isolation_level=None)
+    if tuned:
+        apply_pragmas(conn)
+        conn.execute("PRAGMA analysis_limit=1000")
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    else:
+        baseline_pragmas(conn)
+    wal_bytes = os.path.getsize(path + "-wal") if os.path.exists(path + "-wal") else 0
+
+    latencies = []
+    for i in range(reads):
+        start = time.perf_counter()
+        if i % 2:
+            conn.execute("SELECT * FROM login_sessions WHERE id = ?", (random.randint(1, rows),)).fetchone()
+        else:
+            conn.execute("SELECT count(*), max(login_time) FROM login_sessions WHERE user_id = ?", (random.randint(1, 5000),)).fetchone()
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+    latencies.sort()
+    return {
+        "wal_mb": wal_bytes / 1024 / 1024,
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p95_us": latencies[int(len(latencies) * 0.95) - 1] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--updates", type=int, default=50000)
+    parser.add_argument("--reads", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="sqlite-tuning-"), "bench.db")
+    holder = build(path, args.rows, args.updates)
+    print(f"{'profile':<10}{'WAL MB':>10}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+    # Baseline first: the tuned run checkpoints the WAL away
+    for label, tuned in (("baseline", False), ("tuned", True)):
+        result = measure(path, args.rows, args.reads, tuned)
+        print(f"{label:<10}{result['wal_mb']:>10.1f}{result['p50_us']:>10.1f}{result['p95_us']:>10.1f}{result['p99_us']:>10.1f}")
+    holder.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SQLite write throughput, direct commits vs the single-writer queue.
+
+Spawns several processes (standing in for gunicorn workers), each with a
+thread pool issuing the login-session and RSVP writes the hot endpoints
+perform, against a scratch database. Reports committed writes per second
+and how many writes failed with "database is locked".
+
+Usage:
+    python benchmark_sqlite_writes.py [--workers 4] [--threads 8] [--writes 500]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+
+def worker(worker_id: int, threads: int, writes: int):
+    """Runs inside a child process with DATABASE_URL / SQLITE_WRITE_MODE set."""
+    import models
+    import sqlite_writer
+    from database import SessionLocal
+    from main import record_login, record_public_rsvp
+
+    def one_write(i: int):
+        db = SessionLocal()
+        try:
+            if i % 2:
+                job = lambda s: record_login(s, 1 + i % 50, f"10.{worker_id}.{i % 256}.1", "Mozilla/5.0 (X11; Linux x86_64) Firefox/128.0")
+            else:
+                job = lambda s: record_public_rsvp(s, 1, f"guest{worker_id}-{i}@example.com", "attending")
+            sqlite_writer.run_write(db, job)
+            return "ok"
+        except Exception as e:
+            db.rollback()
+            return "locked" if "locked" in str(e) else f"error: {e}"
+        finally:
+            db.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one_write, range(writes)))
+    elapsed = time.perf_counter() - start
+    ok, locked = results.count("ok"), results.count("locked")
+    print(ok, locked, len(results) - ok - locked, elapsed)
+
+
+def seed():
+    import models
+    from database import engine, SessionLocal
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for i in range(1, 51):
+            db.add(models.User(email=f"bench{i}@example.com", username=f"bench{i}", full_name=f"Bench {i}", hashed_password="x"))
+        db.add(models.Event(title="Bench event", start_date=datetime(2030, 1, 1), location="Online"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_mode(mode: str, args) -> dict:
+    directory = tempfile.mkdtemp(prefix="sqlite-writes-")
+    url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    env = dict(os.environ, DATABASE_URL=url, SQLITE_WRITE_MODE=mode)
+    script = os.path.abspath(__file__)
+    subprocess.run([sys.executable, script, "--seed"], env=env, check=True)
+
+    children = [
+        subprocess.Popen(
+            [sys.executable, script, "--child", str(i), "--threads", str(args.threads), "--writes", str(args.writes)],
+            env=env, stdout=subprocess.PIPE, text=True,
+        )
+        for i in range(args.workers)
+    ]
+    ok = locked = errors = 0
+    elapsed = 0.0
+    for child in children:
+        out, _ = child.communicate()
+        counts = out.strip().splitlines()[-1].split()
+        ok, locked, errors = ok + int(counts[0]), locked + int(counts[1]), errors + int(counts[2])
+        # Workers start at slightly different times; the slowest one bounds throughput
+        elapsed = max(elapsed, float(counts[3]))
+    return {"mode": mode, "ok": ok, "locked": locked, "errors": errors, "throughput": ok / elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=500, help="writes per worker")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--seed", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        seed()
+        return
+    if args.child is not None:
+        worker(args.child, args.threads, args.writes)
+        return
+
+    print(f"{'mode':<8}{'writes/s':>10}{'ok':>8}{'locked':>8}{'errors':>8}")
+    for mode in ("direct", "queue"):
+        result = run_mode(mode, args)
+        print(f"{result['mode']:<8}{result['throughput']:>10.0f}{result['ok']:>8}{result['locked']:>8}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -7,8 +7,11 @@ set -o nounset
 echo "Installing dependencies..."
 pip install -r requirements.txt
 
-echo "Initializing database..."
-python init_db.py
+echo "Precompiling bytecode..."
+python -m compileall -q .
+
+echo "Applying database migrations..."
+python migrate.py
 
 # Create default admin user for production if doesn't exist
 echo "Setting up admin user..."
@@ -1,13 +1,19 @@
 import os
+import time
 import logging
-from typing import Generator
+import threading
+from typing import Generator, AsyncGenerator
 from contextlib import contextmanager
 
 from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from dotenv import load_dotenv
 
+from pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool, IdleConnectionValidator, instrument_engine, POOL_VALIDATION
+from sqlite_tuning import apply_pragmas, SQLiteMaintenance, SQLITE_MAINTENANCE
+
 # Configure logging for better visibility
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -16,13 +22,14 @@ logger = logging.getLogger(__name__)
 # Load environment variables - in production, Railway will provide these
 load_dotenv()
 
-# Debug available environment variables related to databases
-logger.info("Database Environment Variables:")
-for key, value in os.environ.items():
-    if "DATABASE" in key or "DB_" in key:
-        # Mask the value for security
-        masked_value = value[:10] + "..." if value and len(value) > 12 else value
-        logger.info(f"  {key}: {masked_value}")
+# Debug available environment variables related to databases (LOG_LEVELS=database=DEBUG)
+if logger.isEnabledFor(logging.DEBUG):
+    logger.debug("Database Environment Variables:")
+    for key, value in os.environ.items():
+        if "DATABASE" in key or "DB_" in key:
+            # Mask the value for security
+            masked_value = value[:10] + "..." if value and len(value) > 12 else value
+            logger.debug(f"  {key}: {masked_value}")
 
 # First check for RAILWAY_DATABASE_URL, then DATABASE_URL, then fallback to SQLite
 if os.getenv("RAILWAY_DATABASE_URL"):
@@ -56,6 +63,14 @@ else:
 
 DEBUG_SQL = os.getenv("DEBUG_SQL", "False").lower() in ('true', '1', 't')
 
+# Pool sizing is per engine and worker process. The primary has a sync and an
+# async engine (ASYNC_DB_ENABLED), and each read replica one more; every one is
+# sized DB_POOL_SIZE + DB_MAX_OVERFLOW. Connections per database server =
+# workers * engines on it * (size + overflow)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "4"))
+
 # Create engine with appropriate parameters based on the database type
 try:
     if DATABASE_URL.startswith('sqlite'):
@@ -64,41 +79,32 @@ try:
         engine = create_engine(
             DATABASE_URL,
             connect_args={"check_same_thread": False},
+            poolclass=InstrumentedQueuePool,
             echo=DEBUG_SQL
         )
         
-        # Add pragma for better SQLite performance
+        # Add pragma for better SQLite performance (tuning profile in sqlite_tuning.py)
         @event.listens_for(engine, "connect")
         def set_sqlite_pragma(dbapi_connection, connection_record):
-            cursor = dbapi_connection.cursor()
-            cursor.execute("PRAGMA journal_mode=WAL;")
-            cursor.execute("PRAGMA synchronous=NORMAL;")
-            cursor.execute("PRAGMA foreign_keys=ON;")
-            cursor.close()
+            apply_pragmas(dbapi_connection)
             
     else:
         # PostgreSQL configuration for Railway
         logger.info("Configuring PostgreSQL engine")
         engine = create_engine(
             DATABASE_URL,
-            pool_size=10,
-            max_overflow=20,
-            pool_pre_ping=True,  # Help detect stale connections
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            # Help detect stale connections, unless idle connections are validated in the background
+            pool_pre_ping=POOL_VALIDATION != "background",
             pool_recycle=300,    # Recycle connections every 5 minutes
             echo=DEBUG_SQL
         )
         logger.info("Successfully configured PostgreSQL engine")
     
-    # Test the engine connection immediately - Make sure to use text() function
-    logger.info("Testing database connection...")
-    try:
-        with engine.connect() as conn:
-            # IMPORTANT: Use text() to create a proper SQL expression
-            query_result = conn.execute(text("SELECT 1")).scalar()
-            logger.info(f"Database connection test successful: {query_result}")
-    except Exception as e:
-        logger.error(f"Database connection test failed: {str(e)}")
-        raise
+    # Pool instrumentation (see pool_metrics.py)
+    instrument_engine(engine)
     
 except exc.SQLAlchemyError as e:
     logger.error(f"Database connection error: {str(e)}")
@@ -119,10 +125,197 @@ except exc.SQLAlchemyError as e:
         # If we're already using SQLite and it failed, re-raise the error
         raise
 
+def test_connection() -> bool:
+    """SELECT 1 on the primary; run by the app's startup hook, not at import."""
+    logger.info("Testing database connection...")
+    try:
+        with engine.connect() as conn:
+            # IMPORTANT: Use text() to create a proper SQL expression
+            query_result = conn.execute(text("SELECT 1")).scalar()
+        logger.info(f"Database connection test successful: {query_result}")
+        return True
+    except Exception as e:
+        logger.error(f"Database connection test failed: {str(e)}")
+        return False
+
+# Idle connection validation (DB_POOL_VALIDATION=background); started per worker from main.py
+pool_validator = IdleConnectionValidator(engine) if POOL_VALIDATION == "background" else None
+
+# WAL checkpointing, PRAGMA optimize and ANALYZE; started per worker from main.py
+sqlite_maintenance = None
+if DATABASE_URL.startswith('sqlite') and SQLITE_MAINTENANCE:
+    sqlite_maintenance = SQLiteMaintenance(engine, DATABASE_URL)
+
+# --- Read replicas ---
+# DATABASE_REPLICA_URLS is an optional comma-separated list of read-only replicas.
+# Sessions flagged with info["use_replica"] send their reads to a healthy replica;
+# anything that flushes, and every other session, goes to the primary.
+REPLICA_URLS = [url.strip().replace('postgres://', 'postgresql://', 1)
+                for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+def create_replica_engine(url: str):
+    """Read-only engine with the primary's pool sizing and instrumentation."""
+    if url.startswith('sqlite'):
+        replica = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=InstrumentedQueuePool,
+            echo=DEBUG_SQL
+        )
+
+        @event.listens_for(replica, "connect")
+        def set_replica_pragma(dbapi_connection, connection_record):
+            apply_pragmas(dbapi_connection, read_only=True)
+    else:
+        replica = create_engine(
+            url,
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            # The background validator only covers the primary
+            pool_pre_ping=True,
+            pool_recycle=300,
+            echo=DEBUG_SQL
+        )
+    return instrument_engine(replica)
+
+class ReplicaSet:
+    """Tracks replica health and lag via a heartbeat row written to the primary.
+    
+    A background thread periodically stamps replication_heartbeat on the
+    primary and reads it back from each replica; the difference is the
+    replica's lag. Replicas that lag more than REPLICA_MAX_LAG_SECONDS or
+    fail to answer are skipped until they catch up.
+    """
+
+    def __init__(self, primary, urls):
+        self.primary = primary
+        self.engines = [create_replica_engine(url) for url in urls]
+        self.status = [{"healthy": False, "lag_seconds": None, "error": None} for _ in self.engines]
+        self._next = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not self.engines or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self.check()
+                self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(REPLICA_CHECK_SECONDS)
+            self.check()
+
+    def check(self):
+        now = time.time()
+        try:
+            with self.primary.begin() as conn:
+                updated = conn.execute(text("UPDATE replication_heartbeat SET beat_at = :now WHERE id = 1"), {"now": now})
+                if updated.rowcount == 0:
+                    conn.execute(text("INSERT INTO replication_heartbeat (id, beat_at) VALUES (1, :now)"), {"now": now})
+        except exc.SQLAlchemyError as e:
+            logger.error(f"Failed to write replication heartbeat: {str(e)}")
+            return
+        for i, replica in enumerate(self.engines):
+            try:
+                with replica.connect() as conn:
+                    beat_at = conn.execute(text("SELECT beat_at FROM replication_heartbeat WHERE id = 1")).scalar()
+                # A replica that has not replayed the beat just written still shows
+                # the previous one, hence the extra check interval of allowance
+                lag = max(0.0, now - beat_at) if beat_at is not None else None
+                healthy = lag is not None and lag <= REPLICA_MAX_LAG_SECONDS + REPLICA_CHECK_SECONDS
+                self.status[i] = {"healthy": healthy, "lag_seconds": lag, "error": None}
+            except exc.SQLAlchemyError as e:
+                self.status[i] = {"healthy": False, "lag_seconds": None, "error": str(e)}
+            if not self.status[i]["healthy"]:
+                logger.warning(f"Replica {i} unavailable for reads: {self.status[i]}")
+
+    def pick(self):
+        """Round-robin over healthy replicas; None means use the primary."""
+        healthy = [i for i, status in enumerate(self.status) if status["healthy"]]
+        if not healthy:
+            return None
+        self._next = (self._next + 1) % len(healthy)
+        return self.engines[healthy[self._next]]
+
+replica_set = ReplicaSet(engine, REPLICA_URLS)
+if REPLICA_URLS:
+    logger.info(f"Configured {len(REPLICA_URLS)} read replica(s)")
+
+# SQLITE_WRITE_MODE=queue sends hot-path writes through one writer thread
+# (see sqlite_writer.py) and serves read-only sessions from query_only connections.
+SQLITE_WRITE_MODE = os.getenv("SQLITE_WRITE_MODE", "direct")
+read_only_engine = None
+if SQLITE_WRITE_MODE == "queue" and DATABASE_URL.startswith('sqlite'):
+    read_only_engine = create_replica_engine(DATABASE_URL)
+    logger.info("SQLite writer queue enabled with read-only connection pool")
+
+class RoutingSession(Session):
+    """Session that routes reads to a replica when flagged with info["use_replica"]."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("use_replica") and not self._flushing:
+            replica = self.info.get("replica_engine")
+            if replica is None:
+                replica = self.info["replica_engine"] = replica_set.pick() or read_only_engine or engine
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# --- Async engine ---
+# Async endpoints use an AsyncSession so they never block the event loop.
+# The driver is derived from DATABASE_URL: aiosqlite for SQLite, asyncpg for PostgreSQL.
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB_ENABLED", "True").lower() in ('true', '1', 't')
+
+def get_async_database_url(url: str) -> str:
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB_ENABLED:
+    try:
+        if DATABASE_URL.startswith('sqlite'):
+            async_engine = create_async_engine(
+                get_async_database_url(DATABASE_URL),
+                poolclass=InstrumentedAsyncQueuePool,
+                echo=DEBUG_SQL
+            )
+
+            @event.listens_for(async_engine.sync_engine, "connect")
+            def set_async_sqlite_pragma(dbapi_connection, connection_record):
+                apply_pragmas(dbapi_connection)
+        else:
+            async_engine = create_async_engine(
+                get_async_database_url(DATABASE_URL),
+                poolclass=InstrumentedAsyncQueuePool,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                # The background validator only covers the sync pool
+                pool_pre_ping=True,
+                pool_recycle=300,
+                echo=DEBUG_SQL
+            )
+        instrument_engine(async_engine.sync_engine)
+        # expire_on_commit=False: async code cannot lazy-load expired attributes
+        AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+        logger.info("Configured async database engine")
+    except ImportError as e:
+        logger.warning(f"Async database driver not available, async endpoints disabled: {str(e)}")
+
 # FastAPI dependency for DB session
 def get_db() -> Generator[Session, None, None]:
     """Dependency for FastAPI to get a database session.
@@ -143,6 +336,33 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
         
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for async FastAPI endpoints to get an AsyncSession.
+    
+    Yields:
+        AsyncSession: The SQLAlchemy async session
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database engine is not configured")
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except exc.SQLAlchemyError as e:
+            logger.error(f"Database error during request: {str(e)}")
+            await db.rollback()
+            raise
+        
+def get_read_session(stick_to_primary: bool = False) -> Session:
+    """Create a session whose reads go to a replica, unless told to stick to the primary."""
+    db = SessionLocal()
+    if replica_set.engines and not stick_to_primary:
+        replica_set.start()
+        db.info["use_replica"] = True
+    elif read_only_engine is not None:
+        # Same database file, so read-your-writes holds without stickiness
+        db.info["use_replica"] = True
+    return db
+        
 @contextmanager
 def get_db_context() -> Generator[Session, None, None]:
     """Context manager for getting a database session outside of FastAPI requests.
@@ -0,0 +1,119 @@
+"""
+Serialization fast path for large list responses.
+
+For an endpoint with response_model=List[X] FastAPI validates the returned ORM
+objects (from_attributes), dumps the models to Python dicts, then encodes those
+with the response class - the last two steps on the event loop, even for sync
+endpoints. ListSerializer(X) does it in the endpoint instead (the threadpool,
+for sync endpoints) and returns JSON bytes:
+
+  - ListSerializer(X): a TypeAdapter for List[X] built once; rows are
+    validated from attributes in one pass and encoded by pydantic-core
+  - ListSerializer(X, trusted=True): no validation. X's fields (and those of
+    nested schemas) are read straight off the ORM objects and encoded with
+    orjson. For rows from the endpoint's own query whose columns already
+    satisfy the schema; refused for schemas with validators or custom
+    serializers, which could change what is sent
+
+The endpoint returns the Response, which FastAPI sends as is, and keeps its
+response_model for the OpenAPI schema. benchmark_serialization.py compares
+both with FastAPI's default path per endpoint and checks the JSON is the same.
+
+Everything else goes through FastAPI's usual path and is rendered by the
+app's default response class, FastJSONResponse (orjson).
+"""
+
+import typing
+from decimal import Decimal
+
+import orjson
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from starlette.responses import Response
+
+import tracing
+
+# UTC as "Z", like pydantic's JSON output
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class FastJSONResponse(ORJSONResponse):
+    """ORJSONResponse with the fast path's options, so both render values the same way."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _unwrap(annotation):
+    """(is a list, BaseModel class or None) for X, Optional[X], List[X], Optional[List[X]]."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _unwrap(args[0]) if len(args) == 1 else (False, None)
+    if origin in (list, typing.List):
+        args = typing.get_args(annotation)
+        return True, _unwrap(args[0])[1] if args else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return False, annotation
+    return False, None
+
+
+def _plan(schema, parents=()):
+    """[(field, is a list, nested plan, default)] for reading `schema` off an object."""
+    if schema in parents:
+        raise ValueError(f"{schema.__name__} is recursive; it cannot be serialized without validation")
+    decorators = schema.__pydantic_decorators__
+    if any((decorators.validators, decorators.field_validators, decorators.root_validators, decorators.model_validators,
+            decorators.field_serializers, decorators.model_serializers, decorators.computed_fields)):
+        raise ValueError(f"{schema.__name__} has validators or serializers; it cannot be serialized without validation")
+    hints = typing.get_type_hints(schema)
+    plan = []
+    for name, field in schema.model_fields.items():
+        many, model = _unwrap(hints.get(name, field.annotation))
+        default = None if field.is_required() else field.get_default(call_default_factory=True)
+        plan.append((name, many, _plan(model, parents + (schema,)) if model is not None else None, default))
+    return plan
+
+
+def _extract(obj, plan) -> dict:
+    row = {}
+    for name, many, nested, default in plan:
+        value = getattr(obj, name, default)
+        if nested is not None and value is not None:
+            value = [_extract(item, nested) for item in value] if many else _extract(value, nested)
+        row[name] = value
+    return row
+
+
+class ListSerializer:
+    def __init__(self, schema, trusted: bool = False):
+        self.schema = schema
+        self.trusted = trusted
+        if trusted:
+            self.plan = _plan(schema)
+        else:
+            self.adapter = TypeAdapter(typing.List[schema])
+
+    def dumps(self, rows) -> bytes:
+        if self.trusted:
+            return orjson.dumps([_extract(row, self.plan) for row in rows], default=_default, option=ORJSON_OPTIONS)
+        try:
+            value = self.adapter.validate_python(rows, from_attributes=True)
+        except ValidationError as e:
+            # Same outcome as a failing response_model: a 500 with the errors logged
+            raise ResponseValidationError(errors=e.errors(include_url=False), body=rows)
+        return self.adapter.dump_json(value)
+
+    def response(self, rows, status_code: int = 200) -> Response:
+        with tracing.span("fast_json.serialize", schema=self.schema.__name__, rows=len(rows), trusted=self.trusted):
+            body = self.dumps(rows)
+        return Response(body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for load tests and benchmarks.
+
+Fills an empty database (migrated to head first) with realistic volume:
+
+  - tags, contact tags and mentor tags follow a Zipf distribution
+  - user activity is Zipf too: a few members log in and RSVP a lot
+  - logins are bursty: a diurnal cycle, quieter weekends and decaying bursts
+    (semester starts, announcements) on top of a slow growth trend
+  - event popularity is Zipf and RSVPs pile up in the days before the event
+  - login sessions carry packed IPs and interned user agents like the app's
+
+Output depends only on --seed and the counts: every table draws from its own
+random stream and timestamps are relative to --now, not the wall clock, so a
+benchmark run can be reproduced exactly. Ids are assigned here, which is why
+the target tables must be empty.
+
+Rows are written through the fastest path per backend: COPY ... FROM STDIN on
+PostgreSQL, executemany on a raw connection in one transaction per table with
+synchronous=OFF and an in-memory journal on SQLite (restored afterwards), and
+batched Core inserts elsewhere.
+
+Usage:
+    python generate_dataset.py                          # default volume (~4.5M rows)
+    python generate_dataset.py --scale 0.1 --seed 7     # a tenth of everything
+    python generate_dataset.py --contacts 500000 --login-sessions 2000000
+    python generate_dataset.py --database-url sqlite:///load.db
+"""
+
+import io
+import os
+import sys
+import csv
+import math
+import time
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COUNTS = {
+    "users": 50000,
+    "contacts": 500000,
+    "tags": 300,
+    "mentors": 5000,
+    "mentor_requests": 100000,
+    "events": 20000,
+    "rsvps": 2000000,
+    "login_sessions": 2000000,
+    "tasks": 100000,
+    "newsletters": 1000,
+}
+DEFAULT_NOW = datetime(2026, 1, 1)
+DEFAULT_PASSWORD = "password123"
+# Days of history the timestamps are spread over
+HISTORY_DAYS = 730
+BATCH_SIZE = int(os.getenv("DATASET_BATCH_SIZE", "50000"))
+ZIPF_EXPONENT = 1.1
+BCRYPT_ALPHABET = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+FIRST_NAMES = ["Ava", "Ben", "Chloe", "Daniel", "Elena", "Farah", "Gabriel", "Hana", "Ivan", "Jia", "Kofi", "Lena",
+               "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Sami", "Tara", "Umar", "Vera", "Wei", "Yusuf", "Zoe"]
+LAST_NAMES = ["Adams", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Haddad", "Ito", "Johnson", "Kim",
+              "Lopez", "Martin", "Nguyen", "Okafor", "Patel", "Rossi", "Singh", "Tanaka", "Usman", "Weber", "Zhang"]
+EMAIL_DOMAINS = ["gmail.com", "sjsu.edu", "outlook.com", "yahoo.com", "stanford.edu", "berkeley.edu", "icloud.com",
+                 "proton.me", "hotmail.com", "ucsc.edu"]
+TOPICS = ["AI/ML", "Computer Science", "Startup", "Data Science", "Engineering", "Cybersecurity", "Software Development",
+          "Robotics", "Biotechnology", "Business", "Healthcare", "Hardware", "Mathematics", "Physics", "Chemistry",
+          "Education", "Environmental Science", "Government", "Non-profit", "Corporate", "Faculty", "Alumni"]
+ORGANIZATIONS = ["SJSU", "Stanford", "UC Berkeley", "Google", "NVIDIA", "Apple", "Genentech", "NASA Ames", "Intuit",
+                 "Cisco", "Salesforce", "Adobe", "PayPal", "Tesla", "Kaiser Permanente"]
+MENTOR_TYPES = ["Faculty", "Industry Professional", "Research Scientist", "Alumni", "Founder"]
+LOCATIONS = ["San Jose, CA", "Palo Alto, CA", "Santa Clara, CA", "San Francisco, CA", "Mountain View, CA", "Remote"]
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:128.0) Gecko/20100101 Firefox/128.0",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36 Edg/126.0.0.0",
+    "Mozilla/5.0 (iPad; CPU OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 13; SM-S911B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Mobile Safari/537.36",
+]
+# Relative login activity per hour of day (local time)
+HOURLY_WEIGHTS = [1, 0.6, 0.4, 0.3, 0.3, 0.5, 1, 2, 3.5, 5, 6, 6.5, 6, 6.5, 6, 5.5, 5, 4.5, 4.5, 5, 5.5, 5, 3.5, 2]
+
+
+def zipf_cum_weights(n: int, exponent: float = ZIPF_EXPONENT) -> list:
+    """Cumulative Zipf weights for ranks 1..n, for random.choices(cum_weights=...)."""
+    total, cumulative = 0.0, []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+
+def user_email(user_id: int) -> str:
+    return f"user{user_id}@{EMAIL_DOMAINS[user_id % len(EMAIL_DOMAINS)]}"
+
+
+def scaled(counts: dict, factor: float) -> dict:
+    return {table: max(1, int(count * factor)) for table, count in counts.items()}
+
+
+class ActivityClock:
+    """Draws bursty timestamps over the last HISTORY_DAYS days before `now`."""
+
+    def __init__(self, rng: random.Random, now: datetime, days: int = HISTORY_DAYS):
+        self.rng = rng
+        self.start = now - timedelta(days=days)
+        bursts = sorted(rng.sample(range(days), k=max(1, days // 21)))
+        weights = []
+        for day in range(days):
+            weight = 0.5 + day / days  # the community grows
+            if (self.start + timedelta(days=day)).weekday() >= 5:
+                weight *= 0.6
+            for burst in bursts:
+                if burst <= day < burst + 14:
+                    weight += 3.0 * math.exp(-(day - burst) / 3.0)
+            weights.append(weight)
+        self.day_weights = list(_accumulate(weights))
+        self.hour_weights = list(_accumulate(HOURLY_WEIGHTS))
+        self.days = range(days)
+        self.hours = range(24)
+
+    def sample(self, k: int) -> list:
+        days = self.rng.choices(self.days, cum_weights=self.day_weights, k=k)
+        hours = self.rng.choices(self.hours, cum_weights=self.hour_weights, k=k)
+        return [self.start + timedelta(days=day, hours=hour, seconds=self.rng.randrange(3600))
+                for day, hour in zip(days, hours)]
+
+
+def _accumulate(values):
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+def _batched(k: int):
+    """Yield batch sizes covering k rows."""
+    for offset in range(0, k, BATCH_SIZE):
+        yield min(BATCH_SIZE, k - offset)
+
+
+class DatasetGenerator:
+    """Row generators per table; each table has its own random stream."""
+
+    def __init__(self, counts: dict, seed: int = 42, now: datetime = DEFAULT_NOW, password_hash: str = ""):
+        self.counts = counts
+        self.seed = seed
+        self.now = now
+        self.password_hash = password_hash
+        self.tag_names = (TOPICS + [f"topic-{i}" for i in range(counts["tags"])])[:counts["tags"]]
+        self.tag_weights = zipf_cum_weights(len(self.tag_names))
+        # Zipf rank -> user id, so heavy users are spread over the id range
+        users = self.rng("user-ranks")
+        self.active_users = list(range(1, counts["users"] + 1))
+        users.shuffle(self.active_users)
+        self.user_weights = zipf_cum_weights(counts["users"], 0.8)
+        self.event_starts = {}
+
+    def rng(self, table: str) -> random.Random:
+        return random.Random(f"{self.seed}:{table}")
+
+    def name(self, rng: random.Random) -> str:
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+    def users(self):
+        rng, clock = self.rng("users"), ActivityClock(self.rng("users-clock"), self.now)
+        admins = max(1, self.counts["users"] // 10000)
+        for user_id in range(1, self.counts["users"] + 1):
+            interests = sorted(set(rng.choices(TOPICS, k=rng.randint(0, 4))))
+            joined = clock.sample(1)[0]
+            yield dict(
+                id=user_id, email=user_email(user_id), username=f"user{user_id}",
+                hashed_password=self.password_hash, full_name=self.name(rng), bio=None, profile_image=None,
+                is_active=rng.random() > 0.02, role="admin" if user_id <= admins else "member", interests=interests,
+                logins=0, rsvps=0, mentor_requests=0, last_login=None, created_at=joined, updated_at=joined,
+            )
+
+    def tags(self):
+        for tag_id, name in enumerate(self.tag_names, 1):
+            yield dict(id=tag_id, name=name)
+
+    def contacts(self):
+        rng, clock = self.rng("contacts"), ActivityClock(self.rng("contacts-clock"), self.now)
+        # The first users also appear as contacts linked to their account
+        linked = min(self.counts["users"], self.counts["contacts"] // 10)
+        for contact_id in range(1, self.counts["contacts"] + 1):
+            yield dict(
+                id=contact_id, email=f"contact{contact_id}@{rng.choice(EMAIL_DOMAINS)}", full_name=self.name(rng),
+                created_at=clock.sample(1)[0], user_id=contact_id if contact_id <= linked else None,
+            )
+
+    def contact_tags(self):
+        rng = self.rng("contact-tags")
+        tag_ids = range(1, len(self.tag_names) + 1)
+        for contact_id in range(1, self.counts["contacts"] + 1):
+            k = rng.choices((0, 1, 2, 3), weights=(2, 4, 3, 1))[0]
+            for tag_id in sorted(set(rng.choices(tag_ids, cum_weights=self.tag_weights, k=k))):
+                yield dict(contact_id=contact_id, tag_id=tag_id)
+
+    def mentors(self):
+        rng = self.rng("mentors")
+        for mentor_id in range(1, self.counts["mentors"] + 1):
+            tags = sorted(set(rng.choices(self.tag_names, cum_weights=self.tag_weights, k=rng.randint(1, 4))))
+            created = self.now - timedelta(days=rng.randrange(HISTORY_DAYS))
+            yield dict(
+                id=mentor_id, full_name=self.name(rng), email=f"mentor{mentor_id}@{rng.choice(EMAIL_DOMAINS)}",
+                organization=rng.choice(ORGANIZATIONS), bio="Happy to talk about research and careers.",
+                expertise=", ".join(tags), mentor_type=rng.choice(MENTOR_TYPES), location=rng.choice(LOCATIONS),
+                is_virtual=rng.random() < 0.4, tags=",".join(tags), contact_requests=0,
+                created_at=created, updated_at=created,
+            )
+
+    def mentor_requests(self):
+        rng, clock = self.rng("mentor-requests"), ActivityClock(self.rng("mentor-requests-clock"), self.now)
+        mentor_weights = zipf_cum_weights(self.counts["mentors"])
+        mentor_ids = range(1, self.counts["mentors"] + 1)
+        request_id = 0
+        for k in _batched(self.counts["mentor_requests"]):
+            mentors = rng.choices(mentor_ids, cum_weights=mentor_weights, k=k)
+            users = rng.choices(self.active_users, cum_weights=self.user_weights, k=k)
+            for mentor_id, user_id, created in zip(mentors, users, clock.sample(k)):
+                request_id += 1
+                member = rng.random() < 0.7
+                yield dict(
+                    id=request_id, mentor_id=mentor_id, user_id=user_id if member else None,
+                    contact_name=self.name(rng),
+                    contact_email=user_email(user_id) if member else f"guest{request_id}@example.com",
+                    contact_major=rng.choice(TOPICS), contact_year=rng.choice(["Freshman", "Sophomore", "Junior", "Senior", "Graduate"]),
+                    reason="Would love advice on getting into research.",
+                    status=rng.choices(["pending", "approved", "declined"], weights=(5, 3, 2))[0], created_at=created,
+                )
+
+    def events(self):
+        rng = self.rng("events")
+        for event_id in range(1, self.counts["events"] + 1):
+            # Mostly past events, some upcoming
+            start = self.now + timedelta(days=rng.randint(-HISTORY_DAYS, 90), hours=rng.choice((12, 17, 18, 19)))
+            self.event_starts[event_id] = start
+            yield dict(
+                id=event_id, title=f"{rng.choice(TOPICS)} {rng.choice(['Meetup', 'Workshop', 'Talk', 'Hackathon', 'Panel'])} #{event_id}",
+                description="Join us for talks, demos and networking.", start_date=start,
+                end_date=start + timedelta(hours=rng.choice((1, 2, 3))), location=rng.choice(LOCATIONS),
+                created_at=start - timedelta(days=rng.randint(7, 60)), updated_at=start - timedelta(days=rng.randint(0, 7)),
+            )
+
+    def rsvps(self):
+        rng = self.rng("rsvps")
+        if not self.event_starts:
+            for _ in self.events():
+                pass
+        # Popularity rank -> event id
+        events = list(range(1, self.counts["events"] + 1))
+        rng.shuffle(events)
+        event_weights = zipf_cum_weights(len(events))
+        seen = set()
+        rsvp_id = 0
+        for k in _batched(self.counts["rsvps"]):
+            picks = rng.choices(events, cum_weights=event_weights, k=k)
+            users = rng.choices(self.active_users, cum_weights=self.user_weights, k=k)
+            for event_id, user_id in zip(picks, users):
+                member = rng.random() < 0.6
+                key = event_id * (self.counts["users"] + 1) + user_id
+                if member and key in seen:
+                    member = False  # members RSVP once per event
+                rsvp_id += 1
+                if member:
+                    seen.add(key)
+                # Most RSVPs land in the last days before the event
+                created = min(self.event_starts[event_id] - timedelta(hours=rng.expovariate(1 / 60.0)), self.now)
+                yield dict(
+                    id=rsvp_id, event_id=event_id, user_id=user_id if member else None,
+                    email=user_email(user_id) if member else f"guest{rsvp_id}@example.com",
+                    rsvp_status=rng.choices(["confirmed", "declined", "maybe"], weights=(8, 1, 1))[0], created_at=created,
+                )
+
+    def user_agents(self):
+        from telemetry import parse_user_agent
+        for agent_id, user_agent in enumerate(USER_AGENTS, 1):
+            yield dict(id=agent_id, user_agent=user_agent, created_at=self.now - timedelta(days=HISTORY_DAYS),
+                       **parse_user_agent(user_agent))
+
+    def login_sessions(self):
+        from telemetry import pack_ip
+        rng, clock = self.rng("login-sessions"), ActivityClock(self.rng("login-sessions-clock"), self.now)
+        agent_ids = range(1, len(USER_AGENTS) + 1)
+        agent_weights = zipf_cum_weights(len(USER_AGENTS), 1.3)
+        session_id = 0
+        for k in _batched(self.counts["login_sessions"]):
+            users = rng.choices(self.active_users, cum_weights=self.user_weights, k=k)
+            agents = rng.choices(agent_ids, cum_weights=agent_weights, k=k)
+            for user_id, agent_id, login_time in zip(users, agents, clock.sample(k)):
+                session_id += 1
+                if rng.random() < 0.8:
+                    # Home network: stable per user
+                    ip = f"73.{user_id >> 16 & 255}.{user_id >> 8 & 255}.{user_id & 255}"
+                else:
+                    ip = f"{rng.randint(11, 223)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randint(1, 254)}"
+                yield dict(id=session_id, user_id=user_id, login_time=login_time, ip_packed=pack_ip(ip),
+                           user_agent_id=agent_id, ip_address=None, user_agent=None)
+
+    def tasks(self):
+        rng = self.rng("tasks")
+        admins = max(1, self.counts["users"] // 10000)
+        for task_id in range(1, self.counts["tasks"] + 1):
+            created = self.now - timedelta(days=rng.randrange(HISTORY_DAYS), seconds=rng.randrange(86400))
+            yield dict(
+                id=task_id, title=f"Follow up with {self.name(rng)}", description=None,
+                due_date=created + timedelta(days=rng.randint(1, 30)) if rng.random() < 0.7 else None,
+                status="completed" if created < self.now - timedelta(days=30) and rng.random() < 0.8 else "pending",
+                assigned_to_id=rng.randint(1, self.counts["users"]), created_by_id=rng.randint(1, admins), created_at=created,
+            )
+
+    def newsletters(self):
+        rng = self.rng("newsletters")
+        for newsletter_id in range(1, self.counts["newsletters"] + 1):
+            published = self.now - timedelta(days=rng.randrange(HISTORY_DAYS))
+            yield dict(
+                id=newsletter_id, title=f"{rng.choice(TOPICS)} digest #{newsletter_id}",
+                content="This week: upcoming events, mentor spotlights and open research positions.",
+                image=None, publish_date=published, created_at=published, updated_at=published,
+            )
+
+
+# Insert order respects foreign keys: (generator method, table)
+TABLES = [
+    ("users", "users"),
+    ("tags", "tags"),
+    ("contacts", "contacts"),
+    ("contact_tags", "contact_tags"),
+    ("mentors", "research_opportunities"),
+    ("mentor_requests", "mentor_contact_requests"),
+    ("events", "events"),
+    ("rsvps", "event_rsvps"),
+    ("user_agents", "user_agents"),
+    ("login_sessions", "login_sessions"),
+    ("tasks", "tasks"),
+    ("newsletters", "newsletters"),
+]
+
+
+class _Loader:
+    """Batched inserts through SQLAlchemy Core; the portable fallback."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def load(self, table, rows) -> int:
+        from sqlalchemy import insert
+        total, batch = 0, []
+        with self.engine.begin() as conn:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    conn.execute(insert(table), batch)
+                    total, batch = total + len(batch), []
+            if batch:
+                conn.execute(insert(table), batch)
+                total += len(batch)
+        return total
+
+    def _processors(self, table, dialect):
+        return [(column.name, column.type.dialect_impl(dialect).bind_processor(dialect)) for column in table.columns]
+
+
+class _SQLiteLoader(_Loader):
+    """executemany on one raw connection, a transaction per table, relaxed durability."""
+
+    def __enter__(self):
+        # Leaving WAL mode needs the only connection to the file
+        self.engine.dispose()
+        self.connection = self.engine.raw_connection()
+        self.connection.driver_connection.isolation_level = None  # explicit BEGIN/COMMIT
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        mode = cursor.execute("PRAGMA journal_mode=MEMORY").fetchone()[0]
+        if mode != "memory":
+            logger.warning(f"Could not relax journal_mode (still {mode}); inserts will be slower")
+        cursor.execute("PRAGMA cache_size=-262144")
+        return self
+
+    def __exit__(self, *exc):
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        self.connection.invalidate()
+        return False
+
+    def load(self, table, rows) -> int:
+        processors = self._processors(table, self.engine.dialect)
+        names = [name for name, _ in processors]
+        sql = f'INSERT INTO "{table.name}" ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})'
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN")
+        total, batch = 0, []
+        try:
+            for row in rows:
+                batch.append(tuple(process(row.get(name)) if process else row.get(name) for name, process in processors))
+                if len(batch) >= BATCH_SIZE:
+                    cursor.executemany(sql, batch)
+                    total, batch = total + len(batch), []
+            if batch:
+                cursor.executemany(sql, batch)
+                total += len(batch)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return total
+
+
+class _PostgresLoader(_Loader):
+    """COPY ... FROM STDIN (CSV) in batches on one raw psycopg2 connection."""
+
+    def __enter__(self):
+        self.connection = self.engine.raw_connection()
+        return self
+
+    def __exit__(self, *exc):
+        self.connection.close()
+        return False
+
+    def load(self, table, rows) -> int:
+        processors = self._processors(table, self.engine.dialect)
+        names = [name for name, _ in processors]
+        sql = f'COPY "{table.name}" ({", ".join(names)}) FROM STDIN WITH (FORMAT csv)'
+        cursor = self.connection.cursor()
+        total, buffer = 0, io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            buffer.seek(0)
+            buffer.truncate()
+
+        try:
+            for row in rows:
+                values = []
+                for name, process in processors:
+                    value = row.get(name)
+                    if isinstance(value, bytes):
+                        value = "\\x" + value.hex()
+                    elif process is not None and value is not None:
+                        value = process(value)
+                    values.append(value)  # None -> unquoted empty field -> NULL
+                writer.writerow(values)
+                total += 1
+                if total % BATCH_SIZE == 0:
+                    flush()
+            flush()
+            # Ids were supplied explicitly; move the sequence past them
+            if "id" in names:
+                cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 1)) FROM \"{table.name}\"")
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return total
+
+
+def loader_for(engine) -> _Loader:
+    if engine.dialect.name == "sqlite":
+        return _SQLiteLoader(engine)
+    if engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2":
+        return _PostgresLoader(engine)
+    return _Loader(engine)
+
+
+def refresh_counters(engine):
+    """Set the denormalized counters (users.logins, rsvps, ...) from the generated rows."""
+    from sqlalchemy import select, update, func, bindparam
+    import models
+
+    User, Mentor = models.User.__table__, models.Mentor.__table__
+    with engine.begin() as conn:
+        users = {}
+        for user_id, logins, last_login in conn.execute(
+                select(models.LoginSession.user_id, func.count(), func.max(models.LoginSession.login_time))
+                .group_by(models.LoginSession.user_id)):
+            users[user_id] = {"logins": logins, "last_login": last_login, "rsvps": 0, "mentor_requests": 0}
+        for column, counter in ((models.EventRSVP.user_id, "rsvps"), (models.MentorContactRequest.user_id, "mentor_requests")):
+            for user_id, count in conn.execute(select(column, func.count()).where(column.isnot(None)).group_by(column)):
+                users.setdefault(user_id, {"logins": 0, "last_login": None, "rsvps": 0, "mentor_requests": 0})[counter] = count
+        if users:
+            conn.execute(
+                update(User).where(User.c.id == bindparam("user_id")).values(
+                    logins=bindparam("logins"), last_login=bindparam("last_login"),
+                    rsvps=bindparam("rsvps"), mentor_requests=bindparam("mentor_requests"),
+                    updated_at=User.c.updated_at),  # skip onupdate, keep the output reproducible
+                [dict(values, user_id=user_id) for user_id, values in users.items()],
+            )
+        mentors = [{"mentor_id": mentor_id, "requests": count} for mentor_id, count in conn.execute(
+            select(models.MentorContactRequest.mentor_id, func.count()).group_by(models.MentorContactRequest.mentor_id))]
+        if mentors:
+            conn.execute(update(Mentor).where(Mentor.c.id == bindparam("mentor_id")).values(
+                contact_requests=bindparam("requests"), updated_at=Mentor.c.updated_at), mentors)
+
+
+def generate(engine, counts: dict = None, seed: int = 42, now: datetime = DEFAULT_NOW, password: str = DEFAULT_PASSWORD) -> dict:
+    """Fill the (empty) tables; returns {table: rows written}."""
+    from sqlalchemy import select, func
+    import models
+    from main import get_password_context
+
+    counts = dict(DEFAULT_COUNTS, **(counts or {}))
+    tables = models.Base.metadata.tables
+    with engine.connect() as conn:
+        populated = [name for _, name in TABLES if conn.execute(select(func.count()).select_from(tables[name])).scalar()]
+    if populated:
+        raise RuntimeError(f"Tables already contain rows: {', '.join(populated)}; generate into an empty database")
+
+    # A salt drawn from the seed keeps even the password hashes reproducible
+    salt_rng = random.Random(f"{seed}:password")
+    salt = "".join(salt_rng.choice(BCRYPT_ALPHABET) for _ in range(21)) + "."
+    password_hash = get_password_context().handler("bcrypt").using(salt=salt).hash(password)
+    generator = DatasetGenerator(counts, seed=seed, now=now, password_hash=password_hash)
+    written = {}
+    with loader_for(engine) as loader:
+        for method, name in TABLES:
+            start = time.perf_counter()
+            written[name] = loader.load(tables[name], getattr(generator, method)())
+            logger.info(f"{name}: {written[name]} rows in {time.perf_counter() - start:.1f}s")
+    refresh_counters(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset")
+    parser.add_argument("--database-url", help="target database (defaults to DATABASE_URL / app.db)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every count")
+    parser.add_argument("--now", default=DEFAULT_NOW.isoformat(), help="timestamps end here (ISO date)")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="password of every generated user")
+    for table, count in DEFAULT_COUNTS.items():
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, default=None, help=f"default {count}")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ.pop("RAILWAY_DATABASE_URL", None)
+        os.environ["DATABASE_URL"] = args.database_url
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    import migrate
+    from database import engine
+
+    migrate.upgrade()
+    counts = scaled(DEFAULT_COUNTS, args.scale)
+    counts.update({table: getattr(args, table) for table in DEFAULT_COUNTS if getattr(args, table) is not None})
+    print(f"Generating with seed {args.seed}: " + ", ".join(f"{table}={count}" for table, count in counts.items()))
+    start = time.perf_counter()
+    try:
+        written = generate(engine, counts, seed=args.seed, now=datetime.fromisoformat(args.now), password=args.password)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    total = sum(written.values())
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
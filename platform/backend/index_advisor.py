@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Missing-index advisor driven by the captured query workload.
+
+WorkloadRecorder hooks SQLAlchemy's before/after_cursor_execute events and
+groups the statements the app emits by fingerprint (the SQL text with IN
+lists collapsed), keeping call counts, total time, one representative set of
+parameters and the columns each statement filters and sorts on, read from
+the compiled SQLAlchemy statement rather than by parsing SQL.
+
+analyze() replays each representative statement under EXPLAIN QUERY PLAN
+(SQLite) or EXPLAIN (FORMAT JSON) (PostgreSQL), flags full scans and sorts
+on tables larger than ADVISOR_LARGE_TABLE_ROWS, and recommends an index per
+table: equality columns first, then one range or ORDER BY column. A column
+that every call compares against the same constant (status = 'pending')
+becomes the predicate of a partial index instead. Indexes whose leading
+columns already cover a recommendation are not suggested again.
+render_migration() turns the recommendations into an Alembic revision stub
+using migration_ops.create_index_online.
+
+Capture is off unless INDEX_ADVISOR_CAPTURE is set or it is switched on via
+/api/admin/index-advisor/capture.
+
+Usage:
+    python index_advisor.py                    # drive the hot read routes, print the report
+    python index_advisor.py --write-migration  # also write migrations/versions/<rev>_advisor_indexes.py
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+
+from sqlalchemy import event, inspect, literal, Column
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, UnaryExpression
+from sqlalchemy.sql.selectable import Alias
+
+logger = logging.getLogger(__name__)
+
+INDEX_ADVISOR_CAPTURE = os.getenv("INDEX_ADVISOR_CAPTURE", "False").lower() in ('true', '1', 't')
+ADVISOR_LARGE_TABLE_ROWS = int(os.getenv("ADVISOR_LARGE_TABLE_ROWS", "1000"))
+# Cap on distinct statements kept, so a long capture cannot grow without bound
+ADVISOR_MAX_STATEMENTS = 500
+# Calls needed before a constant comparison is trusted as a partial index predicate
+ADVISOR_PARTIAL_MIN_CALLS = 3
+
+_IN_LIST = re.compile(r"\((\s*(\?|%\(\w+\)s|\$\d+)\s*,)+\s*(\?|%\(\w+\)s|\$\d+)\s*\)")
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_TABLE_ALIAS = re.compile(r'"?(\w+)"? AS "?(\w+)"?')
+_RANGE_OPERATORS = {operators.lt, operators.le, operators.gt, operators.ge, operators.between_op}
+_EQUALITY_OPERATORS = {operators.eq, operators.in_op, operators.is_}
+
+
+def fingerprint(statement: str) -> str:
+    return _IN_LIST.sub("(?)", " ".join(statement.split()))
+
+
+def _table_name(column):
+    table = column.table
+    if isinstance(table, Alias):
+        table = table.element
+    return getattr(table, "name", None)
+
+
+def _column_usage(compiled, parameters: dict):
+    """Equality, range and ORDER BY columns of a compiled Core statement.
+
+    Returns ({(table, column): bound value or None}, [(table, column)], [(table, column)]).
+    """
+    equality, ranges, order = {}, [], []
+    statement = compiled.statement
+    where = getattr(statement, "whereclause", None)
+    if where is not None:
+        for node in visitors.iterate(where):
+            if not isinstance(node, BinaryExpression):
+                continue
+            column, other = node.left, node.right
+            if not isinstance(column, Column):
+                column, other = other, column
+            if not isinstance(column, Column) or isinstance(other, Column) or _table_name(column) is None:
+                continue  # join conditions and expressions
+            key = (_table_name(column), column.name)
+            if node.operator in _EQUALITY_OPERATORS:
+                value = parameters.get(compiled.bind_names.get(other)) if isinstance(other, BindParameter) else None
+                equality[key] = value if node.operator is operators.eq else None
+            elif node.operator in _RANGE_OPERATORS:
+                ranges.append(key)
+    for clause in getattr(statement, "_order_by_clauses", ()):
+        element = clause.element if isinstance(clause, UnaryExpression) else clause
+        if isinstance(element, Column) and _table_name(element) is not None:
+            order.append((_table_name(element), element.name))
+    return equality, ranges, order
+
+
+class StatementStats:
+    def __init__(self, statement: str, parameters):
+        self.statement = statement
+        self.parameters = parameters
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.equality = {}
+        self.ranges = []
+        self.order = []
+        # (table, column) -> set of constants it was compared with
+        self.values = {}
+
+    def record(self, elapsed: float, equality: dict, ranges: list, order: list):
+        self.calls += 1
+        self.total_seconds += elapsed
+        if self.calls == 1:
+            self.equality, self.ranges, self.order = equality, ranges, order
+        for key, value in equality.items():
+            seen = self.values.setdefault(key, set())
+            if len(seen) < 3:
+                try:
+                    seen.add(value)
+                except TypeError:
+                    seen.add(None)
+
+
+class WorkloadRecorder:
+    """Aggregates the SELECT/UPDATE/DELETE statements executed on an engine."""
+
+    def __init__(self):
+        self.enabled = INDEX_ADVISOR_CAPTURE
+        self.statements = {}
+        self._lock = threading.Lock()
+        self._engines = set()
+
+    def install(self, engine):
+        if id(engine) in self._engines:
+            return
+        self._engines.add(id(engine))
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled:
+            conn.info.setdefault("advisor_started", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.enabled:
+            return
+        started = conn.info.get("advisor_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        verb = statement.lstrip()[:6].upper()
+        if executemany or verb not in ("SELECT", "UPDATE", "DELETE"):
+            return
+        compiled = getattr(context, "compiled", None)
+        compiled_parameters = (getattr(context, "compiled_parameters", None) or [{}])[0]
+        usage = _column_usage(compiled, compiled_parameters) if compiled is not None else ({}, [], [])
+        key = fingerprint(statement)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= ADVISOR_MAX_STATEMENTS:
+                    return
+                stats = self.statements[key] = StatementStats(statement, parameters)
+            stats.record(elapsed, *usage)
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+
+
+workload_recorder = WorkloadRecorder()
+
+
+def table_rows(conn, table: str) -> int:
+    if conn.dialect.name == "postgresql":
+        rows = conn.exec_driver_sql("SELECT reltuples::bigint FROM pg_class WHERE relname = %(t)s", {"t": table}).scalar()
+        return max(0, rows or 0)
+    return conn.exec_driver_sql(f'SELECT count(*) FROM "{table}"').scalar()
+
+
+def explain(conn, statement: str, parameters):
+    """Plan lines and issues (full scans, sorts) for one statement."""
+    plan, issues = [], []
+    if conn.dialect.name == "postgresql":
+        result = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        root = (json.loads(result) if isinstance(result, str) else result)[0]["Plan"]
+        stack = [(root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            relation = node.get("Relation Name")
+            plan.append("  " * depth + node["Node Type"] + (f" on {relation}" if relation else ""))
+            if node["Node Type"] == "Seq Scan":
+                issues.append({"kind": "seq_scan", "table": relation})
+            elif node["Node Type"] in ("Sort", "Incremental Sort"):
+                issues.append({"kind": "sort", "table": None})
+            stack.extend((child, depth + 1) for child in reversed(node.get("Plans", [])))
+    else:
+        # SQLite reports aliased tables (eager loads) under their alias
+        aliases = {alias: table for table, alias in _TABLE_ALIAS.findall(statement)}
+        for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+            detail = row[-1]
+            plan.append(detail)
+            match = _SQLITE_SCAN.match(detail)
+            if match:
+                issues.append({"kind": "seq_scan", "table": aliases.get(match.group(1), match.group(1))})
+            elif detail.startswith("USE TEMP B-TREE FOR"):
+                issues.append({"kind": "sort", "table": None})
+    return plan, issues
+
+
+def _recommend(stats: StatementStats, table: str):
+    """Index columns (and partial predicate) for `table`, or None."""
+    columns, where = [], None
+    for (owner, column), value in stats.equality.items():
+        if owner != table:
+            continue
+        values = stats.values.get((owner, column), set())
+        constant = len(values) == 1 and None not in values and isinstance(next(iter(values)), (str, bool))
+        if constant and where is None and stats.calls >= ADVISOR_PARTIAL_MIN_CALLS:
+            where = (column, next(iter(values)))
+        else:
+            columns.append(column)
+    ranges = [column for owner, column in stats.ranges if owner == table and column not in columns]
+    if ranges:
+        columns.append(ranges[0])
+    else:
+        columns.extend(column for owner, column in stats.order if owner == table and column not in columns)
+    if not columns and where is not None:
+        # Nothing else to index: a plain index on the constant column is more useful
+        columns, where = [where[0]], None
+    return (columns, where) if columns else None
+
+
+def _covered(existing: list, columns: list) -> bool:
+    return any(index[:len(columns)] == columns for index in existing)
+
+
+def analyze(engine, recorder: WorkloadRecorder = workload_recorder, large_table_rows: int = ADVISOR_LARGE_TABLE_ROWS) -> dict:
+    """EXPLAIN the captured workload and build index recommendations."""
+    was_enabled, recorder.enabled = recorder.enabled, False  # don't capture our own EXPLAINs
+    try:
+        with recorder._lock:
+            captured = sorted(recorder.statements.values(), key=lambda s: s.total_seconds, reverse=True)
+        statements, recommendations = [], {}
+        sizes, existing = {}, {}
+        with engine.connect() as conn:
+            inspector = inspect(conn)
+            for stats in captured:
+                try:
+                    plan, issues = explain(conn, stats.statement, stats.parameters)
+                except Exception as e:
+                    statements.append({"statement": stats.statement, "calls": stats.calls, "error": str(e)})
+                    continue
+                tables = {owner for owner, _ in list(stats.equality) + stats.ranges + stats.order}
+                advised = set()
+                for issue in issues:
+                    # Sorts are attributed to the table the statement orders by
+                    issue_tables = [issue["table"]] if issue["table"] else sorted({owner for owner, _ in stats.order})
+                    for table in issue_tables:
+                        if table not in sizes:
+                            sizes[table] = table_rows(conn, table)
+                            existing[table] = [index["column_names"] for index in inspector.get_indexes(table)]
+                        issue["rows"] = sizes[table]
+                        if sizes[table] < large_table_rows or table not in tables or table in advised:
+                            continue
+                        advised.add(table)
+                        candidate = _recommend(stats, table)
+                        if candidate is None or _covered(existing[table], candidate[0]):
+                            continue
+                        columns, where = candidate
+                        name = "ix_" + table + "_" + "_".join(columns) + (f"_{where[0]}_partial" if where else "")
+                        recommendation = recommendations.setdefault(name, {
+                            "name": name, "table": table, "columns": columns,
+                            "where": _render_where(conn.dialect, where) if where else None,
+                            "reason": f"{issue['kind']} on {table} (~{sizes[table]} rows)",
+                            "calls": 0, "total_ms": 0.0,
+                        })
+                        recommendation["calls"] += stats.calls
+                        recommendation["total_ms"] += stats.total_seconds * 1000
+                statements.append({
+                    "statement": stats.statement,
+                    "calls": stats.calls,
+                    "total_ms": round(stats.total_seconds * 1000, 3),
+                    "mean_ms": round(stats.total_seconds * 1000 / stats.calls, 3),
+                    "plan": plan,
+                    "issues": [issue for issue in issues if issue.get("rows", 0) >= large_table_rows],
+                })
+    finally:
+        recorder.enabled = was_enabled
+    # An index on (a, b) also serves lookups on (a)
+    for name, rec in list(recommendations.items()):
+        wider = _wider_recommendation(rec, recommendations.values())
+        if wider is not None:
+            wider["calls"] += rec["calls"]
+            wider["total_ms"] += rec["total_ms"]
+            del recommendations[name]
+    ranked = sorted(recommendations.values(), key=lambda r: r["total_ms"], reverse=True)
+    for recommendation in ranked:
+        recommendation["total_ms"] = round(recommendation["total_ms"], 3)
+    return {"statements": statements, "recommendations": ranked}
+
+
+def _wider_recommendation(rec: dict, recommendations):
+    width = len(rec["columns"])
+    for other in recommendations:
+        if (other is not rec and other["table"] == rec["table"] and other["where"] == rec["where"]
+                and len(other["columns"]) > width and other["columns"][:width] == rec["columns"]):
+            return other
+    return None
+
+
+def _render_where(dialect, where) -> str:
+    column, value = where
+    return f"{column} = {literal(value).compile(dialect=dialect, compile_kwargs={'literal_binds': True})}"
+
+
+def render_migration(recommendations: list, down_revision: str, revision: str = None) -> str:
+    """Alembic revision stub creating the recommended indexes online."""
+    if revision is None:
+        revision = f"{int(down_revision) + 1:04d}" if down_revision and down_revision.isdigit() else uuid.uuid4().hex[:12]
+    upgrades, downgrades = [], []
+    for rec in recommendations:
+        where = f", where={rec['where']!r}" if rec["where"] else ""
+        upgrades.append(f"    # {rec['reason']}: {rec['calls']} calls, {rec['total_ms']} ms captured")
+        upgrades.append(f"    migration_ops.create_index_online({rec['name']!r}, {rec['table']!r}, {rec['columns']!r}{where})")
+        downgrades.append(f"    op.drop_index({rec['name']!r}, table_name={rec['table']!r})")
+    return f'''"""Indexes recommended by index_advisor
+
+Review before applying: recommendations come from one captured workload.
+
+Revision ID: {revision}
+Revises: {down_revision or ''}
+Create Date: {time.strftime("%Y-%m-%d")}
+"""
+
+from alembic import op
+
+import migration_ops
+
+# revision identifiers
+revision = {revision!r}
+down_revision = {down_revision!r}
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+{chr(10).join(upgrades) or "    pass"}
+
+
+def downgrade():
+{chr(10).join(reversed(downgrades)) or "    pass"}
+'''
+
+
+def migration_head():
+    from alembic.script import ScriptDirectory
+    from migrate import get_config
+    heads = ScriptDirectory.from_config(get_config()).get_heads()
+    return heads[0] if heads else None
+
+
+# Read routes exercised by the CLI; {event_id} is filled with a real id
+ADVISOR_ROUTES = [
+    "/api/users/me", "/api/users/me/tasks", "/api/users/me/events", "/api/users", "/api/users/engagement",
+    "/api/contacts", "/api/public/mentors", "/api/opportunities", "/api/events", "/api/events/{event_id}/rsvps",
+    "/api/newsletters", "/api/tasks", "/api/tags", "/api/engagement/stats", "/api/engagement/users",
+]
+
+
+def capture_routes(rounds: int = 3):
+    """Drive ADVISOR_ROUTES in-process as the first admin user, with capture on."""
+    from fastapi.testclient import TestClient
+    import main
+    import models
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        admin = db.query(models.User).filter(models.User.role == "admin").first()
+        event_row = db.query(models.Event.id).first()
+    finally:
+        db.close()
+    if admin is None:
+        raise SystemExit("No admin user to run the workload as")
+    token = main.create_access_token(data={"sub": admin.username, "user_id": admin.id, "role": admin.role})
+    client = TestClient(main.app)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    workload_recorder.enabled = True
+    for _ in range(rounds):
+        for route in ADVISOR_ROUTES:
+            client.get(route.format(event_id=event_row.id if event_row else 0), headers=headers)
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    workload_recorder.install(engine)
+    capture_routes()
+    report = analyze(engine)
+    for entry in report["statements"]:
+        if entry.get("issues"):
+            print(f"{entry['calls']:>5} calls {entry['total_ms']:>10.1f} ms  {fingerprint(entry['statement'])[:160]}")
+            for line in entry["plan"]:
+                print(f"{'':>24}{line}")
+    print("\nRecommended indexes:")
+    for rec in report["recommendations"] or []:
+        where = f" WHERE {rec['where']}" if rec["where"] else ""
+        print(f"  {rec['name']}: {rec['table']}({', '.join(rec['columns'])}){where}  [{rec['reason']}]")
+    if not report["recommendations"]:
+        print("  (none)")
+    if "--write-migration" in sys.argv and report["recommendations"]:
+        head = migration_head()
+        source = render_migration(report["recommendations"], head)
+        revision = re.search(r"^revision = '(\w+)'", source, re.M).group(1)
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations", "versions", f"{revision}_advisor_indexes.py")
+        with open(path, "w") as f:
+            f.write(source)
+        print(f"\nWrote {path}")
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test: real server processes, scripted traffic mixes.
+
+Starts the app the way production does (gunicorn with uvicorn workers, or
+plain `uvicorn --workers`) against a local SQLite file or PostgreSQL
+database, fills it with generate_dataset.py, then runs each scenario for a
+fixed duration with a pool of concurrent virtual users:
+
+  public_browsing   anonymous visitors on the public pages
+  rsvp_burst        everyone RSVPs to the same event at once
+  admin_dashboard   admins refreshing the engagement and analytics views
+  login_storm       members logging in (bcrypt) and loading their profile
+  contact_import    an admin importing contacts one request at a time
+
+Throughput and p50/p95/p99 latency are reported per scenario and per route,
+and written as JSON so two runs can be compared with --compare; a throughput
+drop or p95 increase beyond the thresholds exits with status 1.
+
+Usage:
+    python loadtest.py                                       # all scenarios, temp SQLite
+    python loadtest.py --scenario rsvp_burst --users 100 --duration 60
+    python loadtest.py --database-url postgresql://localhost/loadtest --workers 8
+    python loadtest.py --env SQLITE_WRITE_MODE=queue --report queue.json --compare direct.json
+    python loadtest.py --url http://127.0.0.1:8000 --skip-generate   # an already running server
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import signal
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PASSWORD = "password123"
+STARTUP_TIMEOUT = 90
+# Defaults for --compare
+MAX_THROUGHPUT_DROP = 0.15
+MAX_P95_INCREASE = 0.25
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latencies and errors per route template."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def add(self, route: str, seconds: float, ok: bool):
+        self.latencies.setdefault(route, []).append(seconds)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        routes, everything = {}, []
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            everything.extend(values)
+            routes[route] = _stats(values, self.errors.get(route, 0), elapsed)
+        result = _stats(sorted(everything), sum(self.errors.values()), elapsed)
+        result["duration_s"] = round(elapsed, 2)
+        result["routes"] = routes
+        return result
+
+
+def _stats(values: list, errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "max_ms": round((values[-1] if values else 0.0) * 1000, 2),
+    }
+
+
+class Run:
+    """State shared by the virtual users of one scenario."""
+
+    def __init__(self, client: httpx.AsyncClient, context: dict, duration: float, think_ms: float, seed: int):
+        self.client = client
+        self.context = context
+        self.deadline = time.monotonic() + duration
+        self.think = think_ms / 1000
+        self.recorder = Recorder()
+        self.rng = random.Random(seed)
+        self.sequence = 0
+
+    def running(self) -> bool:
+        return time.monotonic() < self.deadline
+
+    def unique(self) -> int:
+        self.sequence += 1
+        return self.sequence
+
+    async def request(self, method: str, route: str, url: str = None, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url or route, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.recorder.add(f"{method} {route}", time.perf_counter() - start, ok)
+        if self.think:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.think))
+        return response
+
+
+# --- Scenarios: each is a virtual user loop -------------------------------
+
+async def public_browsing(run: Run, user: int):
+    pages = [
+        ("/api/events", 5), ("/api/public/mentors", 3), ("/api/newsletters", 2),
+        ("/api/opportunities", 1), ("/api/tags", 1), ("/health", 1),
+    ]
+    routes, weights = zip(*pages)
+    while run.running():
+        await run.request("GET", run.rng.choices(routes, weights=weights)[0])
+
+
+async def rsvp_burst(run: Run, user: int):
+    event_id = run.context["hot_event_id"]
+    member = run.context["member_tokens"][user % len(run.context["member_tokens"])]
+    while run.running():
+        if run.rng.random() < 0.7:
+            await run.request("POST", "/api/events/{event_id}/rsvp/public", f"/api/events/{event_id}/rsvp/public",
+                              json={"email": f"visitor-{os.getpid()}-{run.unique()}@example.com", "rsvp_status": "confirmed"})
+        else:
+            await run.request("POST", "/api/events/{event_id}/rsvp", f"/api/events/{event_id}/rsvp",
+                              json={"email": "member@example.com", "rsvp_status": "confirmed"}, headers=member)
+
+
+async def admin_dashboard(run: Run, user: int):
+    admin = run.context["admin_token"]
+    event_id = run.context["hot_event_id"]
+    while run.running():
+        # One dashboard refresh fires these together
+        await asyncio.gather(
+            run.request("GET", "/api/engagement/stats", headers=admin),
+            run.request("GET", "/api/engagement/users", headers=admin),
+            run.request("GET", "/api/engagement/unique", params={"days": 30}, headers=admin),
+            run.request("GET", "/api/analytics/retention", headers=admin),
+            run.request("GET", "/api/analytics/funnel", headers=admin),
+            run.request("GET", "/api/events/{event_id}/rsvps", f"/api/events/{event_id}/rsvps", headers=admin),
+        )
+
+
+async def login_storm(run: Run, user: int):
+    members = run.context["member_usernames"]
+    while run.running():
+        username = run.rng.choice(members)
+        response = await run.request("POST", "/api/token", data={"username": username, "password": run.context["password"]})
+        if response is not None and response.status_code == 200:
+            token = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            await run.request("GET", "/api/users/me", headers=token)
+
+
+async def contact_import(run: Run, user: int):
+    admin = run.context["admin_token"]
+    tags = ["Imported", "Spring Fair", "Newsletter", "Startup", "AI/ML"]
+    while run.running():
+        number = run.unique()
+        await run.request("POST", "/api/contacts", headers=admin, json={
+            "email": f"import-{os.getpid()}-{user}-{number}@example.com",
+            "full_name": f"Imported Contact {number}",
+            "tags": run.rng.sample(tags, k=run.rng.randint(0, 2)),
+        })
+
+
+# name -> (loop, default virtual users)
+SCENARIOS = {
+    "public_browsing": (public_browsing, 50),
+    "rsvp_burst": (rsvp_burst, 100),
+    "admin_dashboard": (admin_dashboard, 5),
+    "login_storm": (login_storm, 20),
+    "contact_import": (contact_import, 4),
+}
+
+
+# --- Server and dataset ---------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server: str, workers: int, port: int) -> list:
+    if server == "gunicorn":
+        # Same flags as railway_start.sh, minus logging
+        return [sys.executable, "-m", "gunicorn", "-w", str(workers), "-k", "uvicorn.workers.UvicornWorker", "main:app",
+                "--bind", f"127.0.0.1:{port}", "--timeout", "120", "--preload", "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+
+
+def start_server(args, env: dict, port: int, log_file):
+    if args.server == "gunicorn":
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            raise SystemExit("gunicorn is not installed; pip install gunicorn or pass --server uvicorn")
+    process = subprocess.Popen(server_command(args.server, args.workers, port), cwd=BACKEND_DIR, env=env,
+                               stdout=log_file, stderr=subprocess.STDOUT, start_new_session=True)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with status {process.returncode}; see {log_file.name}")
+        try:
+            if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise SystemExit(f"Server did not become healthy within {STARTUP_TIMEOUT}s; see {log_file.name}")
+
+
+def stop_server(process):
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+async def prepare_context(url: str, args) -> dict:
+    """Tokens and ids the scenarios need, obtained through the API itself."""
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        async def login(username):
+            response = await client.post("/api/token", data={"username": username, "password": args.password})
+            if response.status_code != 200:
+                raise SystemExit(f"Cannot log in as {username} ({response.status_code}); pass --admin/--password")
+            return response.json()
+
+        admin = await login(args.admin)
+        member_usernames = [f"user{i}" for i in range(2, 2 + args.members)]
+        member_tokens = []
+        for username in member_usernames[:20]:
+            member_tokens.append({"Authorization": f"Bearer {(await login(username))['access_token']}"})
+        events = (await client.get("/api/events")).json()
+        if not events:
+            raise SystemExit("No events to RSVP to; generate a dataset first")
+        upcoming = sorted((e for e in events if e["start_date"] >= datetime.utcnow().isoformat()), key=lambda e: e["start_date"])
+        return {
+            "admin_token": {"Authorization": f"Bearer {admin['access_token']}"},
+            "member_tokens": member_tokens,
+            "member_usernames": member_usernames,
+            "hot_event_id": (upcoming or events)[0]["id"],
+            "password": args.password,
+        }
+
+
+async def run_scenario(url: str, name: str, context: dict, args) -> dict:
+    loop, default_users = SCENARIOS[name]
+    users = args.users or default_users
+    limits = httpx.Limits(max_connections=users * 6, max_keepalive_connections=users * 6)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        run = Run(client, context, args.duration, args.think_ms, args.seed)
+        start = time.perf_counter()
+        await asyncio.gather(*(loop(run, user) for user in range(users)))
+        elapsed = time.perf_counter() - start
+    summary = run.recorder.summary(elapsed)
+    summary["virtual_users"] = users
+    return summary
+
+
+# --- Reporting ------------------------------------------------------------
+
+def print_summary(name: str, summary: dict):
+    print(f"\n{name}: {summary['virtual_users']} users, {summary['requests']} requests, {summary['errors']} errors, "
+          f"{summary['throughput']:.1f} req/s, p50 {summary['p50_ms']:.1f} / p95 {summary['p95_ms']:.1f} / p99 {summary['p99_ms']:.1f} ms")
+    print(f"  {'route':<44}{'req':>7}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for route, stats in summary["routes"].items():
+        print(f"  {route:<44}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}")
+
+
+def compare_reports(current: dict, baseline: dict, max_drop: float, max_increase: float) -> list:
+    """Print per-scenario deltas; returns the regressions."""
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('created_at', 'baseline')}:")
+    print(f"  {'scenario':<20}{'req/s':>22}{'p95 ms':>22}")
+    for name, now in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            print(f"  {name:<20}{'(not in baseline)':>22}")
+            continue
+        throughput_change = (now["throughput"] - before["throughput"]) / before["throughput"] if before["throughput"] else 0.0
+        p95_change = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        flags = []
+        if throughput_change < -max_drop:
+            flags.append("throughput")
+        if p95_change > max_increase:
+            flags.append("p95")
+        if flags:
+            regressions.append(f"{name} ({', '.join(flags)})")
+        print(f"  {name:<20}{before['throughput']:>9.1f} -> {now['throughput']:>7.1f} {throughput_change:+5.0%}"
+              f"{before['p95_ms']:>9.1f} -> {now['p95_ms']:>7.1f} {p95_change:+5.0%}  {'REGRESSED' if flags else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test with scripted traffic mixes")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these (repeatable)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per scenario")
+    parser.add_argument("--users", type=int, help="virtual users per scenario (default: per scenario)")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a user's requests")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="drive an already running server instead of starting one")
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn"), default="gunicorn")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--database-url", help="database for the started server (default: a temporary SQLite file)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra server environment")
+    parser.add_argument("--dataset-scale", type=float, default=0.05, help="generate_dataset.py --scale")
+    parser.add_argument("--skip-generate", action="store_true", help="use the data already in the database")
+    parser.add_argument("--admin", default="user1", help="admin username for the admin scenarios")
+    parser.add_argument("--password", default=DATASET_PASSWORD, help="password of the generated users")
+    parser.add_argument("--members", type=int, default=200, help="member accounts (user2..) used for logins")
+    parser.add_argument("--report", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--max-throughput-drop", type=float, default=MAX_THROUGHPUT_DROP)
+    parser.add_argument("--max-p95-increase", type=float, default=MAX_P95_INCREASE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    env = dict(os.environ, DATABASE_URL=database_url, WEB_CONCURRENCY=str(args.workers),
+               ANALYTICS_SNAPSHOT_DIR=os.path.join(workdir, "analytics_snapshots"),
+               ARCHIVE_DIR=os.path.join(workdir, "archive"))
+    env.pop("RAILWAY_DATABASE_URL", None)
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    process = None
+    try:
+        if args.url:
+            url = args.url.rstrip("/")
+        else:
+            if not args.skip_generate:
+                print(f"Generating dataset (scale {args.dataset_scale}) into {database_url.split('@')[-1]}...")
+                subprocess.run([sys.executable, "generate_dataset.py", "--database-url", database_url,
+                                "--scale", str(args.dataset_scale), "--seed", str(args.seed), "--password", args.password],
+                               cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+            else:
+                subprocess.run([sys.executable, "migrate.py"], cwd=BACKEND_DIR, env=env, check=True)
+            log_path = os.path.join(workdir, "server.log")
+            log_file = open(log_path, "w")
+            process, url = start_server(args, env, free_port(), log_file)
+            print(f"Started {args.server} with {args.workers} workers at {url} (log: {log_path})")
+
+        context = asyncio.run(prepare_context(url, args))
+        report = {
+            "meta": {
+                "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "url": args.url, "server": None if args.url else args.server, "workers": None if args.url else args.workers,
+                "database": (args.database_url or "sqlite").split("://")[0], "dataset_scale": args.dataset_scale,
+                "seed": args.seed, "duration_s": args.duration, "think_ms": args.think_ms,
+                "env": args.env, "python": platform.python_version(), "cpus": os.cpu_count(),
+            },
+            "scenarios": {},
+        }
+        for name in args.scenario or list(SCENARIOS):
+            print(f"\nRunning {name} for {args.duration:.0f}s...")
+            summary = asyncio.run(run_scenario(url, name, context, args))
+            report["scenarios"][name] = summary
+            print_summary(name, summary)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    # Kept on failure (exceptions skip this) for the server log
+    shutil.rmtree(workdir, ignore_errors=True)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nWrote {args.report}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.max_throughput_drop, args.max_p95_increase)
+        if regressions:
+            print(f"\nRegressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
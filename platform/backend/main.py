@@ -1,37 +1,56 @@
+# Before anything logs: database.py would otherwise install a blocking stderr handler
+import structured_logging
+structured_logging.setup()
+
 from fastapi import FastAPI, Depends, HTTPException, Query, status, Form, UploadFile, File, BackgroundTasks
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional, Union
 from datetime import datetime, timedelta
 import models, schemas
-from database import engine, get_db, SessionLocal
+from database import engine, async_engine, read_only_engine, test_connection, get_db, get_db_context, get_async_db, get_read_session, replica_set, sqlite_maintenance, pool_validator, REPLICA_STICKY_SECONDS, WEB_CONCURRENCY, SessionLocal
+from request_context import RequestContextMiddleware
+import pool_metrics
+import sqlite_writer
+import index_advisor
+import traffic_capture
+import query_stats
+import profiling
+import metrics
+import tracing
+import slow_requests
+import memory_profiling
+import fast_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import or_, and_, text
 from sqlalchemy.sql import func
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 import os
 import sys
-from fastapi.responses import JSONResponse
+import asyncio
+import logging
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.requests import Request
 from starlette.responses import Response
 from pydantic import ValidationError, validator, EmailStr
-import direct_migration
 import json
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from functools import lru_cache
 import secrets  # Import the secrets module for generating secure passwords
+import sketches
+import retention
+import telemetry
+
+logger = logging.getLogger(__name__)
 
 # --- Database Initialization ---
-# This ensures that the database schema is created based on the models.
-# It's safe to run on every startup, as it won't re-create existing tables.
-print("Initializing database...")
-try:
-    models.Base.metadata.create_all(bind=engine)
-    print("Database tables created or verified successfully.")
-except Exception as e:
-    print(f"Error initializing database: {str(e)}", file=sys.stderr)
+# The schema is managed by versioned migrations (migrations/, run with
+# `python migrate.py`), applied once per deploy by railway_start.sh.
 
-app = FastAPI(title="EcoSystem CRM API")
+app = FastAPI(title="EcoSystem CRM API", default_response_class=fast_json.FastJSONResponse)
 
 # Configure CORS with multiple allowed origins
 origins = [
@@ -50,29 +69,121 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Requests over their route's threshold, with EXPLAIN of the slowest statements (SLOW_REQUESTS)
+if slow_requests.SLOW_REQUESTS:
+    slow_requests.recorder.engine = engine
+    app.add_middleware(slow_requests.SlowRequestMiddleware)
+
+# Statement count and DB time per request in Server-Timing (admins only by default), N+1 warnings (SQL_STATS)
+if query_stats.SQL_STATS:
+    # is_admin_authorization is defined further down, with the auth helpers
+    app.add_middleware(query_stats.QueryStatsMiddleware, authorize=lambda authorization: is_admin_authorization(authorization))
+
+# Makes the current route available to instrumentation (pool hold times etc.)
+app.add_middleware(RequestContextMiddleware)
+
+# Sanitized request capture for replay_traffic.py (off unless TRAFFIC_CAPTURE is set)
+if traffic_capture.TRAFFIC_CAPTURE:
+    app.add_middleware(traffic_capture.TrafficCaptureMiddleware)
+
+# Request latency histograms and runtime gauges for /metrics (ENABLE_PERFORMANCE_MONITORING)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Request traces (HTTP, SQL, serialization, e-mail) kept for /api/admin/traces (off unless TRACING is set)
+if tracing.TRACING:
+    app.add_middleware(tracing.TracingMiddleware)
+
+# Query workload capture for the index advisor (off unless INDEX_ADVISOR_CAPTURE is set)
+if index_advisor.workload_recorder.enabled:
+    index_advisor.workload_recorder.install(engine)
+
+@app.on_event("startup")
+def check_database_connection():
+    # Not at import time: importing main (CLI scripts, --preload) should not need the database
+    test_connection()
+
+@app.on_event("startup")
+def start_sqlite_maintenance():
+    # Runs in every gunicorn worker, after the --preload fork
+    if sqlite_maintenance is not None:
+        sqlite_maintenance.start()
+
+@app.on_event("startup")
+def start_pool_validator():
+    # Per worker like the maintenance thread: with --preload a thread started at import would only run in the master
+    if pool_validator is not None:
+        pool_validator.start()
+
+def collect_runtime_metrics():
+    samples = metrics.pool_samples("primary", engine)
+    if async_engine is not None:
+        samples += metrics.pool_samples("primary_async", async_engine.sync_engine)
+    for index, replica in enumerate(replica_set.engines):
+        samples += metrics.pool_samples(f"replica{index}", replica)
+    if read_only_engine is not None:
+        samples += metrics.pool_samples("read_only", read_only_engine)
+    samples += metrics.threadpool_samples()
+    if "analytics" in sys.modules:
+        samples += metrics.cache_samples("analytics", get_analytics_engine())
+    samples += metrics.cache_samples("user_agents", telemetry.user_agent_interner)
+    samples.append(("sqlite_writer_queue_depth", {}, sqlite_writer.sqlite_writer.jobs.qsize()))
+    return samples
+
+@app.on_event("startup")
+async def start_metrics_flush():
+    # Each worker publishes its metrics for /metrics requests served by the others
+    if metrics.METRICS_ENABLED:
+        metrics.registry.register_collector(collect_runtime_metrics)
+        asyncio.get_running_loop().create_task(metrics.flush_periodically())
+
+@app.on_event("shutdown")
+async def write_final_metrics():
+    if metrics.METRICS_ENABLED:
+        metrics.write_snapshot()
+
 # --- Security and Authentication ---
 SECRET_KEY = os.getenv("SECRET_KEY", "a-very-secret-key-that-should-be-in-an-env-file")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Increased token expiration
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 
+# Optional subsystems are imported on first use rather than with the app:
+# fastapi_mail (with its DNS and HTTP clients), passlib's bcrypt backend and
+# the numpy analytics engine together account for about a fifth of main's
+# import time (benchmark_imports.py)
+
+@lru_cache(maxsize=1)
+def get_password_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache(maxsize=1)
+def get_analytics_engine():
+    from analytics import analytics_engine
+    return analytics_engine
+
 # --- Email Configuration ---
 # IMPORTANT: Replace these with your actual email credentials in environment variables
-conf = ConnectionConfig(
-    MAIL_USERNAME = os.getenv("MAIL_USERNAME", "your-mailtrap-username"),
-    MAIL_PASSWORD = os.getenv("MAIL_PASSWORD", "your-mailtrap-password"),
-    MAIL_FROM = os.getenv("MAIL_FROM", "info@ecosystem-crm.com"),
-    MAIL_PORT = int(os.getenv("MAIL_PORT", 587)),
-    MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.mailtrap.io"),
-    MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "True").lower() in ("true", "1", "yes"),
-    MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS", "False").lower() in ("true", "1", "yes"),
-    USE_CREDENTIALS = True,
-    VALIDATE_CERTS = True
-)
+@lru_cache(maxsize=1)
+def get_mail_config():
+    from fastapi_mail import ConnectionConfig
+    return ConnectionConfig(
+        MAIL_USERNAME = os.getenv("MAIL_USERNAME", "your-mailtrap-username"),
+        MAIL_PASSWORD = os.getenv("MAIL_PASSWORD", "your-mailtrap-password"),
+        MAIL_FROM = os.getenv("MAIL_FROM", "info@ecosystem-crm.com"),
+        MAIL_PORT = int(os.getenv("MAIL_PORT", 587)),
+        MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.mailtrap.io"),
+        MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "True").lower() in ("true", "1", "yes"),
+        MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS", "False").lower() in ("true", "1", "yes"),
+        USE_CREDENTIALS = True,
+        VALIDATE_CERTS = True
+    )
 
-# Initialize FastMail instance
-fastmail = FastMail(conf)
+@lru_cache(maxsize=1)
+def get_fastmail():
+    from fastapi_mail import FastMail
+    return FastMail(get_mail_config())
 
 # --- Utility Functions ---
 def get_db():
@@ -82,11 +193,49 @@ def get_db():
     finally:
         db.close()
 
+# --- Read replica routing ---
+# After a client writes, its reads stick to the primary for REPLICA_STICKY_SECONDS
+# so it always sees its own writes. The deadline travels in a cookie (shared by
+# all workers) and is also remembered per client in this worker.
+READ_PRIMARY_COOKIE = "read_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+recent_writers = {}
+
+def get_client_key(request: Request) -> str:
+    return request.headers.get("authorization") or (request.client.host if request.client else "")
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints; routed to a replica when configured."""
+    now = datetime.utcnow().timestamp()
+    try:
+        cookie_deadline = float(request.cookies.get(READ_PRIMARY_COOKIE, 0))
+    except ValueError:
+        cookie_deadline = 0
+    deadline = max(cookie_deadline, recent_writers.get(get_client_key(request), 0))
+    db = get_read_session(stick_to_primary=deadline > now)
+    try:
+        yield db
+    finally:
+        db.close()
+
+@app.middleware("http")
+async def track_recent_writes(request: Request, call_next):
+    response = await call_next(request)
+    if replica_set.engines and request.method not in SAFE_METHODS and response.status_code < 400:
+        deadline = datetime.utcnow().timestamp() + REPLICA_STICKY_SECONDS
+        recent_writers[get_client_key(request)] = deadline
+        if len(recent_writers) > 10000:
+            now = datetime.utcnow().timestamp()
+            for key in [k for k, v in recent_writers.items() if v < now]:
+                del recent_writers[key]
+        response.set_cookie(READ_PRIMARY_COOKIE, str(deadline), max_age=int(REPLICA_STICKY_SECONDS) + 1, httponly=True)
+    return response
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_password_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -99,12 +248,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 # --- Authentication Dependencies ---
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def get_token_username(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -113,13 +263,34 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = schemas.TokenData(username=username)
     except JWTError:
         raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+    return token_data.username
+
+def is_admin_authorization(authorization: str) -> bool:
+    """True for an `Authorization: Bearer` header holding a valid admin token"""
+    if not authorization.lower().startswith("bearer "):
+        return False
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    return payload.get("role") == "admin"
+
+# Sampling profiles of single requests (X-Profile: 1 from an admin, or PROFILE_EVERY_N).
+# Added after the auth helpers it uses; as the last middleware added it is the
+# outermost, so profiles include every other middleware and response encoding.
+if profiling.PROFILING:
+    app.add_middleware(profiling.ProfilingMiddleware, authorize=is_admin_authorization)
+
+# Sync dependencies run in the threadpool and share the request's Session
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    with tracing.span("auth.current_user"):
+        username = get_token_username(token)
+        user = db.query(models.User).filter(models.User.username == username).first()
     if user is None:
         raise credentials_exception
     return user
 
-async def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
+def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -127,20 +298,33 @@ async def get_current_admin_user(current_user: models.User = Depends(get_current
         )
     return current_user
 
+# Async counterparts for endpoints running on the event loop with an AsyncSession
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    with tracing.span("auth.current_user"):
+        username = get_token_username(token)
+        user = (await db.execute(select(models.User).where(models.User.username == username))).scalars().first()
+    if user is None:
+        raise credentials_exception
+    return user
+
+async def get_current_admin_user_async(current_user: models.User = Depends(get_current_user_async)):
+    return get_current_admin_user(current_user)
+
 # --- API Endpoints ---
 
 # Authentication
 @app.post("/api/token", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None
 ):
-    user = db.query(models.User).filter(
+    user = (await db.execute(select(models.User).where(
         (models.User.username == form_data.username) | (models.User.email == form_data.username)
-    ).first()
+    ))).scalars().first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # bcrypt is CPU-bound, keep it off the event loop
+    if not user or not await run_in_threadpool(verify_password, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -152,20 +336,19 @@ async def login_for_access_token(
         client_ip = request.client.host if request else "unknown"
         user_agent = request.headers.get("user-agent", "") if request else ""
         
-        login_session = models.LoginSession(
-            user_id=user.id,
-            ip_address=client_ip,
-            user_agent=user_agent
-        )
-        db.add(login_session)
-        
-        # Update user login count and last login
-        user.logins = (user.logins or 0) + 1
-        user.last_login = datetime.utcnow()
-        db.commit()
+        # Insert the session and update user login count and last login
+        user_id = user.id
+        if sqlite_writer.enabled():
+            await sqlite_writer.run_write_async(lambda session: record_login(session, user_id, client_ip, user_agent))
+        else:
+            await db.run_sync(lambda session: record_login(session, user_id, client_ip, user_agent))
+            await db.commit()
+
+        sketches.record_login(user, client_ip, user_agent)
+        await db.run_sync(sketches.sketch_store.maybe_flush)
     except Exception as e:
-        print(f"Error recording login session: {e}")
-        db.rollback()
+        logger.warning(f"Error recording login session: {e}")
+        await db.rollback()
 
     # Check if user is admin
     is_admin = user.role == "admin"
@@ -207,27 +390,37 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @app.get("/api/users/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
+def read_users_me(current_user: models.User = Depends(get_current_user)):
     return current_user
 
+# Large list responses are serialized in the endpoint (see fast_json.py). Trusted
+# serializers skip validation: their rows come straight from the ORM and the
+# schemas have no validators
+users_serializer = fast_json.ListSerializer(schemas.UserSimple, trusted=True)
+users_engagement_serializer = fast_json.ListSerializer(schemas.User)
+contacts_serializer = fast_json.ListSerializer(schemas.Contact, trusted=True)
+mentors_serializer = fast_json.ListSerializer(schemas.Mentor, trusted=True)
+tasks_serializer = fast_json.ListSerializer(schemas.Task, trusted=True)
+rsvps_serializer = fast_json.ListSerializer(schemas.EventRSVP, trusted=True)
+
 @app.get("/api/users", response_model=List[schemas.UserSimple], dependencies=[Depends(get_current_admin_user)])
 def get_all_users(db: Session = Depends(get_db)):
     """
     Admin-only endpoint to get a list of all users.
     Useful for assigning tasks.
     """
-    return db.query(models.User).all()
+    return users_serializer.response(db.query(models.User).all())
 
 @app.get("/api/users/engagement", response_model=List[schemas.User], dependencies=[Depends(get_current_admin_user)])
 def get_user_engagement(db: Session = Depends(get_db)):
     """
     Admin-only endpoint to get user engagement data, including logins and RSVPs.
     """
-    return db.query(models.User).order_by(models.User.logins.desc()).all()
+    return users_engagement_serializer.response(db.query(models.User).order_by(models.User.logins.desc()).all())
 
 # Contact Management
 @app.get("/api/contacts", response_model=List[schemas.Contact])
-def get_contacts(db: Session = Depends(get_db), q: Optional[str] = None):
+def get_contacts(db: Session = Depends(get_read_db), q: Optional[str] = None):
     """
     Get all contacts, with optional search.
     Search is case-insensitive and covers:
@@ -253,32 +446,32 @@ def get_contacts(db: Session = Depends(get_db), q: Optional[str] = None):
         )
     
     contacts = query.order_by(models.Contact.created_at.desc()).all()
-    return contacts
+    return contacts_serializer.response(contacts)
 
 @app.post("/api/contacts", response_model=schemas.ContactCreateResponse, status_code=status.HTTP_201_CREATED)
 async def create_contact(
     contact_data: schemas.ContactCreate,
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: models.User = Depends(get_current_admin_user_async)
 ):
     # Check if a user or contact with this email already exists
-    existing_user = db.query(models.User).filter(models.User.email == contact_data.email).first()
+    existing_user = (await db.execute(select(models.User.id).where(models.User.email == contact_data.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="A user with this email already exists.")
     
-    existing_contact = db.query(models.Contact).filter(models.Contact.email == contact_data.email).first()
+    existing_contact = (await db.execute(select(models.Contact.id).where(models.Contact.email == contact_data.email))).first()
     if existing_contact:
         raise HTTPException(status_code=400, detail="A contact with this email already exists.")
 
     # --- Create the User account ---
     temp_password = secrets.token_hex(8)
-    hashed_password = get_password_hash(temp_password)
+    hashed_password = await run_in_threadpool(get_password_hash, temp_password)
     
     # Generate a unique username from email
     username_base = contact_data.email.split('@')[0]
     username = username_base
     counter = 1
-    while db.query(models.User).filter(models.User.username == username).first():
+    while (await db.execute(select(models.User.id).where(models.User.username == username))).first():
         username = f"{username_base}{counter}"
         counter += 1
 
@@ -290,13 +483,13 @@ async def create_contact(
         role=contact_data.role
     )
     db.add(new_user)
-    db.flush() # Flush to get the new_user.id before committing
+    await db.flush() # Flush to get the new_user.id before committing
 
     # --- Create the Contact record ---
     tags = []
     if contact_data.tags:
         for tag_name in contact_data.tags:
-            tag = db.query(models.Tag).filter(models.Tag.name == tag_name).first()
+            tag = (await db.execute(select(models.Tag).where(models.Tag.name == tag_name))).scalars().first()
             if not tag:
                 tag = models.Tag(name=tag_name)
                 db.add(tag)
@@ -309,10 +502,15 @@ async def create_contact(
         user_id=new_user.id  # Link the contact to the new user
     )
     db.add(new_contact)
-    db.commit()
+    await db.commit()
     
-    # Eagerly load the 'user' relationship to ensure it's in the response
-    db.refresh(new_contact, attribute_names=["user"])
+    # Eagerly load relationships; AsyncSession cannot lazy-load during serialization
+    new_contact = (await db.execute(
+        select(models.Contact).where(models.Contact.id == new_contact.id).options(
+            selectinload(models.Contact.user),
+            selectinload(models.Contact.tags)
+        ).execution_options(populate_existing=True)
+    )).scalars().one()
 
     # Return the created contact and user credentials
     user_credentials = schemas.UserCredentials(
@@ -373,34 +571,15 @@ def delete_contact(
     if db_contact.user:
         user_to_delete = db_contact.user
         
-        # Delete all tasks associated with the user
-        tasks_to_delete = db.query(models.Task).filter(
+        # Delete all related records with bulk DELETEs instead of loading
+        # every row (login history in particular can be large)
+        db.query(models.Task).filter(
             (models.Task.assigned_to_id == user_to_delete.id) |
             (models.Task.created_by_id == user_to_delete.id)
-        ).all()
-        for task in tasks_to_delete:
-            db.delete(task)
-        
-        # Delete all login sessions for the user
-        login_sessions = db.query(models.LoginSession).filter(
-            models.LoginSession.user_id == user_to_delete.id
-        ).all()
-        for session in login_sessions:
-            db.delete(session)
+        ).delete(synchronize_session=False)
         
-        # Delete all event RSVPs for the user
-        event_rsvps = db.query(models.EventRSVP).filter(
-            models.EventRSVP.user_id == user_to_delete.id
-        ).all()
-        for rsvp in event_rsvps:
-            db.delete(rsvp)
-        
-        # Delete all mentor contact requests for the user
-        mentor_requests = db.query(models.MentorContactRequest).filter(
-            models.MentorContactRequest.user_id == user_to_delete.id
-        ).all()
-        for request in mentor_requests:
-            db.delete(request)
+        for model in (models.LoginSession, models.LoginSessionRollup, models.EventRSVP, models.MentorContactRequest):
+            db.query(model).filter(model.user_id == user_to_delete.id).delete(synchronize_session=False)
             
         db.delete(user_to_delete)
             
@@ -416,13 +595,13 @@ def get_all_mentors(db: Session = Depends(get_db)):
     (Admin only) Get all mentors.
     """
     mentors = db.query(models.Mentor).all()
-    return mentors
+    return mentors_serializer.response(mentors)
 
 @app.get("/api/public/mentors", response_model=List[schemas.Mentor])
-def get_public_mentors(db: Session = Depends(get_db)):
+def get_public_mentors(db: Session = Depends(get_read_db)):
     """Get all mentors (public access for chatbot)"""
     mentors = db.query(models.Mentor).all()
-    return mentors
+    return mentors_serializer.response(mentors)
 
 @app.post("/api/mentors", response_model=schemas.Mentor, dependencies=[Depends(get_current_admin_user)])
 def create_mentor(mentor: schemas.MentorCreate, db: Session = Depends(get_db)):
@@ -474,16 +653,16 @@ def delete_mentor(mentor_id: int, db: Session = Depends(get_db)):
 
 # Public route to get all mentors (opportunities)
 @app.get("/api/opportunities", response_model=List[schemas.Mentor])
-def get_all_opportunities(db: Session = Depends(get_db)):
+def get_all_opportunities(db: Session = Depends(get_read_db)):
     """
     Public route to get all mentors (aliased as opportunities for legacy client).
     """
     mentors = db.query(models.Mentor).order_by(models.Mentor.created_at.desc()).all()
-    return mentors
+    return mentors_serializer.response(mentors)
 
 # Event Management
 @app.get("/api/events", response_model=List[schemas.Event])
-def get_events(db: Session = Depends(get_db)):
+def get_events(db: Session = Depends(get_read_db)):
     return db.query(models.Event).order_by(models.Event.start_date.desc()).all()
 
 @app.post("/api/events", response_model=schemas.Event, status_code=status.HTTP_201_CREATED)
@@ -558,7 +737,7 @@ def rsvp_for_event(
 
 # Newsletter Management
 @app.get("/api/newsletters", response_model=List[schemas.Newsletter])
-def get_newsletters(db: Session = Depends(get_db)):
+def get_newsletters(db: Session = Depends(get_read_db)):
     newsletters = db.query(models.Newsletter).order_by(models.Newsletter.created_at.desc()).all()
     return newsletters
 
@@ -636,10 +815,10 @@ def get_all_tasks(
     current_admin: models.User = Depends(get_current_admin_user)
 ):
     """ Admin-only endpoint to get all tasks. """
-    return db.query(models.Task).options(
+    return tasks_serializer.response(db.query(models.Task).options(
         joinedload(models.Task.assigned_to_user),
         joinedload(models.Task.created_by_user)
-    ).order_by(models.Task.created_at.desc()).all()
+    ).order_by(models.Task.created_at.desc()).all())
 
 @app.get("/api/users/me/tasks", response_model=List[schemas.Task])
 def get_my_tasks(
@@ -647,10 +826,10 @@ def get_my_tasks(
     current_user: models.User = Depends(get_current_user)
 ):
     """ Get tasks assigned to the current logged-in user. """
-    return db.query(models.Task).filter(models.Task.assigned_to_id == current_user.id).options(
+    return tasks_serializer.response(db.query(models.Task).filter(models.Task.assigned_to_id == current_user.id).options(
         joinedload(models.Task.assigned_to_user),
         joinedload(models.Task.created_by_user)
-    ).order_by(models.Task.created_at.desc()).all()
+    ).order_by(models.Task.created_at.desc()).all())
 
 @app.get("/api/users/me/events", response_model=List[schemas.Event])
 def get_my_events(
@@ -686,7 +865,7 @@ def get_event_rsvps(
         joinedload(models.EventRSVP.user)
     ).order_by(models.EventRSVP.created_at.desc()).all()
     
-    return rsvps
+    return rsvps_serializer.response(rsvps)
 
 @app.put("/api/tasks/{task_id}", response_model=schemas.Task)
 def update_task(
@@ -756,11 +935,21 @@ def delete_task(
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    """Prometheus metrics summed over all workers (async: the threadpool gauges are read on the event loop)"""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if metrics.METRICS_TOKEN and not secrets.compare_digest(
+            request.headers.get("authorization", ""), f"Bearer {metrics.METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(metrics.render(metrics.read_snapshots()), media_type=metrics.CONTENT_TYPE)
+
 @app.post("/api/mentor-contact")
 async def send_mentor_contact_email(
     request: dict,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Send mentor contact request email to max.rothe@spartup.edu and track engagement
@@ -782,11 +971,12 @@ async def send_mentor_contact_email(
             )
         
         # Get mentor from database
-        mentor = db.query(models.Mentor).filter(models.Mentor.id == mentor_data.get('id')).first()
+        mentor = (await db.execute(
+            select(models.Mentor).where(models.Mentor.id == mentor_data.get('id'))
+        )).scalars().first()
         if mentor:
             # Update mentor contact requests count
             mentor.contact_requests += 1
-            db.commit()
         
         # Create mentor contact request record
         contact_request = models.MentorContactRequest(
@@ -798,7 +988,7 @@ async def send_mentor_contact_email(
             reason=contact_info.get('reason')
         )
         db.add(contact_request)
-        db.commit()
+        await db.commit()
         
         # Create email content
         subject = f"Mentor Contact Request: {contact_info.get('name', 'Unknown')} wants to connect with {mentor_data.get('full_name', 'Mentor')}"
@@ -832,7 +1022,10 @@ Best regards,
 SpartUp CRM System
         """
         
-        # Create message schema
+        # Create message schema (the first send imports fastapi_mail off the event loop)
+        fastmail = await run_in_threadpool(get_fastmail)
+        conf = get_mail_config()
+        from fastapi_mail import MessageSchema
         message = MessageSchema(
             subject=subject,
             recipients=[recipient_email],
@@ -842,14 +1035,19 @@ SpartUp CRM System
         
         # Send email synchronously to catch errors
         try:
-            print(f"Attempting to send email to: {recipient_email}")
-            print(f"Email subject: {subject}")
-            await fastmail.send_message(message)
-            print("Email sent successfully!")
+            logger.info("Sending mentor contact email", extra={"subject": subject})
+            metrics.registry.emails_in_progress += 1
+            try:
+                with tracing.span("smtp.send_message", server=conf.MAIL_SERVER, port=conf.MAIL_PORT):
+                    await fastmail.send_message(message)
+            finally:
+                metrics.registry.emails_in_progress -= 1
+            metrics.registry.emails["sent"] += 1
             email_sent = True
         except Exception as email_error:
-            print(f"Email sending failed: {str(email_error)}")
-            print(f"Email config: MAIL_SERVER={conf.MAIL_SERVER}, MAIL_PORT={conf.MAIL_PORT}")
+            metrics.registry.emails["failed"] += 1
+            logger.warning(f"Email sending failed: {email_error}",
+                           extra={"mail_server": conf.MAIL_SERVER, "mail_port": conf.MAIL_PORT})
             email_sent = False
         
         return {
@@ -859,7 +1057,7 @@ SpartUp CRM System
         }
         
     except Exception as e:
-        print(f"Error sending mentor contact email: {str(e)}")
+        logger.exception("Error sending mentor contact email")
         raise HTTPException(
             status_code=500,
             detail="Failed to send contact request"
@@ -867,8 +1065,87 @@ SpartUp CRM System
 
 # --- Engagement Tracking Endpoints ---
 
+# Write jobs for the hot engagement paths. They stage changes on the session
+# they are given and leave committing to sqlite_writer.run_write, so they can
+# run either on the request session or batched in the SQLite writer queue.
+def record_login(db: Session, user_id: int, client_ip: str, user_agent: str):
+    """Insert a login session and bump the user's login counters"""
+    db.add(telemetry.build_login_session(db, user_id, client_ip, user_agent))
+    return db.query(models.User).filter(models.User.id == user_id).update({
+        models.User.logins: func.coalesce(models.User.logins, 0) + 1,
+        models.User.last_login: datetime.utcnow()
+    }, synchronize_session=False)
+
+def record_member_rsvp(db: Session, event_id: int, user_id: int, email: str, rsvp_status: str):
+    # Check if event exists
+    event = db.query(models.Event.id).filter(models.Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    # Check if user already RSVP'd
+    existing_rsvp = db.query(models.EventRSVP).filter(
+        models.EventRSVP.event_id == event_id,
+        models.EventRSVP.user_id == user_id
+    ).first()
+    
+    if existing_rsvp:
+        # Update existing RSVP
+        existing_rsvp.rsvp_status = rsvp_status
+    else:
+        # Create new RSVP
+        db.add(models.EventRSVP(
+            event_id=event_id,
+            user_id=user_id,
+            email=email,
+            rsvp_status=rsvp_status
+        ))
+        
+        # Update user RSVP count
+        db.query(models.User).filter(models.User.id == user_id).update(
+            {models.User.rsvps: func.coalesce(models.User.rsvps, 0) + 1}, synchronize_session=False
+        )
+    return {"message": "RSVP recorded successfully"}
+
+def record_public_rsvp(db: Session, event_id: int, email: str, rsvp_status: str):
+    # Check if event exists
+    event = db.query(models.Event.id).filter(models.Event.id == event_id).first()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    # Check if email already RSVP'd for this event
+    existing_rsvp = db.query(models.EventRSVP).filter(
+        models.EventRSVP.event_id == event_id,
+        models.EventRSVP.email == email
+    ).first()
+    
+    if existing_rsvp:
+        # Update existing RSVP
+        existing_rsvp.rsvp_status = rsvp_status
+        return {"message": "RSVP updated successfully"}
+    
+    # Check if email belongs to a registered user
+    user = db.query(models.User).filter(models.User.email == email).first()
+    
+    # Create new RSVP
+    db.add(models.EventRSVP(
+        event_id=event_id,
+        user_id=user.id if user else None,
+        email=email,
+        rsvp_status=rsvp_status
+    ))
+    
+    # If user exists, update their RSVP count
+    if user:
+        user.rsvps = (user.rsvps or 0) + 1
+    
+    return {
+        "message": "RSVP recorded successfully",
+        "is_member": user is not None,
+        "user_id": user.id if user else None
+    }
+
 @app.post("/api/login-session")
-async def record_login_session(
+def record_login_session(
     user_id: int,
     request: Request,
     db: Session = Depends(get_db)
@@ -879,21 +1156,12 @@ async def record_login_session(
         client_ip = request.client.host
         user_agent = request.headers.get("user-agent", "")
         
-        # Create login session
-        login_session = models.LoginSession(
-            user_id=user_id,
-            ip_address=client_ip,
-            user_agent=user_agent
-        )
-        db.add(login_session)
-        
-        # Update user login count and last login
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if user:
-            user.logins += 1
-            user.last_login = datetime.utcnow()
-        
-        db.commit()
+        updated = sqlite_writer.run_write(db, lambda session: record_login(session, user_id, client_ip, user_agent))
+
+        if updated:
+            user = db.query(models.User).filter(models.User.id == user_id).first()
+            sketches.record_login(user, client_ip, user_agent)
+            sketches.sketch_store.maybe_flush(db)
         return {"message": "Login session recorded"}
     except Exception as e:
         db.rollback()
@@ -903,41 +1171,22 @@ async def record_login_session(
 def rsvp_for_event(
     event_id: int,
     rsvp_data: schemas.EventRSVPCreate,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """RSVP for an event and track engagement (authenticated users)"""
     try:
-        # Check if event exists
-        event = db.query(models.Event).filter(models.Event.id == event_id).first()
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found")
-        
-        # Check if user already RSVP'd
-        existing_rsvp = db.query(models.EventRSVP).filter(
-            models.EventRSVP.event_id == event_id,
-            models.EventRSVP.user_id == current_user.id
-        ).first()
-        
-        if existing_rsvp:
-            # Update existing RSVP
-            existing_rsvp.rsvp_status = rsvp_data.rsvp_status
-        else:
-            # Create new RSVP
-            rsvp = models.EventRSVP(
-                event_id=event_id,
-                user_id=current_user.id,
-                email=current_user.email,
-                rsvp_status=rsvp_data.rsvp_status
-            )
-            db.add(rsvp)
-            
-            # Update user RSVP count
-            current_user.rsvps += 1
-        
-        db.commit()
-        return {"message": "RSVP recorded successfully"}
+        user_id, email = current_user.id, current_user.email
+        result = sqlite_writer.run_write(
+            db, lambda session: record_member_rsvp(session, event_id, user_id, email, rsvp_data.rsvp_status)
+        )
+
+        sketches.record_rsvp(event_id, request.client.host, request.headers.get("user-agent", ""))
+        sketches.sketch_store.maybe_flush(db)
+        return result
     except Exception as e:
+        logger.exception(f"Failed to record RSVP for event {event_id}")
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to record RSVP")
 
@@ -945,56 +1194,27 @@ def rsvp_for_event(
 def public_rsvp_for_event(
     event_id: int,
     rsvp_data: schemas.EventRSVPCreate,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Public RSVP for an event (no authentication required)"""
     try:
-        # Check if event exists
-        event = db.query(models.Event).filter(models.Event.id == event_id).first()
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found")
-        
-        # Check if email already RSVP'd for this event
-        existing_rsvp = db.query(models.EventRSVP).filter(
-            models.EventRSVP.event_id == event_id,
-            models.EventRSVP.email == rsvp_data.email
-        ).first()
-        
-        if existing_rsvp:
-            # Update existing RSVP
-            existing_rsvp.rsvp_status = rsvp_data.rsvp_status
-            db.commit()
-            return {"message": "RSVP updated successfully"}
-        
-        # Check if email belongs to a registered user
-        user = db.query(models.User).filter(models.User.email == rsvp_data.email).first()
-        
-        # Create new RSVP
-        rsvp = models.EventRSVP(
-            event_id=event_id,
-            user_id=user.id if user else None,
-            email=rsvp_data.email,
-            rsvp_status=rsvp_data.rsvp_status
+        result = sqlite_writer.run_write(
+            db, lambda session: record_public_rsvp(session, event_id, rsvp_data.email, rsvp_data.rsvp_status)
         )
-        db.add(rsvp)
-        
-        # If user exists, update their RSVP count
-        if user:
-            user.rsvps += 1
-        
-        db.commit()
+
+        if "is_member" in result:
+            sketches.record_rsvp(event_id, request.client.host, request.headers.get("user-agent", ""))
+            sketches.sketch_store.maybe_flush(db)
         
-        return {
-            "message": "RSVP recorded successfully",
-            "is_member": user is not None,
-            "user_id": user.id if user else None
-        }
+        return result
     except Exception as e:
+        logger.exception(f"Failed to record RSVP for event {event_id}")
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to record RSVP")
 
 @app.get("/api/tags", response_model=List[schemas.Tag])
-def get_tags(db: Session = Depends(get_db)):
+def get_tags(db: Session = Depends(get_read_db)):
     """
     Get all tags.
     
@@ -1042,7 +1262,7 @@ def get_engagement_stats(db: Session = Depends(get_db)):
                 for mentor in top_mentors
             ]
         except Exception as e:
-            print(f"Error getting top mentors: {e}")
+            logger.warning(f"Error getting top mentors: {e}")
             top_mentors_data = []
         
         # Recent activity (last 10 login sessions)
@@ -1067,9 +1287,17 @@ def get_engagement_stats(db: Session = Depends(get_db)):
                 for login in recent_logins
             ]
         except Exception as e:
-            print(f"Error getting recent activity: {e}")
+            logger.warning(f"Error getting recent activity: {e}")
             recent_activity = []
         
+        # Approximate unique visitors from the HyperLogLog sketches
+        try:
+            unique_ips = sketches.sketch_store.estimate(db, "ip", "all", days=30)
+            unique_devices = sketches.sketch_store.estimate(db, "device", "all", days=30)
+        except Exception as e:
+            logger.warning(f"Error estimating unique visitors: {e}")
+            unique_ips = unique_devices = 0
+        
         return schemas.EngagementStats(
             total_users=total_users,
             active_users_this_month=active_users_this_month,
@@ -1077,14 +1305,35 @@ def get_engagement_stats(db: Session = Depends(get_db)):
             total_rsvps=total_rsvps,
             total_mentor_requests=total_mentor_requests,
             top_mentors_by_requests=top_mentors_data,
-            recent_activity=recent_activity
+            recent_activity=recent_activity,
+            unique_ips_this_month=unique_ips,
+            unique_devices_this_month=unique_devices,
+            unique_count_std_error=sketches.HLL_STD_ERROR
         )
     except Exception as e:
-        print(f"Engagement stats error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Engagement stats error")
         raise HTTPException(status_code=500, detail=f"Failed to get engagement stats: {str(e)}")
 
+@app.get("/api/engagement/unique", response_model=schemas.UniqueCount, dependencies=[Depends(get_current_admin_user)])
+def get_unique_count(
+    metric: str = Query("ip", pattern="^(ip|device)$"),
+    scope: str = "all",
+    days: int = Query(1, ge=1, le=366),
+    db: Session = Depends(get_db)
+):
+    """
+    Approximate distinct IPs or devices (IP + user agent) over the last `days` days.
+    Scope is `all`, `cohort:<YYYY-MM-DD>` (signup week, Monday) or `event:<id>`.
+    Estimates carry a relative standard error of about 0.81%.
+    """
+    return schemas.UniqueCount(
+        metric=metric,
+        scope=scope,
+        days=days,
+        estimate=sketches.sketch_store.estimate(db, metric, scope, days=days),
+        std_error=sketches.HLL_STD_ERROR
+    )
+
 @app.get("/api/engagement/users", response_model=List[schemas.UserEngagement], dependencies=[Depends(get_current_admin_user)])
 def get_user_engagement(db: Session = Depends(get_db)):
     """Get user engagement data for admin dashboard"""
@@ -1107,6 +1356,211 @@ def get_user_engagement(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to get user engagement data")
 
+@app.post("/api/admin/retention", dependencies=[Depends(get_current_admin_user)])
+def archive_old_records(
+    background_tasks: BackgroundTasks,
+    dry_run: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Archive rows older than RETENTION_DAYS from append-only tables.
+    With dry_run, returns the number of eligible rows; otherwise runs in the background.
+    """
+    if dry_run:
+        return {"dry_run": True, "eligible": retention.run_retention(db, dry_run=True)}
+
+    def _run():
+        with get_db_context() as background_db:
+            retention.run_retention(background_db)
+
+    background_tasks.add_task(_run)
+    return {"dry_run": False, "message": "Retention run started"}
+
+@app.get("/api/admin/db-pool", dependencies=[Depends(get_current_admin_user)])
+def get_db_pool_metrics():
+    """Connection pool usage, checkout waits, hold time per route and sizing guidance (this worker)"""
+    return {
+        "pid": os.getpid(),
+        "primary": pool_metrics.pool_snapshot(engine, workers=WEB_CONCURRENCY),
+        "primary_async": pool_metrics.pool_snapshot(async_engine.sync_engine, workers=WEB_CONCURRENCY) if async_engine is not None else None,
+        "replicas": [pool_metrics.pool_snapshot(replica, workers=WEB_CONCURRENCY) for replica in replica_set.engines],
+        "read_only": pool_metrics.pool_snapshot(read_only_engine, workers=WEB_CONCURRENCY) if read_only_engine is not None else None,
+    }
+
+@app.get("/api/admin/sqlite-writer", dependencies=[Depends(get_current_admin_user)])
+def get_sqlite_writer_stats():
+    """Queue depth and group-commit batch sizes of this worker's SQLite writer"""
+    return sqlite_writer.sqlite_writer.stats()
+
+@app.get("/api/admin/sqlite", dependencies=[Depends(get_current_admin_user)])
+def get_sqlite_metrics():
+    """WAL size, checkpoint lag and maintenance history (SQLite deployments only)"""
+    if sqlite_maintenance is None:
+        raise HTTPException(status_code=404, detail="SQLite maintenance is not enabled")
+    return sqlite_maintenance.snapshot()
+
+@app.post("/api/admin/index-advisor/capture", dependencies=[Depends(get_current_admin_user)])
+def set_index_advisor_capture(enabled: bool = True, reset: bool = False):
+    """Start or stop recording this worker's query workload for the index advisor"""
+    recorder = index_advisor.workload_recorder
+    recorder.install(engine)
+    if reset:
+        recorder.reset()
+    recorder.enabled = enabled
+    return {"enabled": recorder.enabled, "statements": len(recorder.statements)}
+
+@app.get("/api/admin/index-advisor", dependencies=[Depends(get_current_admin_user)])
+def get_index_advice():
+    """EXPLAIN the captured workload: full scans, sorts and recommended indexes"""
+    return index_advisor.analyze(engine)
+
+@app.get("/api/admin/index-advisor/migration", response_class=PlainTextResponse, dependencies=[Depends(get_current_admin_user)])
+def get_index_advice_migration():
+    """Alembic revision stub creating the recommended indexes"""
+    report = index_advisor.analyze(engine)
+    return index_advisor.render_migration(report["recommendations"], index_advisor.migration_head())
+
+@app.get("/api/admin/profiles", dependencies=[Depends(get_current_admin_user)])
+def get_profiles():
+    """Stored request profiles (folded stacks), newest first"""
+    return {"directory": profiling.PROFILE_DIR, "profiles": profiling.list_profiles()}
+
+@app.get("/api/admin/profiles/{name}", response_class=PlainTextResponse, dependencies=[Depends(get_current_admin_user)])
+def get_profile(name: str):
+    """One profile in folded-stack format, for flamegraph.pl or speedscope"""
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path) as f:
+        return f.read()
+
+@app.get("/api/admin/traces", dependencies=[Depends(get_current_admin_user)])
+def get_traces(min_ms: float = 0, route: Optional[str] = None, limit: int = Query(50, le=500)):
+    """Recent traces of this worker, newest first (TRACING=true)"""
+    return {
+        "enabled": tracing.TRACING,
+        "pid": os.getpid(),
+        "traces": tracing.trace_buffer.summaries(min_ms=min_ms, route=route, limit=limit)
+    }
+
+@app.get("/api/admin/traces/{trace_id}", dependencies=[Depends(get_current_admin_user)])
+def get_trace(trace_id: str):
+    """All spans of one trace held by this worker"""
+    trace = tracing.trace_buffer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found in this worker's buffer")
+    return trace
+
+@app.get("/api/admin/slow-requests", dependencies=[Depends(get_current_admin_user)])
+def get_slow_requests(route: Optional[str] = None, limit: int = Query(50, le=500)):
+    """Recent requests over their latency threshold in this worker, newest first"""
+    recorder = slow_requests.recorder
+    return {
+        "enabled": slow_requests.SLOW_REQUESTS,
+        "pid": os.getpid(),
+        "default_threshold_ms": recorder.default_ms,
+        "route_thresholds_ms": recorder.routes,
+        "requests": recorder.summaries(route=route, limit=limit)
+    }
+
+@app.get("/api/admin/slow-requests/{record_id}", dependencies=[Depends(get_current_admin_user)])
+def get_slow_request(record_id: str):
+    """Statements, timings and EXPLAIN plans of one slow request"""
+    record = slow_requests.recorder.get(record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Slow request not found in this worker's buffer")
+    return record
+
+@app.get("/api/admin/memory", dependencies=[Depends(get_current_admin_user)])
+def get_memory():
+    """RSS, GC generations, SQLAlchemy identity maps and tracemalloc state of this worker"""
+    return memory_profiling.summary()
+
+@app.post("/api/admin/memory/tracemalloc/start", dependencies=[Depends(get_current_admin_user)])
+def start_tracemalloc(frames: int = Query(memory_profiling.MEMORY_TRACE_FRAMES, ge=1, le=100)):
+    """Start tracing allocations in this worker (slows it down until stopped)"""
+    return dict(memory_profiling.start(frames), pid=os.getpid())
+
+@app.post("/api/admin/memory/tracemalloc/stop", dependencies=[Depends(get_current_admin_user)])
+def stop_tracemalloc():
+    """Stop tracing allocations and drop this worker's snapshots"""
+    return dict(memory_profiling.stop(), pid=os.getpid())
+
+@app.post("/api/admin/memory/snapshots", dependencies=[Depends(get_current_admin_user)])
+def take_memory_snapshot(label: str = "", group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+                         limit: int = Query(25, le=500)):
+    """Take a tracemalloc snapshot; returns it with its top allocation sites"""
+    try:
+        snapshot = memory_profiling.snapshot_store.take(label)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    snapshot["top"] = memory_profiling.top(memory_profiling.snapshot_store.get(snapshot["id"]), group_by, limit)
+    return dict(snapshot, pid=os.getpid())
+
+@app.get("/api/admin/memory/snapshots", dependencies=[Depends(get_current_admin_user)])
+def get_memory_snapshots():
+    """Snapshots held by this worker, oldest first"""
+    return {"pid": os.getpid(), "snapshots": memory_profiling.snapshot_store.list()}
+
+@app.get("/api/admin/memory/snapshots/{snapshot_id}", dependencies=[Depends(get_current_admin_user)])
+def get_memory_snapshot(snapshot_id: str, group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+                        limit: int = Query(25, le=500)):
+    """Top allocation sites of one snapshot"""
+    snapshot = memory_profiling.snapshot_store.get(snapshot_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found in this worker")
+    return {"pid": os.getpid(), "id": snapshot_id, "top": memory_profiling.top(snapshot, group_by, limit)}
+
+@app.get("/api/admin/memory/snapshots/{snapshot_id}/diff", dependencies=[Depends(get_current_admin_user)])
+def diff_memory_snapshots(snapshot_id: str, base: Optional[str] = None,
+                          group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+                          limit: int = Query(25, le=500)):
+    """Allocation growth from `base` (default: the previous snapshot) to this snapshot"""
+    store = memory_profiling.snapshot_store
+    base = base or store.previous(snapshot_id)
+    snapshot, base_snapshot = store.get(snapshot_id), store.get(base) if base else None
+    if snapshot is None or base_snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot or base snapshot not found in this worker")
+    return {
+        "pid": os.getpid(),
+        "id": snapshot_id,
+        "base": base,
+        "diff": memory_profiling.diff(snapshot, base_snapshot, group_by, limit)
+    }
+
+@app.get("/api/admin/replicas", dependencies=[Depends(get_current_admin_user)])
+def get_replica_status():
+    """Health and measured lag of each configured read replica"""
+    return {
+        "replicas": replica_set.status,
+        "sticky_seconds": REPLICA_STICKY_SECONDS
+    }
+
+# --- Analytics Endpoints ---
+
+@app.get("/api/analytics/retention", response_model=schemas.RetentionCohorts, dependencies=[Depends(get_current_admin_user)])
+def get_retention_cohorts(
+    period: str = Query("week", pattern="^(day|week|month)$"),
+    max_periods: int = Query(12, ge=1, le=104),
+    db: Session = Depends(get_db)
+):
+    """Signup-cohort retention matrix, served from the cached columnar snapshot"""
+    return get_analytics_engine().retention(db, period=period, max_periods=max_periods)
+
+@app.get("/api/analytics/funnel", response_model=schemas.Funnel, dependencies=[Depends(get_current_admin_user)])
+def get_engagement_funnel(
+    days: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """Visitor RSVP -> registered member -> mentor request funnel"""
+    return get_analytics_engine().funnel(db, days=days)
+
+@app.post("/api/analytics/refresh", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(get_current_admin_user)])
+def refresh_analytics(db: Session = Depends(get_db)):
+    """Force a re-extraction of the analytics snapshot"""
+    get_analytics_engine().refresh(db)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,214 @@
+"""
+Memory introspection for the worker serving the request.
+
+  - process: resident set size (current and peak) from /proc, falling back to
+    getrusage's peak where /proc is not available
+  - gc: objects pending per generation, collections per generation, uncollectable
+  - sessions: live SQLAlchemy sessions, their identity map sizes and which
+    models they hold; a session that still holds objects or an open transaction
+    between requests is one an error path forgot to close
+  - tracemalloc: started and stopped on demand (it slows allocations down and
+    keeps a traceback per block), snapshots kept in memory, top allocation
+    sites of a snapshot and the diff between two snapshots
+
+Every gunicorn worker has its own heap, so all of this describes one worker;
+responses carry its pid. At most MEMORY_MAX_SNAPSHOTS snapshots are kept, the
+oldest are dropped first, and stopping tracemalloc drops them all.
+"""
+
+import os
+import gc
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict
+
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "10"))
+MEMORY_MAX_SNAPSHOTS = int(os.getenv("MEMORY_MAX_SNAPSHOTS", "5"))
+
+# Allocations made by the profiler itself and the import machinery are noise
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _proc_status() -> dict:
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return values
+
+
+def process_memory() -> dict:
+    status = _proc_status()
+    if status:
+        return {"rss_bytes": status.get("VmRSS"), "peak_rss_bytes": status.get("VmHWM")}
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return {"rss_bytes": None, "peak_rss_bytes": peak if sys.platform == "darwin" else peak * 1024}
+
+
+def gc_stats() -> dict:
+    return {
+        "pending": list(gc.get_count()),
+        "thresholds": list(gc.get_threshold()),
+        "generations": gc.get_stats(),
+        "uncollectable": len(gc.garbage),
+    }
+
+
+def _live_sessions() -> list:
+    try:
+        from sqlalchemy.orm.session import _sessions
+        return list(_sessions.values())
+    except ImportError:
+        from sqlalchemy.orm import Session
+        return [o for o in gc.get_objects() if isinstance(o, Session)]
+
+
+def session_stats(limit: int = 20) -> dict:
+    """Identity map sizes of the SQLAlchemy sessions alive in this worker."""
+    sessions = []
+    models = Counter()
+    for session in _live_sessions():
+        identities = len(session.identity_map)
+        if identities:
+            models.update(type(state.obj()).__name__ for state in session.identity_map.all_states() if state.obj() is not None)
+        bind = session.bind
+        sessions.append({
+            "session": f"{type(session).__name__}@{id(session):x}",
+            "identities": identities,
+            "new": len(session.new),
+            "dirty": len(session.dirty),
+            "in_transaction": session.in_transaction(),
+            "bind": bind.dialect.name if bind is not None else None,
+        })
+    sessions.sort(key=lambda s: s["identities"], reverse=True)
+    return {
+        "live": len(sessions),
+        "holding_objects": sum(1 for s in sessions if s["identities"] or s["in_transaction"]),
+        "identities": sum(s["identities"] for s in sessions),
+        "by_model": dict(models.most_common()),
+        "largest": sessions[:limit],
+    }
+
+
+def summary() -> dict:
+    return {
+        "pid": os.getpid(),
+        "process": process_memory(),
+        "gc": gc_stats(),
+        "sessions": session_stats(),
+        "tracemalloc": tracemalloc_status(),
+    }
+
+
+class SnapshotStore:
+    """tracemalloc snapshots of this worker, oldest first."""
+
+    def __init__(self, size: int = MEMORY_MAX_SNAPSHOTS):
+        self.size = size
+        self.snapshots = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def take(self, label: str = "") -> dict:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        with self._lock:
+            snapshot_id = str(self._next_id)
+            self._next_id += 1
+            self.snapshots[snapshot_id] = (snapshot, time.time(), label)
+            while len(self.snapshots) > self.size:
+                self.snapshots.popitem(last=False)
+            return self.describe(snapshot_id)
+
+    def describe(self, snapshot_id: str) -> dict:
+        snapshot, taken, label = self.snapshots[snapshot_id]
+        return {
+            "id": snapshot_id,
+            "label": label,
+            "taken": taken,
+            "traced_bytes": sum(trace.size for trace in snapshot.traces),
+            "blocks": len(snapshot.traces),
+        }
+
+    def list(self) -> list:
+        with self._lock:
+            return [self.describe(snapshot_id) for snapshot_id in self.snapshots]
+
+    def get(self, snapshot_id: str):
+        entry = self.snapshots.get(snapshot_id)
+        return entry[0] if entry is not None else None
+
+    def previous(self, snapshot_id: str):
+        """Id of the snapshot taken before `snapshot_id`, or None."""
+        with self._lock:
+            ids = list(self.snapshots)
+        index = ids.index(snapshot_id) if snapshot_id in ids else 0
+        return ids[index - 1] if index > 0 else None
+
+    def clear(self):
+        with self._lock:
+            self.snapshots.clear()
+
+
+snapshot_store = SnapshotStore()
+
+
+def tracemalloc_status() -> dict:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else None,
+        "traced_bytes": current,
+        "peak_traced_bytes": peak,
+        "overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else 0,
+        "snapshots": snapshot_store.list(),
+    }
+
+
+def start(frames: int = MEMORY_TRACE_FRAMES) -> dict:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return tracemalloc_status()
+
+
+def stop() -> dict:
+    tracemalloc.stop()
+    snapshot_store.clear()
+    return tracemalloc_status()
+
+
+def _site(stat, group_by: str) -> dict:
+    frames = stat.traceback if group_by == "traceback" else stat.traceback[:1]
+    return {"frames": [f"{frame.filename}:{frame.lineno}" for frame in frames]}
+
+
+def top(snapshot, group_by: str = "lineno", limit: int = 25) -> list:
+    return [
+        dict(_site(stat, group_by), size_bytes=stat.size, blocks=stat.count)
+        for stat in snapshot.statistics(group_by)[:limit]
+    ]
+
+
+def diff(snapshot, base, group_by: str = "lineno", limit: int = 25) -> list:
+    """Sites whose allocations grew (or shrank) the most from `base` to `snapshot`."""
+    return [
+        dict(_site(stat, group_by), size_bytes=stat.size, size_diff_bytes=stat.size_diff,
+             blocks=stat.count, blocks_diff=stat.count_diff)
+        for stat in snapshot.compare_to(base, group_by)[:limit]
+    ]
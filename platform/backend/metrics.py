@@ -0,0 +1,289 @@
+"""
+Prometheus metrics, aggregated across gunicorn workers.
+
+Each worker keeps its metrics in plain Python counters updated on the event
+loop (MetricsMiddleware adds about two microseconds per request, see
+benchmark_metrics.py) and every METRICS_FLUSH_SECONDS writes a snapshot to
+METRICS_DIR/worker-<pid>.json (write to a temp file, then rename, so readers
+never see a partial file). /metrics merges the snapshots of all workers with
+the live state of the worker serving the scrape:
+
+  - counters and histograms are summed, including those of workers that have
+    exited, so totals do not drop when gunicorn replaces a worker
+  - gauges are summed over live workers only
+
+railway_start.sh empties METRICS_DIR before gunicorn starts. Exported:
+
+  http_request_duration_seconds{method,route}  histogram, route template labels
+  http_responses_total{method,route,status}
+  http_requests_in_flight
+  db_pool_* per engine (size, in use, overflow, checkouts, checkout wait)
+  cache_hits_total / cache_misses_total{cache}  analytics results, user agents
+  email_sends_in_progress, email_sends_total{result}
+  threadpool_threads_busy / threadpool_tasks_waiting  (bcrypt and sync endpoints)
+  sqlite_writer_queue_depth
+
+Enabled by ENABLE_PERFORMANCE_MONITORING (default true). Set METRICS_TOKEN to
+require `Authorization: Bearer <token>` on /metrics.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("ENABLE_PERFORMANCE_MONITORING", "True").lower() in ('true', '1', 't')
+METRICS_DIR = os.getenv("METRICS_DIR", "worker_metrics")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "http_request_duration_seconds": ("histogram", "Request latency by route template"),
+    "http_responses_total": ("counter", "Responses by route template and status code"),
+    "http_requests_in_flight": ("gauge", "Requests being served"),
+    "db_pool_size": ("gauge", "Configured pool size"),
+    "db_pool_connections_in_use": ("gauge", "Connections checked out of the pool"),
+    "db_pool_overflow": ("gauge", "Connections open beyond the pool size"),
+    "db_pool_checkouts_total": ("counter", "Connection checkouts"),
+    "db_pool_checkout_wait_seconds_total": ("counter", "Time spent waiting for a pooled connection"),
+    "db_pool_invalidations_total": ("counter", "Connections invalidated (failed pings, errors)"),
+    "cache_hits_total": ("counter", "Cache lookups answered from the cache"),
+    "cache_misses_total": ("counter", "Cache lookups that had to be computed"),
+    "email_sends_in_progress": ("gauge", "E-mails being handed to the mail server"),
+    "email_sends_total": ("counter", "E-mail deliveries by result"),
+    "threadpool_threads_busy": ("gauge", "Threadpool tokens in use (sync endpoints, bcrypt)"),
+    "threadpool_tasks_waiting": ("gauge", "Tasks queued for a threadpool token"),
+    "threadpool_size": ("gauge", "Threadpool token limit"),
+    "sqlite_writer_queue_depth": ("gauge", "Write jobs queued for the SQLite writer"),
+}
+
+
+class RouteStats:
+    __slots__ = ("buckets", "sum", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.statuses = {}
+
+
+class Registry:
+    """This worker's metrics. Only touched from the event loop thread, so no locking."""
+
+    def __init__(self):
+        self.routes = {}
+        self.in_flight = 0
+        self.emails_in_progress = 0
+        self.emails = {"sent": 0, "failed": 0}
+        self.collectors = []
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+        stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        stats.sum += seconds
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def register_collector(self, collector):
+        """`collector()` returns [(name, labels dict, value)] for the counters and gauges it owns."""
+        self.collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        samples, histograms = [], []
+        for (method, route), stats in self.routes.items():
+            labels = {"method": method, "route": route}
+            histograms.append([labels, stats.buckets, stats.sum])
+            for status, count in stats.statuses.items():
+                samples.append(["http_responses_total", {**labels, "status": str(status)}, count])
+        samples.append(["http_requests_in_flight", {}, self.in_flight])
+        samples.append(["email_sends_in_progress", {}, self.emails_in_progress])
+        for result, count in self.emails.items():
+            samples.append(["email_sends_total", {"result": result}, count])
+        for collector in self.collectors:
+            try:
+                samples.extend([name, labels, value] for name, labels, value in collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        return {"pid": os.getpid(), "time": time.time(), "samples": samples, "histograms": histograms}
+
+
+registry = Registry()
+
+
+def write_snapshot(directory: str = METRICS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"worker-{os.getpid()}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(registry.snapshot(), f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_snapshots(directory: str = METRICS_DIR) -> list:
+    """Snapshots of every worker, with this worker's taken live."""
+    snapshots = [registry.snapshot()]
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if not (name.startswith("worker-") and name.endswith(".json")) or name == f"worker-{os.getpid()}.json":
+                continue
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # the worker is replacing it right now
+    return snapshots
+
+
+def merge(snapshots: list):
+    """({(name, labels): value}, {labels: [buckets, sum]}) summed over workers."""
+    samples, histograms = {}, {}
+    for snapshot in snapshots:
+        alive = snapshot["pid"] == os.getpid() or _alive(snapshot["pid"])
+        for name, labels, value in snapshot["samples"]:
+            if not alive and HELP.get(name, ("gauge",))[0] == "gauge":
+                continue
+            key = (name, tuple(sorted(labels.items())))
+            samples[key] = samples.get(key, 0) + value
+        for labels, buckets, total in snapshot["histograms"]:
+            key = tuple(sorted(labels.items()))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = [list(buckets), total]
+            else:
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+    return samples, histograms
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshots: list) -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    samples, histograms = merge(snapshots)
+    lines = []
+    by_name = {}
+    for (name, labels), value in samples.items():
+        by_name.setdefault(name, []).append((labels, value))
+    name = "http_request_duration_seconds"
+    lines += [f"# HELP {name} {HELP[name][1]}", f"# TYPE {name} histogram"]
+    for labels, (buckets, total) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+        lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    for name in sorted(by_name):
+        kind, description = HELP.get(name, ("untyped", name))
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        for labels, value in sorted(by_name[name]):
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+async def flush_periodically(interval: float = METRICS_FLUSH_SECONDS):
+    # Runs on the event loop, so it reads the registry without racing the middleware
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            write_snapshot()
+        except Exception as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency per route template, status and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def status_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, status_send)
+        finally:
+            registry.in_flight -= 1
+            route = scope.get("route")
+            registry.observe(scope["method"], route.path if route is not None else "<unmatched>",
+                             status, time.perf_counter() - start)
+
+
+def pool_samples(name: str, engine) -> list:
+    pool = engine.pool
+    samples = []
+    if hasattr(pool, "size"):
+        labels = {"pool": name}
+        samples += [
+            ("db_pool_size", labels, pool.size()),
+            ("db_pool_connections_in_use", labels, pool.checkedout()),
+            ("db_pool_overflow", labels, max(0, pool.overflow())),
+        ]
+        stats = getattr(pool, "stats", None)
+        if stats is not None:
+            samples += [
+                ("db_pool_checkouts_total", labels, stats.checkouts),
+                ("db_pool_checkout_wait_seconds_total", labels, stats.wait_total),
+                ("db_pool_invalidations_total", labels, stats.invalidations),
+            ]
+    return samples
+
+
+def threadpool_samples() -> list:
+    """Starlette's threadpool (anyio's default limiter); must be called on the event loop."""
+    from anyio import to_thread
+    limiter = to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    return [
+        ("threadpool_size", {}, limiter.total_tokens),
+        ("threadpool_threads_busy", {}, statistics.borrowed_tokens),
+        ("threadpool_tasks_waiting", {}, statistics.tasks_waiting),
+    ]
+
+
+def cache_samples(name: str, cache) -> list:
+    return [
+        ("cache_hits_total", {"cache": name}, cache.hits),
+        ("cache_misses_total", {"cache": name}, cache.misses),
+    ]
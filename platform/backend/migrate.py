@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Apply schema migrations (Alembic revisions in migrations/versions).
+
+The common case on deploy is that there is nothing to do, so the current
+revision in alembic_version is compared with the script heads first and
+Alembic's environment is only loaded when an upgrade is actually needed.
+
+Usage:
+    python migrate.py              # upgrade to head (no-op when already there)
+    python migrate.py --status     # print current and head revisions
+    python migrate.py --sql        # print the upgrade SQL without running it
+"""
+
+import os
+import sys
+import time
+import logging
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import exc, text
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def get_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    # Resolve migrations/ relative to this file, whatever the working directory
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    return config
+
+
+def head_revisions(config: Config) -> set:
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def current_revisions() -> set:
+    # One round trip on every boot; a missing alembic_version table means an empty schema
+    with engine.connect() as conn:
+        try:
+            return {row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))}
+        except (exc.ProgrammingError, exc.OperationalError):
+            return set()
+
+
+def is_at_head(config: Config = None) -> bool:
+    config = config or get_config()
+    return current_revisions() == head_revisions(config)
+
+
+def upgrade() -> bool:
+    """Upgrade to head. Returns False when the schema was already current."""
+    config = get_config()
+    start = time.perf_counter()
+    if is_at_head(config):
+        logger.info(f"Database schema already at head ({time.perf_counter() - start:.3f}s check)")
+        return False
+    from alembic import command
+
+    logger.info(f"Upgrading database schema from {sorted(current_revisions()) or 'empty'} to {sorted(head_revisions(config))}")
+    command.upgrade(config, "head")
+    logger.info(f"Database schema upgraded in {time.perf_counter() - start:.2f}s")
+    return True
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        config = get_config()
+        print(f"current: {', '.join(sorted(current_revisions())) or '(none)'}")
+        print(f"head:    {', '.join(sorted(head_revisions(config)))}")
+    elif "--sql" in sys.argv:
+        from alembic import command
+        command.upgrade(get_config(), "head", sql=True)
+    else:
+        upgrade()
@@ -0,0 +1,140 @@
+"""
+Online-safe building blocks for Alembic revisions (see migrations/).
+
+Every operation checks the live schema first, so a revision can be applied
+to a database whose tables were created by the old boot-time create_all or
+the ad-hoc ALTER scripts, without relying on swallowed "duplicate column"
+errors:
+
+  ensure_table              CREATE TABLE if absent, otherwise ADD any of its
+                            columns the existing table is missing
+  add_column_if_missing     ADD COLUMN (nullable, no default: metadata-only
+                            on PostgreSQL, no table rewrite)
+  create_index_online       CREATE INDEX CONCURRENTLY on PostgreSQL, outside
+                            the migration transaction, so writes continue
+  backfill_in_batches       keyset-paginated data backfill, one short
+                            transaction per batch
+"""
+
+import os
+import time
+import logging
+
+import sqlalchemy as sa
+from alembic import op, context
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = int(os.getenv("MIGRATION_BACKFILL_BATCH_SIZE", "1000"))
+BACKFILL_BATCH_PAUSE = float(os.getenv("MIGRATION_BACKFILL_BATCH_PAUSE", "0.05"))
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def has_table(table: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    return _inspector().has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    return any(c["name"] == column for c in _inspector().get_columns(table))
+
+
+def has_index(table: str, name: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    return any(i["name"] == name for i in _inspector().get_indexes(table))
+
+
+def ensure_table(table: str, *columns, **kw) -> bool:
+    """Create `table`, or bring an existing copy up to the given columns."""
+    if not has_table(table):
+        op.create_table(table, *columns, **kw)
+        return True
+    for column in columns:
+        if isinstance(column, sa.Column) and not column.primary_key:
+            # Added columns never get a server default: SQLite rejects
+            # non-constant ones and PostgreSQL rewrites the table for volatile ones
+            add_column_if_missing(table, sa.Column(
+                column.name, column.type, *[sa.ForeignKey(fk.target_fullname) for fk in column.foreign_keys], nullable=True
+            ))
+    return False
+
+
+def add_column_if_missing(table: str, column: sa.Column) -> bool:
+    if has_column(table, column.name):
+        logger.debug(f"Column {table}.{column.name} already exists")
+        return False
+    dialect = op.get_context().dialect
+    if column.foreign_keys and dialect.name == "sqlite":
+        # SQLite cannot ALTER in a constraint; an inline REFERENCES clause works
+        (foreign_key,) = column.foreign_keys
+        column_type = column.type.compile(dialect=dialect)
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type} "
+            f"REFERENCES {foreign_key.target_fullname.replace('.', ' (', 1)})"
+        )
+    else:
+        op.add_column(table, column)
+    return True
+
+
+def _drop_invalid_index(name: str):
+    """A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind."""
+    invalid = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+        op.drop_index(name, postgresql_concurrently=True, if_exists=True)
+
+
+def create_index_online(name: str, table: str, columns: list, unique: bool = False, where: str = None):
+    """Create an index without blocking writes to `table`.
+
+    `where` makes it a partial index, e.g. where="status = 'pending'".
+    """
+    kw = {"postgresql_where": sa.text(where), "sqlite_where": sa.text(where)} if where else {}
+    if op.get_context().dialect.name == "postgresql":
+        # CONCURRENTLY cannot run inside a transaction block
+        with op.get_context().autocommit_block():
+            if not context.is_offline_mode():
+                _drop_invalid_index(name)
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True, if_not_exists=True, **kw)
+    elif not has_index(table, name):
+        op.create_index(name, table, columns, unique=unique, **kw)
+
+
+def backfill_in_batches(select_batch, apply_batch, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Backfill rows in keyset-paginated batches, committing after each one.
+
+    `select_batch(conn, last_id, batch_size)` returns the next rows ordered by
+    id, and `apply_batch(conn, rows)` updates them. Runs outside the revision's
+    transaction, so locks are only held for a single batch at a time.
+    Returns the number of rows processed.
+    """
+    if context.is_offline_mode():
+        logger.warning("Skipping data backfill in offline mode")
+        return 0
+    processed = 0
+    last_id = 0
+    with op.get_context().autocommit_block():
+        with op.get_bind().engine.connect() as conn:
+            while True:
+                with conn.begin():
+                    rows = select_batch(conn, last_id, batch_size)
+                    if not rows:
+                        break
+                    apply_batch(conn, rows)
+                last_id = rows[-1].id
+                processed += len(rows)
+                logger.info(f"Backfilled {processed} rows")
+                # Give concurrent writers a chance between batches
+                time.sleep(BACKFILL_BATCH_PAUSE)
+    return processed
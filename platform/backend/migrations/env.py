@@ -0,0 +1,65 @@
+"""
+Alembic environment. Uses the application's engine so migrations run against
+the same database (and with the same SQLite pragmas) as the app.
+
+Each revision runs in its own transaction. On PostgreSQL the run holds an
+advisory lock, so concurrently starting instances migrate one at a time, and
+sets lock_timeout, so a DDL statement stuck behind a long transaction fails
+fast instead of queueing every query on the table behind it.
+"""
+
+import os
+import logging
+
+from alembic import context
+from sqlalchemy import text
+
+from database import engine, DATABASE_URL
+import models
+
+logger = logging.getLogger("migrations")
+
+target_metadata = models.Base.metadata
+
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+# Arbitrary constant shared by every instance of this app
+MIGRATION_ADVISORY_LOCK_ID = 724_201_991
+
+
+def run_migrations_offline():
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_ADVISORY_LOCK_ID})
+            connection.execute(text(f"SET lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'"))
+            connection.commit()
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                transaction_per_migration=True,
+                render_as_batch=connection.dialect.name == "sqlite",
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if is_postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_ADVISORY_LOCK_ID})
+                connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
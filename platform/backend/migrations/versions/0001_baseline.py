@@ -0,0 +1,145 @@
+"""Baseline schema
+
+Creates the original tables on an empty database. On a database built by
+the old boot-time create_all and the ad-hoc scripts (sqlite_migration.py,
+migrate_engagement.py, add_user_engagement_columns.py), it adds whichever
+of those columns are missing instead.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+import migration_ops
+
+# revision identifiers
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    migration_ops.ensure_table(
+        "users",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("email", sa.String, unique=True, index=True),
+        sa.Column("username", sa.String, unique=True, index=True),
+        sa.Column("hashed_password", sa.String),
+        sa.Column("plain_password", sa.String, nullable=True),
+        sa.Column("full_name", sa.String),
+        sa.Column("bio", sa.Text, nullable=True),
+        sa.Column("profile_image", sa.String, nullable=True),
+        sa.Column("is_active", sa.Boolean),
+        sa.Column("role", sa.String),
+        sa.Column("interests", sa.Text),
+        sa.Column("logins", sa.Integer),
+        sa.Column("rsvps", sa.Integer),
+        sa.Column("mentor_requests", sa.Integer),
+        sa.Column("last_login", sa.DateTime, nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    migration_ops.ensure_table(
+        "contacts",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("email", sa.String, unique=True, index=True, nullable=False),
+        sa.Column("full_name", sa.String, nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=True, unique=True),
+    )
+    migration_ops.ensure_table(
+        "tags",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("name", sa.String, unique=True, index=True, nullable=False),
+    )
+    migration_ops.ensure_table(
+        "contact_tags",
+        sa.Column("contact_id", sa.Integer, sa.ForeignKey("contacts.id"), primary_key=True),
+        sa.Column("tag_id", sa.Integer, sa.ForeignKey("tags.id"), primary_key=True),
+    )
+    migration_ops.ensure_table(
+        "tasks",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("title", sa.String, index=True, nullable=False),
+        sa.Column("description", sa.Text, nullable=True),
+        sa.Column("due_date", sa.DateTime, nullable=True),
+        sa.Column("status", sa.String, nullable=False),
+        sa.Column("assigned_to_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_by_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    migration_ops.ensure_table(
+        "events",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("title", sa.String, index=True, nullable=False),
+        sa.Column("description", sa.Text, nullable=True),
+        sa.Column("start_date", sa.DateTime, nullable=False),
+        sa.Column("end_date", sa.DateTime, nullable=True),
+        sa.Column("location", sa.String, nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    migration_ops.ensure_table(
+        "event_rsvps",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("event_id", sa.Integer, sa.ForeignKey("events.id"), nullable=False),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("email", sa.String, nullable=False),
+        sa.Column("rsvp_status", sa.String),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    migration_ops.ensure_table(
+        "research_opportunities",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("full_name", sa.String, index=True, nullable=False),
+        sa.Column("email", sa.String, unique=True, index=True, nullable=False),
+        sa.Column("organization", sa.String, index=True, nullable=True),
+        sa.Column("bio", sa.Text, nullable=True),
+        sa.Column("expertise", sa.Text, nullable=True),
+        sa.Column("mentor_type", sa.String, nullable=True),
+        sa.Column("location", sa.String, nullable=True),
+        sa.Column("is_virtual", sa.Boolean),
+        sa.Column("tags", sa.Text, nullable=True),
+        sa.Column("contact_requests", sa.Integer),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("updated_at", sa.DateTime),
+    )
+    migration_ops.ensure_table(
+        "mentor_contact_requests",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("mentor_id", sa.Integer, sa.ForeignKey("research_opportunities.id"), nullable=False),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("contact_name", sa.String, nullable=False),
+        sa.Column("contact_email", sa.String, nullable=False),
+        sa.Column("contact_major", sa.String, nullable=True),
+        sa.Column("contact_year", sa.String, nullable=True),
+        sa.Column("reason", sa.Text, nullable=False),
+        sa.Column("status", sa.String),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    migration_ops.ensure_table(
+        "login_sessions",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("login_time", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("ip_address", sa.String, nullable=True),
+        sa.Column("user_agent", sa.String, nullable=True),
+    )
+    migration_ops.ensure_table(
+        "newsletters",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("title", sa.String, index=True, nullable=False),
+        sa.Column("content", sa.Text, nullable=False),
+        sa.Column("image", sa.String, nullable=True),
+        sa.Column("publish_date", sa.DateTime, nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    raise NotImplementedError("The baseline revision cannot be downgraded")
@@ -0,0 +1,55 @@
+"""Rollup, sketch and replication heartbeat tables; login_time index
+
+Tables for retention.py (login_session_rollups), sketches.py
+(unique_count_sketches) and database.ReplicaSet (replication_heartbeat),
+plus the login_sessions.login_time index, built concurrently on PostgreSQL.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+import migration_ops
+
+# revision identifiers
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    migration_ops.ensure_table(
+        "login_session_rollups",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("day", sa.Date, nullable=False),
+        sa.Column("logins", sa.Integer, nullable=False),
+        sa.UniqueConstraint("user_id", "day", name="uq_login_rollup_user_day"),
+    )
+    migration_ops.ensure_table(
+        "unique_count_sketches",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("metric", sa.String, nullable=False),
+        sa.Column("scope", sa.String, nullable=False),
+        sa.Column("bucket", sa.Date, nullable=False),
+        sa.Column("registers", sa.LargeBinary, nullable=False),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+        sa.UniqueConstraint("metric", "scope", "bucket", name="uq_sketch_metric_scope_bucket"),
+    )
+    migration_ops.ensure_table(
+        "replication_heartbeat",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("beat_at", sa.Float, nullable=False),
+    )
+    migration_ops.create_index_online("ix_login_sessions_login_time", "login_sessions", ["login_time"])
+
+
+def downgrade():
+    op.drop_index("ix_login_sessions_login_time", table_name="login_sessions")
+    op.drop_table("replication_heartbeat")
+    op.drop_table("unique_count_sketches")
+    op.drop_table("login_session_rollups")
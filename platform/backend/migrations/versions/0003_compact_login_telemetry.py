@@ -0,0 +1,102 @@
+"""Compact login telemetry
+
+Adds the user_agents dictionary and the packed-IP / interned user agent
+columns on login_sessions (see telemetry.py), then re-encodes rows that
+still carry text values in batches. Rows are independent, so an interrupted
+backfill simply resumes on the next run.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+import migration_ops
+from telemetry import parse_user_agent, pack_ip
+
+# revision identifiers
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+login_sessions = sa.table(
+    "login_sessions",
+    sa.column("id", sa.Integer),
+    sa.column("ip_address", sa.String),
+    sa.column("user_agent", sa.String),
+    sa.column("ip_packed", sa.LargeBinary),
+    sa.column("user_agent_id", sa.Integer),
+)
+user_agents = sa.table(
+    "user_agents",
+    sa.column("id", sa.Integer),
+    sa.column("user_agent", sa.Text),
+    sa.column("browser_family", sa.String),
+    sa.column("os_family", sa.String),
+    sa.column("device_family", sa.String),
+)
+
+
+def upgrade():
+    migration_ops.ensure_table(
+        "user_agents",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("user_agent", sa.Text, unique=True, nullable=False),
+        sa.Column("browser_family", sa.String, nullable=True),
+        sa.Column("os_family", sa.String, nullable=True),
+        sa.Column("device_family", sa.String, nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    )
+    migration_ops.add_column_if_missing("login_sessions", sa.Column("ip_packed", sa.LargeBinary(16), nullable=True))
+    migration_ops.add_column_if_missing(
+        "login_sessions", sa.Column("user_agent_id", sa.Integer, sa.ForeignKey("user_agents.id"), nullable=True)
+    )
+
+    agent_ids = {}
+
+    def intern(conn, user_agent):
+        if user_agent not in agent_ids:
+            select_id = sa.select(user_agents.c.id).where(user_agents.c.user_agent == user_agent)
+            agent_id = conn.execute(select_id).scalar()
+            if agent_id is None:
+                try:
+                    # The app keeps interning while this runs; lose the race gracefully
+                    with conn.begin_nested():
+                        conn.execute(user_agents.insert().values(user_agent=user_agent, **parse_user_agent(user_agent)))
+                except sa.exc.IntegrityError:
+                    pass
+                agent_id = conn.execute(select_id).scalar()
+            agent_ids[user_agent] = agent_id
+        return agent_ids[user_agent]
+
+    def select_batch(conn, last_id, batch_size):
+        return conn.execute(
+            sa.select(login_sessions.c.id, login_sessions.c.ip_address, login_sessions.c.user_agent)
+            .where(login_sessions.c.id > last_id)
+            .where(login_sessions.c.ip_address.isnot(None) | login_sessions.c.user_agent.isnot(None))
+            .order_by(login_sessions.c.id)
+            .limit(batch_size)
+        ).all()
+
+    def apply_batch(conn, rows):
+        for row in rows:
+            values = {}
+            if row.user_agent is not None:
+                values.update(user_agent_id=intern(conn, row.user_agent), user_agent=None)
+            packed = pack_ip(row.ip_address)
+            # Non-IP values such as "unknown" stay as text
+            if packed is not None:
+                values.update(ip_packed=packed, ip_address=None)
+            if values:
+                conn.execute(login_sessions.update().where(login_sessions.c.id == row.id).values(**values))
+
+    migration_ops.backfill_in_batches(select_batch, apply_batch)
+
+
+def downgrade():
+    op.drop_column("login_sessions", "user_agent_id")
+    op.drop_column("login_sessions", "ip_packed")
+    op.drop_table("user_agents")
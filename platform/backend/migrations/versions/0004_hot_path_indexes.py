@@ -0,0 +1,46 @@
+"""Indexes for hot filters
+
+Found with index_advisor.py: every one of these lookups was a full scan of
+its table. Built concurrently on PostgreSQL.
+
+  event_rsvps (event_id, email)             RSVP de-duplication on every RSVP
+  event_rsvps (user_id)                     /api/users/me/events, user deletion
+  tasks (assigned_to_id), (created_by_id)   /api/users/me/tasks, User.assigned_tasks/created_tasks
+  login_sessions (user_id, login_time)      per-user login history, analytics
+  mentor_contact_requests (status, created_at)  pending request queue, newest first
+  events (start_date)                       event listings ordered by date
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+import migration_ops
+
+# revision identifiers
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_event_rsvps_event_id_email", "event_rsvps", ["event_id", "email"]),
+    ("ix_event_rsvps_user_id", "event_rsvps", ["user_id"]),
+    ("ix_tasks_assigned_to_id", "tasks", ["assigned_to_id"]),
+    ("ix_tasks_created_by_id", "tasks", ["created_by_id"]),
+    ("ix_login_sessions_user_id_login_time", "login_sessions", ["user_id", "login_time"]),
+    ("ix_mentor_contact_requests_status_created_at", "mentor_contact_requests", ["status", "created_at"]),
+    ("ix_events_start_date", "events", ["start_date"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        migration_ops.create_index_online(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
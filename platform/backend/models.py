@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, func, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Date, Text, Boolean, LargeBinary, Float, func, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.sql import func
 import json
 from sqlalchemy.types import TypeDecorator, JSON
 from database import Base
 import datetime
+import ipaddress
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -92,8 +93,8 @@ class Task(Base):
     due_date = Column(DateTime, nullable=True)
     status = Column(String, default='pending', nullable=False)  # 'pending' or 'completed'
     
-    assigned_to_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    assigned_to_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     created_at = Column(DateTime, server_default=func.now())
 
@@ -108,7 +109,7 @@ class Event(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
     description = Column(Text, nullable=True)
-    start_date = Column(DateTime, nullable=False)
+    start_date = Column(DateTime, nullable=False, index=True)
     end_date = Column(DateTime, nullable=True)
     location = Column(String, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
@@ -119,10 +120,11 @@ class Event(Base):
 
 class EventRSVP(Base):
     __tablename__ = "event_rsvps"
+    __table_args__ = (Index("ix_event_rsvps_event_id_email", "event_id", "email"),)
     
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Can be null for anonymous RSVPs
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # Can be null for anonymous RSVPs
     email = Column(String, nullable=False)  # Store email for both members and non-members
     rsvp_status = Column(String, default='confirmed')  # confirmed, declined, maybe
     created_at = Column(DateTime, server_default=func.now())
@@ -153,6 +155,7 @@ class Mentor(Base):
 
 class MentorContactRequest(Base):
     __tablename__ = "mentor_contact_requests"
+    __table_args__ = (Index("ix_mentor_contact_requests_status_created_at", "status", "created_at"),)
     
     id = Column(Integer, primary_key=True, index=True)
     mentor_id = Column(Integer, ForeignKey("research_opportunities.id"), nullable=False)
@@ -171,15 +174,81 @@ class MentorContactRequest(Base):
 
 class LoginSession(Base):
     __tablename__ = "login_sessions"
+    __table_args__ = (Index("ix_login_sessions_user_id_login_time", "user_id", "login_time"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    login_time = Column(DateTime, server_default=func.now())
-    ip_address = Column(String, nullable=True)
-    user_agent = Column(String, nullable=True)
+    login_time = Column(DateTime, server_default=func.now(), index=True)
+    ip_packed = Column(LargeBinary(16), nullable=True)  # 4 bytes IPv4, 16 bytes IPv6
+    user_agent_id = Column(Integer, ForeignKey("user_agents.id"), nullable=True)
+    # Text columns are only set on rows written before compaction (see telemetry.py)
+    legacy_ip_address = Column("ip_address", String, nullable=True)
+    legacy_user_agent = Column("user_agent", String, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="login_sessions")
+    agent = relationship("UserAgent", lazy="joined")
+
+    @property
+    def ip_address(self):
+        if self.ip_packed:
+            return str(ipaddress.ip_address(self.ip_packed))
+        return self.legacy_ip_address
+
+    @ip_address.setter
+    def ip_address(self, value):
+        try:
+            self.ip_packed = ipaddress.ip_address(value).packed
+            self.legacy_ip_address = None
+        except (ValueError, TypeError):
+            self.ip_packed = None
+            self.legacy_ip_address = value
+
+    @property
+    def user_agent(self):
+        if self.agent is not None:
+            return self.agent.user_agent
+        return self.legacy_user_agent
+
+class UserAgent(Base):
+    """Dictionary of distinct user agent strings, parsed once on first sight."""
+    __tablename__ = "user_agents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_agent = Column(Text, unique=True, nullable=False)
+    browser_family = Column(String, nullable=True)
+    os_family = Column(String, nullable=True)
+    device_family = Column(String, nullable=True)  # desktop, mobile, tablet, bot
+    created_at = Column(DateTime, server_default=func.now())
+
+class LoginSessionRollup(Base):
+    """Per-user daily login counts for sessions archived out of login_sessions."""
+    __tablename__ = "login_session_rollups"
+    __table_args__ = (UniqueConstraint("user_id", "day", name="uq_login_rollup_user_day"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    logins = Column(Integer, default=0, nullable=False)
+
+class UniqueCountSketch(Base):
+    """HyperLogLog registers for one (metric, scope, day) bucket. See sketches.py."""
+    __tablename__ = "unique_count_sketches"
+    __table_args__ = (UniqueConstraint("metric", "scope", "bucket", name="uq_sketch_metric_scope_bucket"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    metric = Column(String, nullable=False)  # ip, device
+    scope = Column(String, nullable=False)  # all, cohort:<week>, event:<id>
+    bucket = Column(Date, nullable=False)
+    registers = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class ReplicationHeartbeat(Base):
+    """Single row stamped on the primary to measure replica lag. See database.ReplicaSet."""
+    __tablename__ = "replication_heartbeat"
+
+    id = Column(Integer, primary_key=True)
+    beat_at = Column(Float, nullable=False)  # epoch seconds
 
 class Newsletter(Base):
     __tablename__ = "newsletters"
@@ -0,0 +1,236 @@
+"""
+Connection pool instrumentation and sizing guidance.
+
+Tracks, per engine:
+  - checkout wait time (time spent blocked waiting for a pooled connection),
+  - in-use and overflow counts, with a high-water mark,
+  - pre-ping failures and other connection invalidations,
+  - connection hold time per route template.
+
+DB_POOL_VALIDATION=background replaces pool_pre_ping (a round trip on every
+checkout) with a thread that validates idle connections every
+POOL_VALIDATION_SECONDS.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from request_context import current_route
+
+logger = logging.getLogger(__name__)
+
+POOL_VALIDATION = os.getenv("DB_POOL_VALIDATION", "pre_ping")  # pre_ping | background
+POOL_VALIDATION_SECONDS = float(os.getenv("POOL_VALIDATION_SECONDS", "30"))
+# Number of recent in-use samples kept for sizing guidance
+SIZING_WINDOW = 10000
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits_over_10ms = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.pre_ping_failures = 0
+        self.validation_failures = 0
+        self.peak_in_use = 0
+        self.in_use_samples = deque(maxlen=SIZING_WINDOW)
+        self.route_holds = {}  # route -> [count, total seconds, max seconds]
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if seconds > 0.01:
+                self.waits_over_10ms += 1
+
+    def record_in_use(self, in_use: int):
+        self.in_use_samples.append(in_use)
+        if in_use > self.peak_in_use:
+            self.peak_in_use = in_use
+
+    def record_hold(self, route: str, seconds: float):
+        with self._lock:
+            hold = self.route_holds.get(route)
+            if hold is None:
+                hold = self.route_holds[route] = [0, 0.0, 0.0]
+            hold[0] += 1
+            hold[1] += seconds
+            hold[2] = max(hold[2], seconds)
+
+
+class _InstrumentedPool:
+    """Mixin for QueuePool classes: measures how long each checkout waits for a connection."""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    """For create_async_engine; instrument its engine.sync_engine."""
+
+
+def instrument_engine(engine):
+    """Attach pool and error listeners to an engine using an instrumented pool (sync_engine for async engines)."""
+    stats = engine.pool.stats
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        connection_record.info["route"] = current_route()
+        stats.record_in_use(engine.pool.checkedout())
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            stats.record_hold(connection_record.info.pop("route", "<unknown>"), time.perf_counter() - started)
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context):
+        if getattr(context, "is_pre_ping", False):
+            stats.pre_ping_failures += 1
+
+    return engine
+
+
+class IdleConnectionValidator:
+    """Periodically pings idle pooled connections instead of pinging on checkout."""
+
+    def __init__(self, engine, interval: float = POOL_VALIDATION_SECONDS):
+        self.engine = engine
+        self.interval = interval
+        self._thread = None
+
+    def start(self):
+        # Threads do not survive gunicorn's fork, so start (again) in each worker
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="pool-validator", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.validate()
+            except Exception as e:
+                logger.error(f"Idle connection validation failed: {str(e)}")
+
+    def validate(self) -> int:
+        """Ping every currently idle connection once. Returns the number pinged."""
+        pool = self.engine.pool
+        held = []
+        try:
+            # Only take as many as are idle right now so requests are not starved
+            for _ in range(pool.checkedin()):
+                held.append(pool.connect())
+            for connection in held:
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute("SELECT 1")
+                    cursor.close()
+                except Exception:
+                    pool.stats.validation_failures += 1
+                    connection.invalidate()
+        finally:
+            for connection in held:
+                connection.close()
+        return len(held)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def sizing_guidance(stats: PoolStats, workers: int) -> dict:
+    """Suggest pool_size / max_overflow from observed per-worker concurrency."""
+    samples = list(stats.in_use_samples)
+    p95 = _percentile(samples, 0.95)
+    pool_size = max(1, p95 + 1)
+    max_overflow = max(0, stats.peak_in_use - pool_size + 1)
+    return {
+        "observed_p95_in_use": p95,
+        "observed_peak_in_use": stats.peak_in_use,
+        "samples": len(samples),
+        "recommended_pool_size": pool_size,
+        "recommended_max_overflow": max_overflow,
+        "workers": workers,
+        "max_server_connections": workers * (pool_size + max_overflow),
+    }
+
+
+def pool_snapshot(engine, workers: int = 1) -> dict:
+    pool = engine.pool
+    stats = getattr(pool, "stats", None)
+    snapshot = {
+        "pool_class": type(pool).__name__,
+        "validation": POOL_VALIDATION,
+    }
+    if not isinstance(pool, QueuePool):
+        return snapshot
+    snapshot.update({
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "in_use": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+    })
+    if stats is None:
+        return snapshot
+    snapshot.update({
+        "checkouts": stats.checkouts,
+        "checkout_wait_avg_ms": round(stats.wait_total / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+        "checkout_wait_max_ms": round(stats.wait_max * 1000, 3),
+        "checkout_waits_over_10ms": stats.waits_over_10ms,
+        "connects": stats.connects,
+        "invalidations": stats.invalidations,
+        "pre_ping_failures": stats.pre_ping_failures,
+        "validation_failures": stats.validation_failures,
+        "route_hold_ms": {
+            route: {
+                "count": count,
+                "avg": round(total / count * 1000, 3),
+                "max": round(longest * 1000, 3),
+            }
+            for route, (count, total, longest) in sorted(stats.route_holds.items())
+        },
+        "sizing": sizing_guidance(stats, workers),
+    })
+    return snapshot
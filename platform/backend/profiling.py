@@ -0,0 +1,222 @@
+"""
+On-demand sampling profiler for single requests.
+
+An admin request carrying `X-Profile: 1` (or `?_profile=1`) is profiled by a
+sampler thread that reads sys._current_frames() every PROFILE_INTERVAL_MS and
+keeps the stacks working for that request: the event-loop thread while the
+request's coroutine is running, and threadpool workers while they run code in
+the request's context (sync endpoints and dependencies, bcrypt via
+run_in_threadpool). Nothing is traced, so the request runs at full speed apart
+from the sampler's own GIL slices.
+
+Samples are written in the folded-stack format understood by flamegraph.pl,
+speedscope and inferno:
+
+    [worker];get_engagement (main.py:901);__get__ (sqlalchemy/orm/attributes.py:552) 17
+
+to PROFILE_DIR, and the response carries the file name in X-Profile. Files
+are listed and downloaded through /api/admin/profiles.
+
+PROFILE_EVERY_N > 0 also profiles one in N requests of any caller, keeping
+the newest PROFILE_MAX_FILES files. When no request asks for a profile the
+middleware only looks for the header and query flag.
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import itertools
+import threading
+from collections import Counter
+from contextvars import Context, ContextVar
+from functools import lru_cache
+from urllib.parse import parse_qsl
+
+from anyio import to_thread
+
+logger = logging.getLogger(__name__)
+
+PROFILING = os.getenv("PROFILING", "True").lower() in ('true', '1', 't')
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+# Profile one in N requests regardless of the caller (0 = only on demand)
+PROFILE_EVERY_N = int(os.getenv("PROFILE_EVERY_N", "0"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_FLAG = "_profile"
+_PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+
+# Set in the request's context so threadpool work can be attributed to it
+_active_sampler: ContextVar = ContextVar("active_sampler", default=None)
+
+
+@lru_cache(maxsize=4096)
+def _label(code) -> str:
+    filename = code.co_filename
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        filename = filename[marker + len("site-packages") + 1:]
+    elif filename.startswith(os.getcwd() + os.sep):
+        filename = filename[len(os.getcwd()) + 1:]
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class Sampler:
+    """Collects the folded stacks of the threads working on one request."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.samples = Counter()
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        """Signal the sampler thread to finish; join() waits for it."""
+        self._stop.set()
+        self.elapsed = time.perf_counter() - self.started
+
+    def join(self):
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = self._request_stack(frame)
+                if stack:
+                    self.samples[stack] += 1
+
+    def _request_stack(self, frame):
+        """Folded stack below the request's entry point, or None if the thread is not working for it."""
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            if code is _MIDDLEWARE_CODE:
+                if frame.f_locals.get("sampler") is self:
+                    return ";".join(["[loop]"] + labels[::-1])
+                return None  # another request's coroutine
+            if code.co_name == "run":
+                # Threadpool workers run their job with context.run(func, *args)
+                context = frame.f_locals.get("context")
+                if isinstance(context, Context):
+                    return ";".join(["[worker]"] + labels[::-1]) if context.get(_active_sampler) is self else None
+            labels.append(_label(code))
+            frame = frame.f_back
+        return None
+
+
+def write_folded(samples: Counter, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def list_profiles(directory: str = PROFILE_DIR) -> list:
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if _PROFILE_NAME.match(name):
+            stat = os.stat(os.path.join(directory, name))
+            profiles.append({"name": name, "bytes": stat.st_size, "modified": stat.st_mtime})
+    return sorted(profiles, key=lambda p: p["modified"], reverse=True)
+
+
+def profile_path(name: str, directory: str = PROFILE_DIR):
+    """Path of a stored profile, or None for names that are not profile files."""
+    if not _PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(directory, name)
+    return path if os.path.isfile(path) else None
+
+
+def prune_profiles(directory: str = PROFILE_DIR, keep: int = PROFILE_MAX_FILES):
+    for profile in list_profiles(directory)[keep:]:
+        try:
+            os.remove(os.path.join(directory, profile["name"]))
+        except OSError:
+            pass
+
+
+def _slug(path: str) -> str:
+    return re.sub(r"[^\w]+", "_", path).strip("_")[:60] or "root"
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; `authorize(authorization_header)` decides who may ask for a profile."""
+
+    def __init__(self, app, authorize, every_n: int = PROFILE_EVERY_N, directory: str = PROFILE_DIR):
+        self.app = app
+        self.authorize = authorize
+        self.every_n = every_n
+        self.directory = directory
+        self.requests = 0
+        # Tells apart profiles of the same path started in the same second
+        self._sequence = itertools.count(1)
+        # One profile at a time per worker; concurrent requests are served unprofiled
+        self._busy = threading.Lock()
+
+    def _requested(self, scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        flagged = headers.get(PROFILE_HEADER, b"") in (b"1", b"true") or (
+            PROFILE_QUERY_FLAG.encode() in scope.get("query_string", b"")
+            and dict(parse_qsl(scope["query_string"].decode("latin-1"))).get(PROFILE_QUERY_FLAG) in ("1", "true"))
+        return flagged and self.authorize(headers.get(b"authorization", b"").decode("latin-1"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sampled = False
+        if self.every_n > 0:
+            self.requests += 1
+            sampled = self.requests % self.every_n == 0
+        if not (sampled or self._requested(scope)) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        name = (f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(self._sequence)}-"
+                f"{scope['method']}-{_slug(scope['path'])}.folded")
+
+        async def profile_send(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile", name.encode())]
+            await send(message)
+
+        sampler = Sampler()
+        token = _active_sampler.set(sampler)
+        sampler.start()
+        try:
+            await self.app(scope, receive, profile_send)
+        finally:
+            sampler.stop()
+            _active_sampler.reset(token)
+            self._busy.release()
+            try:
+                # Joining the sampler thread and the file I/O stay off the event loop
+                await to_thread.run_sync(self._save, sampler, name, scope["method"], scope["path"])
+            except Exception as e:
+                logger.warning(f"Could not write profile {name}: {e}")
+
+    def _save(self, sampler: Sampler, name: str, method: str, path: str):
+        sampler.join()
+        write_folded(sampler.samples, os.path.join(self.directory, name))
+        prune_profiles(self.directory)
+        logger.info(f"Profiled {method} {path}: {sum(sampler.samples.values())} samples "
+                    f"over {sampler.elapsed * 1000:.1f}ms -> {name}")
+
+
+_MIDDLEWARE_CODE = ProfilingMiddleware.__call__.__code__
@@ -0,0 +1,221 @@
+"""
+Per-request SQL statement counts, DB time and N+1 detection.
+
+SQLAlchemy cursor events (installed on the Engine class, so the primary,
+replica and async engines are all covered) attribute every statement to the
+request being served. Statements are grouped by shape - the SQL text with IN
+lists collapsed, as in index_advisor.fingerprint - so the same SELECT issued
+once per parent row (lazy Contact.tags, User.assigned_tasks on /api/users/me,
+per-user counts in the engagement endpoints) shows up as one shape with many
+distinct parameter sets.
+
+QueryStatsMiddleware adds a Server-Timing header to responses:
+
+    Server-Timing: db;dur=12.345;desc="14 statements", n1;desc="1 repeated shape"
+
+Statement counts and DB time describe internals, so by default the header
+only goes to admin callers (SQL_STATS_SERVER_TIMING=admin; "all" sends it to
+everyone, e.g. in development, "off" to no one). The middleware also logs a
+JSON summary for requests with a suspected N+1 (warning) or for every request
+at debug level. With SQL_STATS_STRICT=true (or track(strict=True) in a test)
+the statement that crosses N_PLUS_ONE_THRESHOLD raises NPlusOneError
+instead, so tests fail at the offending lazy load.
+
+Code running outside a request (scripts, tests calling handlers directly)
+can use the track() context manager:
+
+    with query_stats.track() as stats:
+        contacts = [contact.tags for contact in db.query(models.Contact).limit(50)]
+    print(stats.summary())  # one SELECT for contacts, fifty for their tags
+"""
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from index_advisor import fingerprint
+from request_context import current_route
+
+logger = logging.getLogger(__name__)
+
+SQL_STATS = os.getenv("SQL_STATS", "True").lower() in ('true', '1', 't')
+# Who gets the Server-Timing header: admin | all | off
+SQL_STATS_SERVER_TIMING = os.getenv("SQL_STATS_SERVER_TIMING", "admin").lower()
+SQL_STATS_STRICT = os.getenv("SQL_STATS_STRICT", "False").lower() in ('true', '1', 't')
+# Distinct parameter sets of one SELECT shape within a request before it is reported
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+# Parameter sets remembered per shape; enough to cross the threshold, bounded for bulk loops
+_MAX_PARAMETER_SETS = 100
+
+
+class NPlusOneError(RuntimeError):
+    pass
+
+
+class ShapeStats:
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.count = 0
+        self.seconds = 0.0
+        self.parameter_sets = set()
+
+
+class QueryStats:
+    """Statements executed on behalf of one request."""
+
+    def __init__(self, strict: bool = None, threshold: int = None, keep_statements: int = 0):
+        self.strict = SQL_STATS_STRICT if strict is None else strict
+        self.threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes = {}
+        # The first keep_statements statements as (statement, parameters, started, seconds)
+        self.keep_statements = keep_statements
+        self.log = []
+
+    def record(self, statement: str, parameters, seconds: float):
+        self.statements += 1
+        self.seconds += seconds
+        if len(self.log) < self.keep_statements:
+            self.log.append((statement, parameters, time.perf_counter() - seconds, seconds))
+        if statement.lstrip()[:6].upper() != "SELECT":
+            return
+        key = fingerprint(statement)
+        shape = self.shapes.get(key)
+        if shape is None:
+            shape = self.shapes[key] = ShapeStats(key)
+        shape.count += 1
+        shape.seconds += seconds
+        if len(shape.parameter_sets) < _MAX_PARAMETER_SETS:
+            try:
+                shape.parameter_sets.add(repr(parameters))
+            except Exception:
+                pass
+            if self.strict and len(shape.parameter_sets) == self.threshold:
+                raise NPlusOneError(f"{shape.count} executions of the same statement with different parameters on {current_route()}: {key}")
+
+    def repeated(self) -> list:
+        """Shapes executed with at least `threshold` distinct parameter sets."""
+        return [shape for shape in self.shapes.values() if len(shape.parameter_sets) >= self.threshold]
+
+    def summary(self) -> dict:
+        return {
+            "route": current_route(),
+            "statements": self.statements,
+            "db_ms": round(self.seconds * 1000, 3),
+            "repeated": [
+                {
+                    "count": shape.count,
+                    "distinct_parameters": len(shape.parameter_sets),
+                    "db_ms": round(shape.seconds * 1000, 3),
+                    "statement": shape.statement[:500],
+                }
+                for shape in sorted(self.repeated(), key=lambda s: -s.count)
+            ],
+        }
+
+    def server_timing(self) -> str:
+        value = f'db;dur={self.seconds * 1000:.3f};desc="{self.statements} statement{"s" if self.statements != 1 else ""}"'
+        repeated = len(self.repeated())
+        if repeated:
+            value += f', n1;desc="{repeated} repeated shape{"s" if repeated > 1 else ""}"'
+        return value
+
+
+current_stats: ContextVar = ContextVar("current_query_stats", default=None)
+_installed = False
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if current_stats.get() is not None:
+        conn.info.setdefault("query_stats_started", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats.get()
+    started = conn.info.get("query_stats_started")
+    if stats is None or not started:
+        return
+    stats.record(statement, parameters, time.perf_counter() - started.pop())
+
+
+def _error(context):
+    # Keep the timing stack balanced when a statement fails
+    started = context.connection.info.get("query_stats_started") if context.connection is not None else None
+    if current_stats.get() is not None and started:
+        started.pop()
+
+
+def install():
+    """Listen on every Engine; statements outside a tracked request cost one ContextVar lookup."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    event.listen(Engine, "before_cursor_execute", _before)
+    event.listen(Engine, "after_cursor_execute", _after)
+    event.listen(Engine, "handle_error", _error)
+
+
+@contextmanager
+def track(strict: bool = None, threshold: int = None):
+    install()
+    stats = QueryStats(strict=strict, threshold=threshold)
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+
+def log_summary(stats: QueryStats):
+    if stats.repeated():
+        logger.warning(f"Suspected N+1 queries: {json.dumps(stats.summary())}")
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"SQL stats: {json.dumps(stats.summary())}")
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware that tracks the request's statements and reports them in Server-Timing.
+
+    `authorize(authorization_header)` decides who is an admin for SQL_STATS_SERVER_TIMING=admin.
+    """
+
+    def __init__(self, app, authorize=None, server_timing: str = SQL_STATS_SERVER_TIMING):
+        self.app = app
+        self.authorize = authorize
+        self.server_timing = server_timing
+        install()
+
+    def _send_timing(self, scope) -> bool:
+        if self.server_timing == "all":
+            return True
+        if self.server_timing != "admin" or self.authorize is None:
+            return False
+        authorization = dict(scope.get("headers") or []).get(b"authorization", b"")
+        return bool(authorization) and self.authorize(authorization.decode("latin-1"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        token = current_stats.set(stats)
+
+        async def timing_send(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", stats.server_timing().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timing_send if self._send_timing(scope) else send)
+        finally:
+            current_stats.reset(token)
+            log_summary(stats)
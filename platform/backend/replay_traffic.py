@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Replay a traffic capture (traffic_capture.py NDJSON) against a local instance.
+
+Requests are re-issued in capture order, keeping their original spacing
+divided by --speed (1 = real time, 10 = ten times faster) or as fast as
+--concurrency allows with --speed max. Callers are mapped onto local
+accounts: admin traffic runs as --admin, each pseudonymous member as one of
+user2..user{--members + 1} (the same member every time), and logins in the
+capture log in as that member with --password. Pseudonymized e-mails stay
+consistent, so duplicate RSVPs in the capture are duplicates on replay too.
+
+Path ids are replayed as captured; replay against a restore of the captured
+database, or a generated one when the ids only need to exist.
+
+At the end, captured and replayed latencies (p50/p95) and status mismatches
+are compared per route.
+
+Usage:
+    python replay_traffic.py traffic.ndjson --url http://127.0.0.1:8000
+    python replay_traffic.py traffic.ndjson --speed 10 --route /api/events
+    python replay_traffic.py traffic.ndjson --speed max --concurrency 200 --report replay.json
+"""
+
+import sys
+import json
+import time
+import zlib
+import asyncio
+import argparse
+
+import httpx
+
+from loadtest import percentile, DATASET_PASSWORD
+
+
+def load_capture(paths: list, routes: list = None, limit: int = None) -> list:
+    records = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if routes and not any(text in (record.get("route") or record["path"]) for text in routes):
+                    continue
+                records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    return records[:limit] if limit else records
+
+
+class Identities:
+    """Local bearer tokens standing in for the captured callers."""
+
+    def __init__(self, client: httpx.AsyncClient, admin: str, password: str, members: int):
+        self.client = client
+        self.admin = admin
+        self.password = password
+        self.members = members
+        self.tokens = {}
+        self._locks = {}
+
+    def member_for(self, pseudonym: str) -> str:
+        # Stable across runs (unlike hash())
+        return f"user{2 + zlib.crc32(pseudonym.encode()) % self.members}"
+
+    async def headers(self, record: dict) -> dict:
+        if record["role"] in ("anonymous", "invalid"):
+            return {}
+        username = self.admin if record["role"] == "admin" else self.member_for(record.get("user") or "")
+        if username not in self.tokens:
+            lock = self._locks.setdefault(username, asyncio.Lock())
+            async with lock:
+                if username not in self.tokens:
+                    response = await self.client.post("/api/token", data={"username": username, "password": self.password})
+                    response.raise_for_status()
+                    self.tokens[username] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return self.tokens[username]
+
+    def login_form(self, body: dict) -> dict:
+        form = dict(body or {})
+        form["username"] = self.member_for(form.get("username", ""))
+        form["password"] = self.password
+        return form
+
+
+async def replay(records: list, args) -> list:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = []
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        identities = Identities(client, args.admin, args.password, args.members)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def issue(record):
+            async with semaphore:
+                kwargs = {"params": record.get("query") or None}
+                try:
+                    kwargs["headers"] = await identities.headers(record)
+                except httpx.HTTPError as e:
+                    results.append((record, None, 0.0, f"login failed: {e}"))
+                    return
+                body = record.get("body")
+                if record.get("route") == "/api/token":
+                    kwargs["data"] = identities.login_form(body)
+                elif record.get("content_type") == "application/x-www-form-urlencoded":
+                    kwargs["data"] = body
+                elif body is not None:
+                    kwargs["json"] = body
+                start = time.perf_counter()
+                try:
+                    response = await client.request(record["method"], record["path"], **kwargs)
+                    status, error = response.status_code, None
+                except httpx.HTTPError as e:
+                    status, error = None, str(e)
+                results.append((record, status, time.perf_counter() - start, error))
+
+        tasks = []
+        origin, started = records[0]["ts"], time.monotonic()
+        for record in records:
+            if args.speed != "max":
+                delay = (record["ts"] - origin) / float(args.speed) - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(issue(record)))
+        await asyncio.gather(*tasks)
+    return results
+
+
+def summarize(results: list) -> dict:
+    routes = {}
+    for record, status, seconds, error in results:
+        name = f"{record['method']} {record.get('route') or record['path']}"
+        entry = routes.setdefault(name, {"captured": [], "replayed": [], "status_mismatches": 0, "errors": 0})
+        entry["captured"].append(record["duration_ms"])
+        entry["replayed"].append(seconds * 1000)
+        if error:
+            entry["errors"] += 1
+        elif status != record["status"]:
+            entry["status_mismatches"] += 1
+    summary = {}
+    for name, entry in sorted(routes.items()):
+        captured, replayed = sorted(entry["captured"]), sorted(entry["replayed"])
+        summary[name] = {
+            "requests": len(captured),
+            "captured_p50_ms": round(percentile(captured, 0.50), 2),
+            "captured_p95_ms": round(percentile(captured, 0.95), 2),
+            "replayed_p50_ms": round(percentile(replayed, 0.50), 2),
+            "replayed_p95_ms": round(percentile(replayed, 0.95), 2),
+            "status_mismatches": entry["status_mismatches"],
+            "errors": entry["errors"],
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured traffic against a local instance")
+    parser.add_argument("capture", nargs="+", help="NDJSON capture file(s)")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", default="1", help="time compression factor (1, 10, ...) or 'max'")
+    parser.add_argument("--concurrency", type=int, default=100, help="requests in flight at most")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--route", action="append", help="only replay routes containing this text")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--admin", default="user1", help="local admin account for admin traffic")
+    parser.add_argument("--password", default=DATASET_PASSWORD, help="password of the local accounts")
+    parser.add_argument("--members", type=int, default=200, help="local member accounts (user2..) to map callers onto")
+    parser.add_argument("--report", help="write the per-route comparison as JSON")
+    args = parser.parse_args()
+    if args.speed != "max":
+        try:
+            if float(args.speed) <= 0:
+                raise ValueError
+        except ValueError:
+            parser.error("--speed must be a positive number or 'max'")
+
+    records = load_capture(args.capture, args.route, args.limit)
+    if not records:
+        print("Nothing to replay")
+        return 1
+    span = records[-1]["ts"] - records[0]["ts"]
+    pace = "max speed" if args.speed == "max" else f"{args.speed}x"
+    print(f"Replaying {len(records)} requests spanning {span:.1f}s at {pace} against {args.url}...")
+    start = time.perf_counter()
+    results = asyncio.run(replay(records, args))
+    elapsed = time.perf_counter() - start
+    summary = summarize(results)
+
+    print(f"Done in {elapsed:.1f}s ({len(results) / elapsed:.1f} req/s)\n")
+    print(f"{'route':<44}{'req':>6}{'cap p50':>10}{'rep p50':>10}{'cap p95':>10}{'rep p95':>10}{'p95 chg':>8}{'status!=':>9}{'err':>5}")
+    for name, stats in summary.items():
+        change = (stats["replayed_p95_ms"] - stats["captured_p95_ms"]) / stats["captured_p95_ms"] if stats["captured_p95_ms"] else 0.0
+        print(f"{name:<44}{stats['requests']:>6}{stats['captured_p50_ms']:>10.1f}{stats['replayed_p50_ms']:>10.1f}"
+              f"{stats['captured_p95_ms']:>10.1f}{stats['replayed_p95_ms']:>10.1f}{change:>+8.0%}"
+              f"{stats['status_mismatches']:>9}{stats['errors']:>5}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"speed": args.speed, "requests": len(results), "elapsed_s": round(elapsed, 2), "routes": summary}, f, indent=2)
+            f.write("\n")
+        print(f"\nWrote {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Per-request context shared by the instrumentation modules.
+
+RequestContextMiddleware stores the ASGI scope of the request being served in
+a context variable, so code far from the handler (pool events, SQLAlchemy
+hooks) can attribute work to the route that caused it. FastAPI records the
+matched route in the scope during routing, so the route template is available
+from the moment the endpoint's dependencies start running.
+
+Each request also gets an id, taken from a well-formed incoming X-Request-ID
+header or generated, which is echoed in the response and stamped on every log
+record emitted while serving it (structured_logging).
+"""
+
+import os
+import re
+from contextvars import ContextVar
+
+current_scope: ContextVar = ContextVar("current_scope", default=None)
+current_request_id: ContextVar = ContextVar("current_request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+_REQUEST_ID = re.compile(rb"^[\w.:-]{1,64}$")
+
+
+def current_route() -> str:
+    """Route template of the request being served, e.g. /api/events/{event_id}."""
+    scope = current_scope.get()
+    if scope is None:
+        return "<background>"
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering overhead)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for key, value in scope.get("headers") or []:
+            if key == REQUEST_ID_HEADER:
+                if _REQUEST_ID.match(value):
+                    request_id = value.decode("latin-1")
+                break
+        if request_id is None:
+            request_id = os.urandom(8).hex()
+
+        async def id_send(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
+
+        token = current_scope.set(scope)
+        id_token = current_request_id.set(request_id)
+        try:
+            await self.app(scope, receive, id_send)
+        finally:
+            current_request_id.reset(id_token)
+            current_scope.reset(token)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Retention and archival for append-only tables.
+
+Rows older than the retention window are, batch by batch:
+  1. appended to a monthly gzip NDJSON archive (ARCHIVE_DIR/<table>/<YYYY-MM>.ndjson.gz),
+  2. aggregated into a daily rollup table,
+  3. deleted from the hot table.
+Steps 2 and 3 share one short transaction per batch, so writers are only
+ever blocked for a single bounded batch. The archive is written and fsynced
+before that transaction commits; if a run dies in between, the rerun appends
+the batch again, so archive readers should de-duplicate on `id`.
+
+Usage:
+    python retention.py [--dry-run]
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "180"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", "0.05"))
+
+
+def _row_to_dict(row, fields):
+    record = {}
+    for name in fields:
+        value = getattr(row, name)
+        record[name] = value.isoformat() if isinstance(value, datetime) else value
+    return record
+
+
+def _append_archive(table: str, records: list, month_of):
+    """Append records to their monthly archive files and fsync them."""
+    by_month = {}
+    for record in records:
+        by_month.setdefault(month_of(record), []).append(record)
+    directory = os.path.join(ARCHIVE_DIR, table)
+    os.makedirs(directory, exist_ok=True)
+    for month, month_records in by_month.items():
+        path = os.path.join(directory, f"{month}.ndjson.gz")
+        # Each append adds a new gzip member; readers see one continuous stream
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+                for record in month_records:
+                    archive.write((json.dumps(record) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def _rollup_logins(db: Session, rows):
+    """Add archived login sessions to the per-user daily rollup."""
+    counts = Counter((row.user_id, row.login_time.date()) for row in rows if row.login_time)
+    for (user_id, day), logins in counts.items():
+        rollup = db.query(models.LoginSessionRollup).filter(
+            models.LoginSessionRollup.user_id == user_id,
+            models.LoginSessionRollup.day == day
+        ).first()
+        if rollup:
+            rollup.logins += logins
+        else:
+            db.add(models.LoginSessionRollup(user_id=user_id, day=day, logins=logins))
+
+
+# table name -> (model, timestamp column, rollup function, archived fields)
+RETENTION_POLICIES = {
+    "login_sessions": (
+        models.LoginSession, "login_time", _rollup_logins,
+        ["id", "user_id", "login_time", "ip_address", "user_agent"],
+    ),
+}
+
+
+def archive_table(db: Session, table: str, retention_days: int = RETENTION_DAYS, dry_run: bool = False) -> int:
+    """Move rows older than `retention_days` out of `table`. Returns rows moved."""
+    model, time_column, rollup, fields = RETENTION_POLICIES[table]
+    column = getattr(model, time_column)
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+    if dry_run:
+        return db.query(model).filter(column < cutoff).count()
+
+    moved = 0
+    while True:
+        rows = db.query(model).filter(column < cutoff).order_by(model.id).limit(RETENTION_BATCH_SIZE).all()
+        if not rows:
+            break
+        records = [_row_to_dict(row, fields) for row in rows]
+        _append_archive(table, records, lambda record: record[time_column][:7])
+        try:
+            rollup(db, rows)
+            db.query(model).filter(model.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        db.expunge_all()
+        moved += len(rows)
+        logger.info(f"Archived {moved} rows from {table} so far")
+        # Give concurrent writers a chance between batches
+        time.sleep(RETENTION_BATCH_PAUSE)
+    return moved
+
+
+def run_retention(db: Session, dry_run: bool = False) -> dict:
+    """Apply every retention policy. Returns rows moved (or eligible) per table."""
+    return {table: archive_table(db, table, dry_run=dry_run) for table in RETENTION_POLICIES}
+
+
+def read_archive(table: str, month: str):
+    """Iterate over archived records for a table and YYYY-MM month."""
+    path = os.path.join(ARCHIVE_DIR, table, f"{month}.ndjson.gz")
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            yield json.loads(line)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    dry_run = "--dry-run" in sys.argv
+    db = SessionLocal()
+    try:
+        result = run_retention(db, dry_run=dry_run)
+        label = "eligible for archival" if dry_run else "archived"
+        for table, count in result.items():
+            print(f"{table}: {count} rows {label}")
+    finally:
+        db.close()
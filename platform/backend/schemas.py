@@ -420,6 +420,10 @@ class EngagementStats(BaseModel):
     total_mentor_requests: int
     top_mentors_by_requests: List[dict]
     recent_activity: List[dict]
+    # HyperLogLog estimates, relative standard error given by unique_count_std_error
+    unique_ips_this_month: int = 0
+    unique_devices_this_month: int = 0
+    unique_count_std_error: float = 0.0
 
 class UserEngagement(BaseModel):
     user_id: int
@@ -435,5 +439,32 @@ class UserEngagement(BaseModel):
     class Config:
         from_attributes = True
 
+class UniqueCount(BaseModel):
+    metric: str
+    scope: str
+    days: int
+    estimate: int
+    std_error: float  # relative standard error of the estimate
+
+# Analytics Schemas
+class RetentionCohorts(BaseModel):
+    period: str
+    cohorts: List[datetime]  # start of each signup cohort
+    sizes: List[int]
+    matrix: List[List[int]]  # users from cohort c active k periods after signup
+    rates: List[List[float]]
+    snapshot_time: float
+
+class FunnelStage(BaseModel):
+    name: str
+    count: int
+    conversion: float  # relative to the previous stage
+    overall: float  # relative to the first stage
+
+class Funnel(BaseModel):
+    since: Optional[int] = None
+    stages: List[FunnelStage]
+    snapshot_time: float
+
 Task.model_rebuild()
 User.model_rebuild()
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+HyperLogLog sketches for approximate distinct counts (unique IPs / devices).
+
+Each worker keeps in-memory sketches per (metric, scope, day) that are
+updated on insert, and periodically merges them into the
+unique_count_sketches table. HyperLogLog merges are a register-wise max, so
+merging the same sketch twice is harmless and sketches from different days,
+scopes or workers can be combined freely at query time.
+
+Error bound: with HLL_PRECISION = 14 (16384 one-byte registers, 16 KB per
+sketch) the relative standard error is 1.04 / sqrt(16384) ~= 0.81%, i.e.
+estimates are within +/-1.6% of the true count about 95% of the time.
+"""
+
+import os
+import math
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, date, timedelta
+
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_STD_ERROR = 1.04 / math.sqrt(HLL_REGISTERS)
+FLUSH_SECONDS = int(os.getenv("SKETCH_FLUSH_SECONDS", "30"))
+
+_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+_INV_POW2 = [2.0 ** -k for k in range(65)]
+
+
+class HyperLogLog:
+    """Fixed-precision HyperLogLog counter backed by a bytearray of registers."""
+
+    def __init__(self, registers: bytes = None):
+        if registers is not None and len(registers) != HLL_REGISTERS:
+            raise ValueError(f"Expected {HLL_REGISTERS} registers, got {len(registers)}")
+        self.registers = bytearray(registers) if registers is not None else bytearray(HLL_REGISTERS)
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+        index = h >> (64 - HLL_PRECISION)
+        rest = h & ((1 << (64 - HLL_PRECISION)) - 1)
+        rank = (64 - HLL_PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        estimate = _ALPHA * HLL_REGISTERS * HLL_REGISTERS / sum(_INV_POW2[r] for r in self.registers)
+        if estimate <= 2.5 * HLL_REGISTERS:
+            # Small-range correction: linear counting on empty registers
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+
+class SketchStore:
+    """Worker-local sketches, flushed into the database on an interval."""
+
+    def __init__(self, flush_seconds: int = FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._local = {}
+        self._dirty = set()
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, metric: str, scope: str, value: str, when: datetime = None):
+        if not value:
+            return
+        bucket = (when or datetime.utcnow()).date()
+        key = (metric, scope, bucket)
+        with self._lock:
+            sketch = self._local.get(key)
+            if sketch is None:
+                sketch = self._local[key] = HyperLogLog()
+            sketch.add(value)
+            self._dirty.add(key)
+
+    def maybe_flush(self, db: Session):
+        if time.time() - self._last_flush >= self.flush_seconds:
+            self.flush(db)
+
+    def flush(self, db: Session):
+        """Merge dirty local sketches into their stored day buckets."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            pending = {key: HyperLogLog(self._local[key].to_bytes()) for key in dirty}
+            self._last_flush = time.time()
+            # Sketches are kept until the day has passed so a lost concurrent
+            # merge is repaired by the next flush; drop older ones.
+            cutoff = datetime.utcnow().date() - timedelta(days=1)
+            for key in [k for k in self._local if k[2] < cutoff and k not in dirty]:
+                del self._local[key]
+        if not pending:
+            return
+        try:
+            for (metric, scope, bucket), sketch in pending.items():
+                row = db.query(models.UniqueCountSketch).filter(
+                    models.UniqueCountSketch.metric == metric,
+                    models.UniqueCountSketch.scope == scope,
+                    models.UniqueCountSketch.bucket == bucket
+                ).with_for_update().first()
+                if row:
+                    row.registers = sketch.merge(HyperLogLog(row.registers)).to_bytes()
+                else:
+                    db.add(models.UniqueCountSketch(
+                        metric=metric, scope=scope, bucket=bucket, registers=sketch.to_bytes()
+                    ))
+            db.commit()
+        except Exception as e:
+            logger.error(f"Failed to flush unique count sketches: {e}")
+            db.rollback()
+            with self._lock:
+                self._dirty |= set(pending)
+
+    def estimate(self, db: Session, metric: str, scope: str = "all", days: int = 1) -> int:
+        """Approximate distinct count over the last `days` day buckets.
+
+        Read-only: this worker's unflushed sketches are merged in memory with
+        the stored ones; flushing is left to the write paths (maybe_flush).
+        """
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        total = HyperLogLog()
+        with self._lock:
+            for (local_metric, local_scope, bucket), sketch in self._local.items():
+                if local_metric == metric and local_scope == scope and bucket >= since:
+                    total.merge(sketch)
+        rows = db.query(models.UniqueCountSketch.registers).filter(
+            models.UniqueCountSketch.metric == metric,
+            models.UniqueCountSketch.scope == scope,
+            models.UniqueCountSketch.bucket >= since
+        ).all()
+        for (registers,) in rows:
+            total.merge(HyperLogLog(registers))
+        return total.count()
+
+
+sketch_store = SketchStore()
+
+
+def cohort_scope(user) -> str:
+    """Scope name for a user's signup-week cohort (weeks start on Monday)."""
+    created = user.created_at or datetime.utcnow()
+    week_start: date = created.date() - timedelta(days=created.weekday())
+    return f"cohort:{week_start.isoformat()}"
+
+
+def record_login(user, ip_address: str, user_agent: str):
+    """Feed a login into the unique IP / device sketches."""
+    device = f"{ip_address}|{user_agent}"
+    for scope in ("all", cohort_scope(user)):
+        sketch_store.add("ip", scope, ip_address)
+        sketch_store.add("device", scope, device)
+
+
+def record_rsvp(event_id: int, ip_address: str, user_agent: str):
+    """Feed an RSVP request into the per-event unique IP / device sketches."""
+    scope = f"event:{event_id}"
+    sketch_store.add("ip", scope, ip_address)
+    sketch_store.add("device", scope, f"{ip_address}|{user_agent}")
@@ -0,0 +1,196 @@
+"""
+Slow-request recorder with automatic EXPLAIN of the slowest statements.
+
+SlowRequestMiddleware times each request against its route's threshold
+(SLOW_REQUEST_MS, overridden per route by SLOW_REQUEST_ROUTES, e.g.
+"GET /api/analytics/retention=5000,/api/users/me=300"). Statements are
+collected through query_stats (the first SLOW_REQUEST_MAX_STATEMENTS of each
+request, with their offsets and durations). When a request is over its
+threshold, the SLOW_REQUEST_EXPLAIN slowest distinct statements are run under
+EXPLAIN on the primary (index_advisor.explain) in a worker thread after the
+response has been sent, and the record is kept:
+
+  - in a ring buffer of the last SLOW_REQUEST_BUFFER records per worker,
+    listed and inspected through /api/admin/slow-requests
+  - appended to SLOW_REQUEST_LOG_PATH as NDJSON, when set. The file is not
+    rotated, so the path is empty (off) by default
+
+Query strings and statement parameters are stored sanitized
+(traffic_capture.sanitize): e-mails pseudonymized, secrets redacted.
+"""
+
+import os
+import time
+import uuid
+import logging
+from collections import deque
+from contextvars import Context
+from urllib.parse import parse_qsl
+
+from anyio import to_thread
+
+import query_stats
+from index_advisor import explain, fingerprint
+from request_context import current_route
+from traffic_capture import CaptureWriter, sanitize
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUESTS = os.getenv("SLOW_REQUESTS", "True").lower() in ('true', '1', 't')
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_ROUTES = os.getenv("SLOW_REQUEST_ROUTES", "")
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "200"))
+SLOW_REQUEST_EXPLAIN = int(os.getenv("SLOW_REQUEST_EXPLAIN", "3"))
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", "100"))
+SLOW_REQUEST_LOG_PATH = os.getenv("SLOW_REQUEST_LOG_PATH", "")
+
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+
+
+def parse_thresholds(spec: str) -> dict:
+    """{"GET /api/x" or "/api/x": milliseconds} from "GET /api/x=500,/api/y=2000"."""
+    thresholds = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        route, ms = item.rsplit("=", 1)
+        try:
+            thresholds[route.strip()] = float(ms)
+        except ValueError:
+            logger.warning(f"Ignoring invalid SLOW_REQUEST_ROUTES entry: {item}")
+    return thresholds
+
+
+class SlowRequestRecorder:
+    def __init__(self, engine=None, default_ms: float = SLOW_REQUEST_MS, routes: dict = None,
+                 size: int = SLOW_REQUEST_BUFFER, log_path: str = SLOW_REQUEST_LOG_PATH):
+        self.engine = engine
+        self.default_ms = default_ms
+        self.routes = parse_thresholds(SLOW_REQUEST_ROUTES) if routes is None else routes
+        self.records = deque(maxlen=size)
+        self.writer = CaptureWriter(log_path) if log_path else None
+
+    def threshold_ms(self, method: str, route: str) -> float:
+        return self.routes.get(f"{method} {route}", self.routes.get(route, self.default_ms))
+
+    def _explain(self, statements: list) -> list:
+        """Plans for the slowest distinct explainable statements."""
+        slowest, seen = [], set()
+        for entry in sorted(statements, key=lambda e: -e[3]):
+            statement, parameters = entry[0], entry[1]
+            key = fingerprint(statement)
+            if key in seen or statement.lstrip()[:6].upper() not in _EXPLAINABLE:
+                continue
+            seen.add(key)
+            result = {"statement": statement, "duration_ms": round(entry[3] * 1000, 3)}
+            if self.engine is not None:
+                try:
+                    with self.engine.connect() as conn:
+                        result["plan"], result["issues"] = explain(conn, statement, parameters)
+                except Exception as e:
+                    result["explain_error"] = str(e)
+            slowest.append(result)
+            if len(slowest) >= SLOW_REQUEST_EXPLAIN:
+                break
+        return slowest
+
+    def record(self, scope, route: str, status, started: float, start: float, seconds: float, stats) -> dict:
+        """Keep a slow request; `started` is wall-clock time, `start` the perf_counter() it began at."""
+        record = {
+            "id": uuid.uuid4().hex[:16],
+            "ts": round(started, 3),
+            "method": scope["method"],
+            "route": route,
+            "path": scope["path"],
+            "query": sanitize(dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))),
+            "status": status,
+            "duration_ms": round(seconds * 1000, 3),
+            "threshold_ms": self.threshold_ms(scope["method"], route),
+            "statement_count": stats.statements,
+            "db_ms": round(stats.seconds * 1000, 3),
+            "statements": [
+                {
+                    "offset_ms": round((statement_started - start) * 1000, 3),
+                    "duration_ms": round(statement_seconds * 1000, 3),
+                    "statement": statement,
+                    "parameters": sanitize(list(parameters) if isinstance(parameters, (list, tuple)) else parameters),
+                }
+                for statement, parameters, statement_started, statement_seconds in stats.log
+            ],
+            "statements_truncated": stats.statements > len(stats.log),
+            # Fresh context: the EXPLAINs are not the request's statements or spans
+            "slowest": Context().run(self._explain, stats.log),
+        }
+        self.records.append(record)
+        if self.writer is not None:
+            try:
+                self.writer.write(record)
+            except Exception as e:
+                logger.warning(f"Could not write slow request log: {e}")
+        logger.warning(f"Slow request {record['id']}: {record['method']} {route} took {record['duration_ms']:.0f}ms "
+                       f"(threshold {record['threshold_ms']:.0f}ms), {record['statement_count']} statements, {record['db_ms']:.0f}ms in the database")
+        return record
+
+    def summaries(self, route: str = None, limit: int = 50) -> list:
+        result = []
+        for record in reversed(self.records):
+            if route and route not in (record["route"] or ""):
+                continue
+            result.append({key: record[key] for key in (
+                "id", "ts", "method", "route", "status", "duration_ms", "threshold_ms", "statement_count", "db_ms")})
+            if len(result) >= limit:
+                break
+        return result
+
+    def get(self, record_id: str):
+        for record in self.records:
+            if record["id"] == record_id:
+                return record
+        return None
+
+
+recorder = SlowRequestRecorder()
+
+
+class SlowRequestMiddleware:
+    """Pure ASGI middleware; must sit inside RequestContextMiddleware (for the route) like the other instrumentation."""
+
+    def __init__(self, app, recorder: SlowRequestRecorder = recorder):
+        self.app = app
+        self.recorder = recorder
+        query_stats.install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = query_stats.current_stats.get()
+        token = None
+        if stats is None:
+            # QueryStatsMiddleware is disabled (SQL_STATS=false); collect statements here
+            stats = query_stats.QueryStats()
+            token = query_stats.current_stats.set(stats)
+        stats.keep_statements = max(stats.keep_statements, SLOW_REQUEST_MAX_STATEMENTS)
+        status = None
+
+        async def status_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, status_send)
+        finally:
+            seconds = time.perf_counter() - start
+            if token is not None:
+                query_stats.current_stats.reset(token)
+            route = current_route()
+            if seconds * 1000 >= self.recorder.threshold_ms(scope["method"], route):
+                try:
+                    # EXPLAIN round trips stay off the event loop
+                    await to_thread.run_sync(self.recorder.record, scope, route, status, started, start, seconds, stats)
+                except Exception as e:
+                    logger.warning(f"Could not record slow request: {e}")
@@ -0,0 +1,213 @@
+"""
+SQLite tuning profile and background maintenance.
+
+apply_pragmas() is run on every new SQLite connection (sync, async, writer
+queue and read-only pools) so all of them share one profile:
+
+  busy_timeout        wait for locks instead of failing with "database is locked"
+  cache_size          page cache per connection (negative value = KiB)
+  mmap_size           memory-map the database file for reads
+  temp_store          keep temp tables and sort spills in memory
+  wal_autocheckpoint  pages after which commits run a passive checkpoint
+  journal_size_limit  truncate the WAL back to this size after a checkpoint
+
+Passive autocheckpoints never shrink the WAL file and are skipped while
+readers are active, which is how app.db-wal ends up larger than the
+database. SQLiteMaintenance runs wal_checkpoint(TRUNCATE) when a worker's
+pool is idle (or unconditionally once the WAL passes SQLITE_WAL_MAX_MB),
+plus PRAGMA optimize and a bounded ANALYZE on slower timers. Only one
+worker at a time does maintenance, arbitrated by a non-blocking file lock
+next to the database.
+"""
+
+import os
+import time
+import fcntl
+import logging
+import threading
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Per connection, so the worst case is this times every open connection: the
+# sync, async and read-only pools (up to 15 each by default) plus the writer, in
+# every worker - 4 workers * 46 * 8 MB ~= 1.5 GB. Reads mostly go through mmap
+# (SQLITE_MMAP_SIZE, shared via the OS page cache), so a small cache is enough.
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "8192"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_WAL_AUTOCHECKPOINT = int(os.getenv("SQLITE_WAL_AUTOCHECKPOINT", "1000"))
+SQLITE_JOURNAL_SIZE_LIMIT = int(os.getenv("SQLITE_JOURNAL_SIZE_LIMIT", str(64 * 1024 * 1024)))
+
+SQLITE_MAINTENANCE = os.getenv("SQLITE_MAINTENANCE", "True").lower() in ('true', '1', 't')
+SQLITE_CHECKPOINT_SECONDS = float(os.getenv("SQLITE_CHECKPOINT_SECONDS", "30"))
+# Checkouts per interval below which the worker counts as idle
+SQLITE_IDLE_CHECKOUTS = int(os.getenv("SQLITE_IDLE_CHECKOUTS", "5"))
+SQLITE_WAL_MAX_MB = float(os.getenv("SQLITE_WAL_MAX_MB", "256"))
+SQLITE_OPTIMIZE_SECONDS = float(os.getenv("SQLITE_OPTIMIZE_SECONDS", "3600"))
+SQLITE_ANALYZE_SECONDS = float(os.getenv("SQLITE_ANALYZE_SECONDS", "86400"))
+# Rows sampled per index by ANALYZE, so it stays fast on large tables
+SQLITE_ANALYSIS_LIMIT = int(os.getenv("SQLITE_ANALYSIS_LIMIT", "1000"))
+
+
+def apply_pragmas(dbapi_connection, read_only: bool = False):
+    """Apply the tuning profile to a raw sqlite3 connection."""
+    cursor = dbapi_connection.cursor()
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON;")
+    else:
+        cursor.execute("PRAGMA journal_mode=WAL;")
+        cursor.execute("PRAGMA synchronous=NORMAL;")
+        cursor.execute(f"PRAGMA wal_autocheckpoint={SQLITE_WAL_AUTOCHECKPOINT};")
+        cursor.execute(f"PRAGMA journal_size_limit={SQLITE_JOURNAL_SIZE_LIMIT};")
+    cursor.execute("PRAGMA foreign_keys=ON;")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS};")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB};")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE};")
+    cursor.execute("PRAGMA temp_store=MEMORY;")
+    cursor.close()
+
+
+def database_path(url: str) -> str:
+    return url.split("///", 1)[-1]
+
+
+class SQLiteMaintenance:
+    """Background WAL checkpointing, PRAGMA optimize and ANALYZE for one engine."""
+
+    def __init__(self, engine, url: str):
+        self.engine = engine
+        self.path = database_path(url)
+        self.checkpoints = 0
+        self.forced_checkpoints = 0
+        self.busy_checkpoints = 0
+        self.last_checkpoint_at = None
+        self.last_checkpoint_seconds = None
+        # (busy, wal frames, frames checkpointed) from the last wal_checkpoint
+        self.last_checkpoint_result = None
+        self.last_optimize_at = None
+        self.last_analyze_at = None
+        self._last_checkouts = 0
+        self._thread = None
+        self._pid = None
+        self._lock_file = None
+
+    def start(self):
+        # Threads do not survive gunicorn's fork, so start (again) in each worker
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._lock_file = open(self.path + ".maintenance-lock", "a+")
+        self._thread = threading.Thread(target=self._run, name="sqlite-maintenance", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(SQLITE_CHECKPOINT_SECONDS)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"SQLite maintenance failed: {str(e)}")
+
+    def wal_bytes(self) -> int:
+        try:
+            return os.path.getsize(self.path + "-wal")
+        except OSError:
+            return 0
+
+    def _is_idle(self) -> bool:
+        pool = self.engine.pool
+        stats = getattr(pool, "stats", None)
+        if stats is None:
+            return pool.checkedout() == 0
+        recent = stats.checkouts - self._last_checkouts
+        self._last_checkouts = stats.checkouts
+        # The maintenance thread's own checkouts count too, hence the small allowance
+        return pool.checkedout() == 0 and recent <= SQLITE_IDLE_CHECKOUTS
+
+    def tick(self):
+        idle = self._is_idle()
+        forced = self.wal_bytes() > SQLITE_WAL_MAX_MB * 1024 * 1024
+        if not (idle or forced):
+            return
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return  # another worker is doing maintenance
+        try:
+            now = time.time()
+            if self.last_analyze_at is None or now - self.last_analyze_at >= SQLITE_ANALYZE_SECONDS:
+                self.analyze()
+            elif self.last_optimize_at is None or now - self.last_optimize_at >= SQLITE_OPTIMIZE_SECONDS:
+                self.optimize()
+            # Last, so the statistics ANALYZE just wrote are checkpointed too
+            if self.wal_bytes() > 0:
+                self.checkpoint(forced=forced and not idle)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def checkpoint(self, forced: bool = False):
+        """Copy the WAL into the database and truncate it to zero bytes."""
+        start = time.perf_counter()
+        with self.engine.connect() as conn:
+            busy, log_frames, checkpointed = conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one()
+        self.last_checkpoint_seconds = time.perf_counter() - start
+        self.last_checkpoint_at = time.time()
+        self.last_checkpoint_result = (busy, log_frames, checkpointed)
+        self.checkpoints += 1
+        if forced:
+            self.forced_checkpoints += 1
+        if busy:
+            # A reader or writer held the WAL; the checkpoint could not finish
+            self.busy_checkpoints += 1
+            logger.warning(f"WAL checkpoint incomplete: {checkpointed}/{log_frames} frames")
+        return self.last_checkpoint_result
+
+    def optimize(self):
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA optimize")
+        self.last_optimize_at = time.time()
+
+    def analyze(self):
+        start = time.perf_counter()
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql(f"PRAGMA analysis_limit={SQLITE_ANALYSIS_LIMIT}")
+            conn.exec_driver_sql("ANALYZE")
+            conn.commit()
+        self.last_analyze_at = self.last_optimize_at = time.time()
+        logger.info(f"ANALYZE finished in {time.perf_counter() - start:.2f}s")
+
+    def snapshot(self) -> dict:
+        with self.engine.connect() as conn:
+            page_size = conn.execute(text("PRAGMA page_size")).scalar()
+            page_count = conn.execute(text("PRAGMA page_count")).scalar()
+            freelist = conn.execute(text("PRAGMA freelist_count")).scalar()
+        wal_bytes = self.wal_bytes()
+        result = self.last_checkpoint_result
+        return {
+            "database_bytes": page_size * page_count,
+            "freelist_pages": freelist,
+            "wal_bytes": wal_bytes,
+            # WAL frames written since the last truncate; the checkpoint lag
+            "wal_frames": max(0, (wal_bytes - 32) // (page_size + 24)) if wal_bytes else 0,
+            "seconds_since_checkpoint": round(time.time() - self.last_checkpoint_at, 1) if self.last_checkpoint_at else None,
+            "last_checkpoint": {
+                "busy": bool(result[0]),
+                "wal_frames": result[1],
+                "checkpointed_frames": result[2],
+                "duration_ms": round(self.last_checkpoint_seconds * 1000, 3),
+            } if result else None,
+            "checkpoints": self.checkpoints,
+            "forced_checkpoints": self.forced_checkpoints,
+            "busy_checkpoints": self.busy_checkpoints,
+            "last_optimize_at": self.last_optimize_at,
+            "last_analyze_at": self.last_analyze_at,
+            "profile": {
+                "busy_timeout_ms": SQLITE_BUSY_TIMEOUT_MS,
+                "cache_size_kb": SQLITE_CACHE_SIZE_KB,
+                "mmap_size": SQLITE_MMAP_SIZE,
+                "wal_autocheckpoint": SQLITE_WAL_AUTOCHECKPOINT,
+                "journal_size_limit": SQLITE_JOURNAL_SIZE_LIMIT,
+            },
+        }
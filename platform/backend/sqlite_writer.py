@@ -0,0 +1,171 @@
+"""
+Single-writer queue for SQLite deployments.
+
+With SQLITE_WRITE_MODE=queue, small hot-path writes (login sessions, RSVPs,
+mentor contact requests) are not committed by the request's own session.
+They are submitted as jobs - functions taking a Session - to one writer
+thread per worker process. The writer drains the queue and applies all
+pending jobs in one transaction (group commit), each inside a SAVEPOINT so a
+failing job only rolls back itself. Across gunicorn workers, writer threads
+serialize on an exclusive file lock next to the database, so processes
+queue up on the lock instead of spinning on SQLITE_BUSY ("database is
+locked").
+
+In queue mode, get_read_db sessions read through a separate pool of
+read-only connections (see database.read_only_engine).
+
+run_write() hides the mode from handlers: in direct mode (the default) the
+job runs on the request session and is committed there.
+"""
+
+import os
+import time
+import queue
+import fcntl
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
+
+from database import DATABASE_URL, SQLITE_WRITE_MODE
+from sqlite_tuning import apply_pragmas
+
+logger = logging.getLogger(__name__)
+
+WRITER_BATCH_SIZE = int(os.getenv("SQLITE_WRITER_BATCH_SIZE", "64"))
+WRITER_BATCH_WINDOW = float(os.getenv("SQLITE_WRITER_BATCH_WINDOW_MS", "2")) / 1000
+
+
+def enabled() -> bool:
+    return SQLITE_WRITE_MODE == "queue" and DATABASE_URL.startswith("sqlite")
+
+
+class SQLiteWriter:
+    def __init__(self, url: str):
+        self.url = url
+        self.jobs = queue.Queue()
+        self.batches = 0
+        self.committed_jobs = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._engine = None
+        self._session_factory = None
+        self._lock_file = None
+
+    def start(self):
+        with self._start_lock:
+            # Restart after fork: the thread does not survive into gunicorn workers
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._engine is None:
+                # The writer owns exactly one connection
+                self._engine = create_engine(
+                    self.url,
+                    connect_args={"check_same_thread": False, "isolation_level": None},
+                    poolclass=StaticPool,
+                )
+
+                @event.listens_for(self._engine, "connect")
+                def set_writer_pragma(dbapi_connection, connection_record):
+                    apply_pragmas(dbapi_connection)
+
+                # Take the write lock up front: BEGIN IMMEDIATE instead of pysqlite's deferred BEGIN
+                @event.listens_for(self._engine, "begin")
+                def begin_immediate(conn):
+                    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+                self._session_factory = sessionmaker(bind=self._engine, autoflush=False, expire_on_commit=False)
+                db_path = self.url.split("///", 1)[-1]
+                self._lock_file = open(db_path + ".writer-lock", "a+")
+            self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, job) -> Future:
+        """Queue `job(session)` for the writer. The future resolves once committed."""
+        self.start()
+        future = Future()
+        self.jobs.put((job, future))
+        return future
+
+    def _collect_batch(self):
+        batch = [self.jobs.get()]
+        deadline = time.perf_counter() + WRITER_BATCH_WINDOW
+        while len(batch) < WRITER_BATCH_SIZE:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.jobs.get(timeout=remaining) if remaining > 0 else self.jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                logger.error(f"SQLite writer batch of {len(batch)} failed: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _commit_batch(self, batch):
+        results = []
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            db = self._session_factory()
+            try:
+                for job, future in batch:
+                    try:
+                        # Releasing the savepoint flushes, so the job can still fail after returning
+                        with db.begin_nested():
+                            result = job(db)
+                    except Exception as e:
+                        results.append((future, None, e))
+                    else:
+                        results.append((future, result, None))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self.batches += 1
+        self.committed_jobs += len(batch)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "mode": SQLITE_WRITE_MODE,
+            "queued": self.jobs.qsize(),
+            "batches": self.batches,
+            "committed_jobs": self.committed_jobs,
+            "avg_batch_size": round(self.committed_jobs / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+sqlite_writer = SQLiteWriter(DATABASE_URL)
+
+
+def run_write(db: Session, job):
+    """Apply `job(session)` and commit, through the writer queue when enabled."""
+    if enabled():
+        return sqlite_writer.submit(job).result()
+    result = job(db)
+    db.commit()
+    return result
+
+
+async def run_write_async(job):
+    """Await a writer-queue job from async code (queue mode only)."""
+    return await asyncio.wrap_future(sqlite_writer.submit(job))
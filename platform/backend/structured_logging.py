@@ -0,0 +1,196 @@
+"""
+Structured, non-blocking logging.
+
+setup() replaces the root logger's handlers with a QueueHandler: the calling
+thread (often the event loop) only renders the message, stamps the record with
+the request id and route, and puts it on a bounded queue. A QueueListener
+thread formats the records (one JSON object per line, or plain text) and writes
+them to stderr, so slow terminals, pipes and log collectors never stall a
+request. When the queue is full the record is dropped rather than waited for,
+and the next record that gets through carries the number dropped.
+
+Repetitive messages are sampled per call site: after LOG_SAMPLE_BURST records
+from the same logger line within LOG_SAMPLE_WINDOW seconds the rest of that
+window is suppressed, and the first record of the next window reports how many
+were skipped.
+
+Configuration:
+
+  LOG_LEVEL          root level (default INFO)
+  LOG_LEVELS         per-logger levels, e.g. "sqlalchemy.engine=WARNING,database=DEBUG"
+  LOG_FORMAT         json (default) or text
+  LOG_QUEUE_SIZE     records buffered before dropping (default 10000)
+  LOG_SAMPLE_BURST   records per call site and window, 0 disables sampling (default 20)
+  LOG_SAMPLE_WINDOW  seconds (default 10)
+
+Under gunicorn --preload the listener thread is restarted in each worker after
+the fork.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from dotenv import load_dotenv
+
+from request_context import current_request_id, current_route
+
+# setup() runs before database.py loads .env
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "20"))
+LOG_SAMPLE_WINDOW = float(os.getenv("LOG_SAMPLE_WINDOW", "10"))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "route", "suppressed", "dropped"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, message, request context and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        for key in ("request_id", "route", "suppressed", "dropped"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Lets LOG_SAMPLE_BURST records per call site through each window."""
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, window: float = LOG_SAMPLE_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = record.created
+        with self._lock:
+            site = self.sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site is not None else 0
+                self.sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if site[1] < self.burst:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Renders the message in the caller's thread, never waits for room in the queue."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments may be mutated after the call returns and tracebacks hold the
+        # caller's frames, so both are rendered now; formatting happens in the listener
+        record.request_id = current_request_id.get()
+        route = current_route()
+        if route != "<background>":
+            record.route = route
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if self.dropped:
+            record.dropped, self.dropped = self.dropped, 0
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+
+
+def _output_handler() -> logging.Handler:
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    return output
+
+
+def _start_listener():
+    global _listener
+    _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _listener = QueueListener(_handler.queue, _output_handler(), respect_handler_level=False)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None and _listener._thread is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass  # exiting anyway; the records still queued are lost
+
+
+def apply_levels(root_level: str = LOG_LEVEL, spec: str = LOG_LEVELS):
+    logging.getLogger().setLevel(root_level)
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+
+def setup():
+    """Route the root logger through the queue; idempotent."""
+    global _handler
+    if _handler is not None:
+        return
+    _handler = NonBlockingQueueHandler(None)
+    _handler.addFilter(SamplingFilter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    apply_levels()
+    _start_listener()
+    atexit.register(_stop_listener)
+    # Threads do not survive fork(): each gunicorn worker needs its own listener
+    os.register_at_fork(after_in_child=_start_listener)
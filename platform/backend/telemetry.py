@@ -0,0 +1,150 @@
+"""
+Compact storage for login telemetry.
+
+User agents are dictionary-encoded into the user_agents table (parsed once
+into browser / OS / device families) and referenced by id, with a worker-side
+intern cache so repeat logins do not touch the lookup table. A newly inserted
+id only enters the cache once the session that inserted it commits. IP addresses are
+stored packed (4 bytes for IPv4, 16 for IPv6) instead of as text.
+
+The columns and the backfill of existing rows are migration 0003
+(migrations/versions/0003_compact_login_telemetry.py).
+"""
+
+import re
+import logging
+import ipaddress
+import threading
+
+from sqlalchemy import event, exc
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+INTERN_CACHE_SIZE = 10000
+# Session.info key for ids interned in the session's uncommitted transaction
+STAGED_KEY = "staged_user_agent_ids"
+
+_BROWSERS = [
+    ("Edge", re.compile(r"Edg(e|A|iOS)?/")),
+    ("Opera", re.compile(r"OPR/|Opera")),
+    ("Firefox", re.compile(r"Firefox/|FxiOS/")),
+    ("Chrome", re.compile(r"Chrome/|CriOS/")),
+    ("Safari", re.compile(r"Safari/")),
+]
+_OPERATING_SYSTEMS = [
+    ("iOS", re.compile(r"iPhone|iPad|iPod")),
+    ("Android", re.compile(r"Android")),
+    ("ChromeOS", re.compile(r"CrOS")),
+    ("Windows", re.compile(r"Windows")),
+    ("macOS", re.compile(r"Mac OS X|Macintosh")),
+    ("Linux", re.compile(r"Linux")),
+]
+_BOT = re.compile(r"bot|crawl|spider|curl|python-requests|httpx", re.IGNORECASE)
+_TABLET = re.compile(r"iPad|Tablet")
+_MOBILE = re.compile(r"Mobile|iPhone|Android")
+
+
+def parse_user_agent(user_agent: str) -> dict:
+    """Classify a user agent string into browser, OS and device families."""
+    browser = next((name for name, pattern in _BROWSERS if pattern.search(user_agent)), "Other")
+    os_family = next((name for name, pattern in _OPERATING_SYSTEMS if pattern.search(user_agent)), "Other")
+    if _BOT.search(user_agent):
+        device = "bot"
+    elif _TABLET.search(user_agent):
+        device = "tablet"
+    elif _MOBILE.search(user_agent):
+        device = "mobile"
+    else:
+        device = "desktop"
+    return {"browser_family": browser, "os_family": os_family, "device_family": device}
+
+
+def pack_ip(ip_address: str):
+    """Pack an IP address into 4 or 16 bytes. Returns None for non-IP values."""
+    try:
+        return ipaddress.ip_address(ip_address).packed
+    except (ValueError, TypeError):
+        return None
+
+
+class UserAgentInterner:
+    """Worker-local user agent string -> user_agents.id cache."""
+
+    def __init__(self, max_size: int = INTERN_CACHE_SIZE):
+        self.max_size = max_size
+        self._ids = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def intern(self, db: Session, user_agent: str):
+        if not user_agent:
+            return None
+        agent_id = self._ids.get(user_agent)
+        if agent_id is None:
+            agent_id = db.info.get(STAGED_KEY, {}).get(user_agent)
+        if agent_id is not None:
+            self.hits += 1
+            return agent_id
+        self.misses += 1
+
+        row = db.query(models.UserAgent.id).filter(models.UserAgent.user_agent == user_agent).first()
+        if row is None:
+            try:
+                # Savepoint so a concurrent insert by another worker only
+                # rolls back this lookup row, not the caller's transaction
+                with db.begin_nested():
+                    agent = models.UserAgent(user_agent=user_agent, **parse_user_agent(user_agent))
+                    db.add(agent)
+                agent_id = agent.id
+            except exc.IntegrityError:
+                agent_id = db.query(models.UserAgent.id).filter(models.UserAgent.user_agent == user_agent).scalar()
+        else:
+            agent_id = row.id
+
+        # Cached on commit (see _cache_staged): until then the row can still be rolled back
+        db.info.setdefault(STAGED_KEY, {})[user_agent] = agent_id
+        return agent_id
+
+    def add(self, ids: dict):
+        with self._lock:
+            if len(self._ids) + len(ids) > self.max_size:
+                self._ids.clear()
+            self._ids.update(ids)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+user_agent_interner = UserAgentInterner()
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_staged(session):
+    # Also fired when a savepoint is released; only the outermost commit counts
+    if session.in_nested_transaction():
+        return
+    staged = session.info.pop(STAGED_KEY, None)
+    if staged:
+        user_agent_interner.add(staged)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_staged(session, previous_transaction):
+    # Any rollback, including a savepoint's (a failed writer-queue job), may
+    # have undone the insert; the ids are looked up again next time
+    session.info.pop(STAGED_KEY, None)
+
+
+def build_login_session(db: Session, user_id: int, ip_address: str, user_agent: str) -> models.LoginSession:
+    """Create a LoginSession with an interned user agent and a packed IP."""
+    login_session = models.LoginSession(
+        user_id=user_id,
+        user_agent_id=user_agent_interner.intern(db, user_agent),
+    )
+    login_session.ip_address = ip_address
+    return login_session
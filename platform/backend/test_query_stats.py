@@ -0,0 +1,75 @@
+"""
+N+1 detection: strict tracking raises at the lazy load that crosses the
+threshold, and Server-Timing only goes to the callers it is meant for.
+
+Run with: python -m pytest test_query_stats.py
+"""
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, create_engine
+from sqlalchemy.orm import Session, declarative_base, relationship
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import query_stats
+
+Base = declarative_base()
+
+
+class Parent(Base):
+    __tablename__ = "parents"
+    id = Column(Integer, primary_key=True)
+    children = relationship("Child", lazy="select")
+
+
+class Child(Base):
+    __tablename__ = "children"
+    id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, ForeignKey("parents.id"), nullable=False)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    session.add_all([Parent(id=i, children=[Child()]) for i in range(1, 11)])
+    session.commit()
+    session.expunge_all()
+    yield session
+    session.close()
+
+
+def test_strict_tracking_raises_on_lazy_load_loop(db):
+    parents = db.query(Parent).all()
+    with pytest.raises(query_stats.NPlusOneError):
+        with query_stats.track(strict=True, threshold=5):
+            for parent in parents:
+                parent.children
+
+
+def test_non_strict_tracking_reports_the_repeated_shape(db):
+    parents = db.query(Parent).all()
+    with query_stats.track(threshold=5) as stats:
+        for parent in parents:
+            parent.children
+    assert stats.statements == 10
+    assert [shape.count for shape in stats.repeated()] == [10]
+
+
+def client(server_timing):
+    app = Starlette(routes=[Route("/", lambda request: PlainTextResponse("ok"))])
+    app.add_middleware(query_stats.QueryStatsMiddleware, server_timing=server_timing,
+                       authorize=lambda authorization: authorization == "Bearer admin")
+    return TestClient(app)
+
+
+def test_server_timing_only_for_admins_by_default():
+    admin_only = client("admin")
+    assert "server-timing" not in admin_only.get("/").headers
+    assert "server-timing" not in admin_only.get("/", headers={"Authorization": "Bearer member"}).headers
+    assert "server-timing" in admin_only.get("/", headers={"Authorization": "Bearer admin"}).headers
+    assert "server-timing" in client("all").get("/").headers
+    assert "server-timing" not in client("off").get("/", headers={"Authorization": "Bearer admin"}).headers
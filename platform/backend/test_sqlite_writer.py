@@ -0,0 +1,58 @@
+"""
+Group commit in the SQLite writer queue: a job that fails when its savepoint
+is released must fail alone, and every future must resolve exactly once.
+
+Run with: python -m pytest test_sqlite_writer.py
+"""
+
+from concurrent.futures import Future
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, create_engine, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import declarative_base
+
+from sqlite_writer import SQLiteWriter
+
+Base = declarative_base()
+
+
+class Parent(Base):
+    __tablename__ = "parents"
+    id = Column(Integer, primary_key=True)
+
+
+class Child(Base):
+    __tablename__ = "children"
+    id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, ForeignKey("parents.id"), nullable=False)
+
+
+def add_child(parent_id):
+    def job(db):
+        # Only flushed when the writer releases the job's savepoint
+        db.add(Child(parent_id=parent_id))
+        return parent_id
+    return job
+
+
+def test_job_failing_on_flush_does_not_fail_the_batch(tmp_path):
+    url = f"sqlite:///{tmp_path / 'writer.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Parent.__table__.insert(), [{"id": 1}, {"id": 2}])
+
+    writer = SQLiteWriter(url)
+    writer.start()
+    # One batch, committed directly so the writer thread cannot split it
+    batch = [(add_child(parent_id), Future()) for parent_id in (1, 999999, 2)]
+    writer._commit_batch(batch)
+
+    (_, first), (_, failed), (_, last) = batch
+    assert first.result(timeout=0) == 1
+    assert last.result(timeout=0) == 2
+    with pytest.raises(IntegrityError):
+        failed.result(timeout=0)
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(Child.__table__)).scalar() == 2
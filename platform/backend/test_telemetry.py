@@ -0,0 +1,48 @@
+"""
+User agent interning: a new id is cached only once the transaction that
+inserted its row has committed.
+
+Run with: python -m pytest test_telemetry.py
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import models
+import telemetry
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) Firefox/130.0"
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'telemetry.db'}")
+    models.UserAgent.__table__.create(engine)
+    telemetry.user_agent_interner.clear()
+    session = Session(engine)
+    yield session
+    session.close()
+    telemetry.user_agent_interner.clear()
+
+
+def cached(user_agent):
+    return telemetry.user_agent_interner._ids.get(user_agent)
+
+
+def test_released_savepoint_does_not_cache_before_outer_commit(db):
+    telemetry.user_agent_interner.intern(db, USER_AGENT)
+    # The writer queue wraps every job in a savepoint like this one
+    with db.begin_nested():
+        pass
+    assert cached(USER_AGENT) is None
+    db.rollback()
+    assert cached(USER_AGENT) is None
+
+
+def test_outer_commit_caches_the_id(db):
+    agent_id = telemetry.user_agent_interner.intern(db, USER_AGENT)
+    with db.begin_nested():
+        pass
+    db.commit()
+    assert cached(USER_AGENT) == agent_id
@@ -0,0 +1,305 @@
+"""
+Lightweight request tracing with a local exporter.
+
+A trace is started for each HTTP request by TracingMiddleware, continuing the
+caller's trace when a W3C `traceparent` header is present. Child spans cover:
+
+  - every SQL statement (SQLAlchemy cursor events, all engines)
+  - response validation and encoding (fastapi.routing.serialize_response)
+  - anything wrapped in `with tracing.span("name", key=value):` - the auth
+    dependencies and fastmail.send_message in main.py
+
+Spans live in the request's context, so work done in threadpool workers and
+AsyncSession greenlets nests under the right parent. Finished traces go to an
+in-memory ring buffer (the last TRACING_BUFFER_TRACES per worker), read via
+/api/admin/traces, and to TRACING_EXPORT_PATH as NDJSON (one trace per line)
+when that is set. Responses carry the trace id in X-Trace-Id.
+
+Off unless TRACING=true; when off, or for requests not sampled
+(TRACING_SAMPLE), span() returns a shared no-op object.
+"""
+
+import os
+import time
+import random
+import logging
+from collections import deque
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from traffic_capture import CaptureWriter
+
+logger = logging.getLogger(__name__)
+
+TRACING = os.getenv("TRACING", "False").lower() in ('true', '1', 't')
+TRACING_SAMPLE = float(os.getenv("TRACING_SAMPLE", "1.0"))
+TRACING_BUFFER_TRACES = int(os.getenv("TRACING_BUFFER_TRACES", "200"))
+TRACING_EXPORT_PATH = os.getenv("TRACING_EXPORT_PATH", "")
+# Spans kept per trace; an N+1 loop should not hold thousands of statements in memory
+TRACING_MAX_SPANS = int(os.getenv("TRACING_MAX_SPANS", "500"))
+
+
+class Trace:
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.root = None
+        self.spans = []
+        self.dropped = 0
+
+    def to_dict(self) -> dict:
+        root = self.root
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name if root else None,
+            "start": root.start if root else None,
+            "duration_ms": root.duration_ms if root else None,
+            "status": root.attributes.get("http.status_code") if root else None,
+            "dropped_spans": self.dropped,
+            "spans": [s.to_dict() for s in sorted(self.spans, key=lambda s: s.start)],
+        }
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "duration_ms", "attributes", "error", "_started", "_token")
+
+    def __init__(self, trace: Trace, parent_id, name: str, attributes: dict):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.error = None
+        self.duration_ms = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def finish(self, error: BaseException = None):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if len(self.trace.spans) < TRACING_MAX_SPANS or self is self.trace.root:
+            self.trace.spans.append(self)
+        else:
+            self.trace.dropped += 1
+
+    def __enter__(self):
+        self._token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        current_span.reset(self._token)
+        self.finish(exc)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    def set(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+current_span: ContextVar = ContextVar("current_span", default=None)
+
+
+def span(name: str, **attributes):
+    """Child span of the current one; a no-op outside a traced request."""
+    parent = current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, parent.span_id, name, attributes)
+
+
+class TraceBuffer:
+    """The most recent finished traces of this worker."""
+
+    def __init__(self, size: int = TRACING_BUFFER_TRACES, export_path: str = TRACING_EXPORT_PATH):
+        self.traces = deque(maxlen=size)
+        self.writer = CaptureWriter(export_path) if export_path else None
+
+    def add(self, trace: Trace):
+        self.traces.append(trace)
+        if self.writer is not None:
+            try:
+                self.writer.write(trace.to_dict())
+            except Exception as e:
+                logger.warning(f"Could not export trace {trace.trace_id}: {e}")
+
+    def summaries(self, min_ms: float = 0, route: str = None, limit: int = 50) -> list:
+        result = []
+        for trace in reversed(self.traces):
+            root = trace.root
+            if root is None or (root.duration_ms or 0) < min_ms:
+                continue
+            if route and route not in root.attributes.get("http.route", ""):
+                continue
+            result.append({
+                "trace_id": trace.trace_id,
+                "name": root.name,
+                "start": root.start,
+                "duration_ms": root.duration_ms,
+                "status": root.attributes.get("http.status_code"),
+                "spans": len(trace.spans) + trace.dropped,
+                "db_ms": round(sum(s.duration_ms for s in trace.spans if s.name == "db.execute"), 3),
+            })
+            if len(result) >= limit:
+                break
+        return result
+
+    def get(self, trace_id: str):
+        for trace in self.traces:
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+        return None
+
+
+trace_buffer = TraceBuffer()
+
+
+def parse_traceparent(value: str):
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None."""
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16), int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(int(parts[3][:2], 16) & 1)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = current_span.get()
+    if parent is not None:
+        db_span = Span(parent.trace, parent.span_id, "db.execute", {
+            "db.system": conn.dialect.name,
+            "db.statement": " ".join(statement.split())[:300],
+        })
+        if executemany:
+            db_span.attributes["db.executemany"] = True
+        conn.info.setdefault("trace_spans", []).append(db_span)
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans and current_span.get() is not None:
+        db_span = spans.pop()
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            db_span.attributes["db.rowcount"] = cursor.rowcount
+        db_span.finish()
+
+
+def _execute_error(context):
+    spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+    if spans and current_span.get() is not None:
+        spans.pop().finish(context.original_exception)
+
+
+def _trace_serialization():
+    import fastapi.routing
+
+    serialize_response = fastapi.routing.serialize_response
+    if getattr(serialize_response, "_traced", False):
+        return
+
+    async def traced_serialize_response(*args, **kwargs):
+        with span("fastapi.serialize_response"):
+            return await serialize_response(*args, **kwargs)
+
+    traced_serialize_response._traced = True
+    fastapi.routing.serialize_response = traced_serialize_response
+
+
+_installed = False
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    event.listen(Engine, "before_cursor_execute", _before_execute)
+    event.listen(Engine, "after_cursor_execute", _after_execute)
+    event.listen(Engine, "handle_error", _execute_error)
+    _trace_serialization()
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening the root span of each sampled request."""
+
+    def __init__(self, app, sample: float = TRACING_SAMPLE, buffer: TraceBuffer = trace_buffer):
+        self.app = app
+        self.sample = sample
+        self.buffer = buffer
+        install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = None
+        for key, value in scope.get("headers") or []:
+            if key == b"traceparent":
+                incoming = parse_traceparent(value.decode("latin-1"))
+                break
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = self.sample >= 1.0 or random.random() < self.sample
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(trace_id)
+        root = Span(trace, parent_id, f"{scope['method']} {scope['path']}", {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+        trace.root = root
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace_id.encode())]
+            await send(message)
+
+        error = None
+        token = current_span.set(root)
+        try:
+            await self.app(scope, receive, traced_send)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                root.name = f"{scope['method']} {route}"
+                root.attributes["http.route"] = route
+            root.finish(error)
+            self.buffer.add(trace)
@@ -0,0 +1,190 @@
+"""
+Optional capture of live traffic to NDJSON, for replay_traffic.py.
+
+TrafficCaptureMiddleware writes one line per request: timestamp, method,
+route template and concrete path, query parameters, the caller's role (read
+from the bearer token's claims, not verified - this is metadata only), a
+pseudonymous caller id, status, duration, and the request body with its
+shape. Bodies are sanitized before they are written:
+
+  - values under secret-looking keys (password, token, secret, ...) become
+    "[REDACTED]"; the Authorization header itself is never recorded
+  - e-mail addresses and login usernames are replaced by stable pseudonyms
+    (keyed hash), so duplicates in the original stream stay duplicates
+
+Each worker appends whole lines with a single write() on an O_APPEND file,
+so gunicorn workers can share one capture file.
+
+Enable with TRAFFIC_CAPTURE=true; TRAFFIC_CAPTURE_PATH sets the file,
+TRAFFIC_CAPTURE_SAMPLE the fraction of requests kept and
+TRAFFIC_CAPTURE_EXCLUDE a comma-separated list of path prefixes to skip.
+"""
+
+import os
+import re
+import json
+import time
+import hmac
+import random
+import hashlib
+import logging
+from urllib.parse import parse_qsl
+
+from jose import jwt
+
+logger = logging.getLogger(__name__)
+
+TRAFFIC_CAPTURE = os.getenv("TRAFFIC_CAPTURE", "False").lower() in ('true', '1', 't')
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", "traffic.ndjson")
+TRAFFIC_CAPTURE_SAMPLE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE", "1.0"))
+TRAFFIC_CAPTURE_EXCLUDE = [p for p in os.getenv("TRAFFIC_CAPTURE_EXCLUDE", "/health,/docs,/openapi.json").split(",") if p]
+# Bodies larger than this are recorded by shape only
+TRAFFIC_CAPTURE_MAX_BODY = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY", str(64 * 1024)))
+# Key for the pseudonyms; set it to correlate captures taken at different times
+TRAFFIC_CAPTURE_SALT = os.getenv("TRAFFIC_CAPTURE_SALT", "traffic-capture").encode()
+
+REDACTED = "[REDACTED]"
+_SECRET_KEY = re.compile(r"pass(word|wd)?|secret|token|authorization|api[_-]?key|credential", re.I)
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+
+
+def pseudonym(value: str, prefix: str = "p") -> str:
+    digest = hmac.new(TRAFFIC_CAPTURE_SALT, value.lower().encode(), hashlib.sha256).hexdigest()[:12]
+    return f"{prefix}{digest}"
+
+
+def _pseudonymize_email(match) -> str:
+    return f"{pseudonym(match.group(0), 'e')}@example.com"
+
+
+def sanitize(value, key: str = ""):
+    """Copy of a parsed body or query with secrets redacted and e-mails pseudonymized."""
+    if key and _SECRET_KEY.search(key):
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: sanitize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize(v, key) for v in value]
+    if isinstance(value, str):
+        if key == "username":
+            return pseudonym(value)
+        return _EMAIL.sub(_pseudonymize_email, value)
+    return value
+
+
+def shape(value):
+    """Structure of a payload with values replaced by their type names."""
+    if isinstance(value, dict):
+        return {k: shape(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [shape(value[0])] if value else []
+    return type(value).__name__
+
+
+def caller(headers: dict):
+    """(role, pseudonymous id) from the bearer token, without verifying it."""
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if not authorization.lower().startswith("bearer "):
+        return "anonymous", None
+    try:
+        claims = jwt.get_unverified_claims(authorization[7:])
+    except Exception:
+        return "invalid", None
+    subject = claims.get("sub")
+    return claims.get("role") or "member", pseudonym(subject) if subject else None
+
+
+def parse_body(content_type: str, body: bytes):
+    if not body:
+        return None
+    if content_type.startswith("application/json"):
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return dict(parse_qsl(body.decode("utf-8", "replace"), keep_blank_values=True))
+    return None  # multipart uploads and others: size only
+
+
+class CaptureWriter:
+    """Appends NDJSON lines; reopened after a fork so each worker has its own fd."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+        self._pid = None
+
+    def write(self, record: dict):
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        os.write(self._fd, (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode())
+
+
+class TrafficCaptureMiddleware:
+    """Pure ASGI middleware; the body is copied as the app reads it, never buffered ahead."""
+
+    def __init__(self, app, path: str = TRAFFIC_CAPTURE_PATH, sample: float = TRAFFIC_CAPTURE_SAMPLE):
+        self.app = app
+        self.sample = sample
+        self.writer = CaptureWriter(path)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] == "OPTIONS"
+                or any(scope["path"].startswith(prefix) for prefix in TRAFFIC_CAPTURE_EXCLUDE)
+                or (self.sample < 1.0 and random.random() >= self.sample)):
+            await self.app(scope, receive, send)
+            return
+
+        chunks, size, status = [], 0, None
+
+        async def capture_receive():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= TRAFFIC_CAPTURE_MAX_BODY:
+                    chunks.append(body)
+            return message
+
+        async def capture_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            duration = time.perf_counter() - start
+            try:
+                self.record(scope, started, duration, status, b"".join(chunks) if size <= TRAFFIC_CAPTURE_MAX_BODY else None, size)
+            except Exception as e:
+                logger.warning(f"Traffic capture failed: {e}")
+
+    def record(self, scope, started: float, duration: float, status, body, size: int):
+        headers = dict(scope.get("headers") or [])
+        role, user = caller(headers)
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        parsed = parse_body(content_type, body) if body is not None else None
+        route = getattr(scope.get("route"), "path", None)
+        query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+        self.writer.write({
+            "ts": round(started, 6),
+            "method": scope["method"],
+            "route": route,
+            "path": scope["path"],
+            "query": sanitize(query),
+            "role": role,
+            "user": user,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "content_type": content_type.split(";")[0] or None,
+            "body_bytes": size,
+            "shape": shape(parsed) if parsed is not None else None,
+            "body": sanitize(parsed) if parsed is not None else None,
+        })